@@ -37,24 +37,25 @@ function Home() {
   const [errorHistorical, setErrorHistorical] = useState(null);
 
   useEffect(() => {
-    const fetchPredictionWillGoUp = async () => {
-      try {
-        const response = await axios.get('https://api-production-fb8c.up.railway.app/predict');
-        setPrediction(response.data.prediction[0]);
-      } catch (error) {
-        setError(error);
-      } finally {
+    // Classification and regression are pushed by the server - a snapshot on connect, then one event per new bar
+    const predictionStream = new EventSource('https://api-production-fb8c.up.railway.app/predict/stream');
+    let received = false;
+    predictionStream.addEventListener('prediction', (event) => {
+      const data = JSON.parse(event.data);
+      received = true;
+      setPrediction(data.prediction[0]);
+      setPredictionRegression(data.regression[0]);
+      setError(null);
+      setErrorRegression(null);
+      setLoading(false);
+      setLoadingRegression(false);
+    });
+    predictionStream.onerror = () => {
+      // EventSource reconnects by itself, only report it while nothing has been received yet
+      if (!received) {
+        setError(new Error('Prediction stream unavailable'));
+        setErrorRegression(new Error('Prediction stream unavailable'));
         setLoading(false);
-      }
-    };
-
-    const fetchPredictionPrice = async () => {
-      try {
-        const response = await axios.get('https://api-production-fb8c.up.railway.app/predict/regression');
-        setPredictionRegression(response.data.prediction[0]);
-      } catch (error) {
-        setErrorRegression(error);
-      } finally {
         setLoadingRegression(false);
       }
     };
@@ -70,9 +71,9 @@ function Home() {
       }
     };
 
-    fetchPredictionWillGoUp();
-    fetchPredictionPrice();
     fetchHistoricalPrices();
+
+    return () => predictionStream.close();
   }, []);
 
   const chartData = {
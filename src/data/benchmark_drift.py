@@ -0,0 +1,78 @@
+import argparse
+import json
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+from scipy import stats
+
+from src.data.ks import drift_report, numeric_columns, sorted_reference
+
+
+def synthetic_frame(rows: int, columns: int, shift: float, seed: int) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({f"feature_{j}": rng.normal(shift, 1, rows) for j in range(columns)})
+
+
+def legacy_ks(reference: pd.DataFrame, current: pd.DataFrame) -> None:
+    # The histogram approximation ks.py used before, one column at a time
+    for column in current.columns:
+        hist1, bin_edges1 = np.histogram(current[column].dropna(), bins=100, density=True)
+        hist2, bin_edges2 = np.histogram(reference[column].dropna(), bins=100, density=True)
+        cdf1 = np.cumsum(hist1 * np.diff(bin_edges1))
+        cdf2 = np.cumsum(hist2 * np.diff(bin_edges2))
+        np.max(np.abs(cdf1 - cdf2))
+
+
+def scipy_ks(reference: pd.DataFrame, current: pd.DataFrame) -> None:
+    for column in current.columns:
+        stats.ks_2samp(reference[column].dropna(), current[column].dropna(), method="asymp")
+
+
+def timed(func) -> float:
+    start = time.perf_counter()
+    func()
+    return round(time.perf_counter() - start, 4)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Drift check time against large references")
+    parser.add_argument("--rows", default="100000,1000000,5000000")
+    parser.add_argument("--current-rows", type=int, default=250)
+    parser.add_argument("--columns", type=int, default=19)
+    args = parser.parse_args()
+
+    results = {}
+    for rows in [int(size) for size in args.rows.split(",")]:
+        reference = synthetic_frame(rows, args.columns, 0.0, 1)
+        current = synthetic_frame(args.current_rows, args.columns, 0.1, 2)
+
+        with tempfile.TemporaryDirectory() as cache_dir:
+            results[rows] = {
+                "legacy_histogram": timed(lambda: legacy_ks(reference, current)),
+                "scipy_ks_2samp": timed(lambda: scipy_ks(reference, current)),
+                # First run sorts and caches the reference, later runs hash it and load the sorted copy
+                "engine_cold": timed(lambda: drift_report(sorted_reference(reference, cache_dir=cache_dir), current)),
+                "engine_cached": timed(lambda: drift_report(sorted_reference(reference, cache_dir=cache_dir), current)),
+            }
+            # Pipeline frames carry their dataset hash, so the cached reference is found without hashing the values
+            keyed = reference.copy(deep=False)
+            keyed.attrs["content_hash"] = f"benchmark-{rows}"
+            sorted_reference(keyed, cache_dir=cache_dir)
+            results[rows]["engine_cached_keyed"] = timed(
+                lambda: drift_report(sorted_reference(keyed, cache_dir=cache_dir), current, statistics=("psi", "wasserstein"))
+            )
+            sorted_sample = sorted_reference(reference, numeric_columns(reference), cache_dir)
+            # Reference kept in memory, e.g. across pipeline stages
+            results[rows]["engine_sorted"] = timed(lambda: drift_report(sorted_sample, current))
+            results[rows]["engine_sorted_all_statistics"] = timed(
+                lambda: drift_report(sorted_sample, current, statistics=("psi", "wasserstein"))
+            )
+        print(f"[Benchmark] - {rows} reference rows: {results[rows]}")
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+import argparse
+import json
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from src.data.helpers.features import HORIZONS, empty_state, horizon_features
+
+
+def synthetic_history(rows: int) -> pd.DataFrame:
+    # Noisy cycles with the raw file's columns - a random walk overflows over millions of rows
+    rng = np.random.default_rng(3)
+    close = 1000 + 200 * np.sin(np.arange(rows) / 500) + rng.normal(0, 5, rows)
+    return pd.DataFrame({
+        "Date": pd.date_range("1900-01-01", periods=rows, freq="D").astype(str),
+        "Open": close * 0.99, "High": close * 1.01, "Low": close * 0.98, "Close": close,
+        "Volume": rng.integers(1_000, 1_000_000, rows), "Dividends": 0.0, "Stock Splits": 0.0,
+    })
+
+
+def legacy_features(sp500_data: pd.DataFrame) -> pd.DataFrame:
+    # The loop process_data used before: rolling aggregates over every column, two frame copies per horizon
+    sp500_data = sp500_data.drop(columns=['Dividends', 'Stock Splits'])
+    sp500_data["Tomorrow"] = sp500_data["Close"].shift(-1)
+    sp500_data["Target"] = (sp500_data["Tomorrow"] > sp500_data["Close"]).astype(int)
+    for horizon in HORIZONS:
+        rolling_averages = sp500_data.drop(columns=['Date']).rolling(horizon).mean()
+        sp500_data[f"Close_Ratio_{horizon}"] = sp500_data["Close"] / rolling_averages["Close"]
+        sp500_data[f"Trend_{horizon}"] = sp500_data.drop(columns=['Date']).shift(1).rolling(horizon).sum()["Target"]
+    return sp500_data
+
+
+def engine_features(sp500_data: pd.DataFrame) -> dict[str, np.ndarray]:
+    return horizon_features(sp500_data["Close"].to_numpy(dtype=np.float64), empty_state())[1]
+
+
+def measure(func, data: pd.DataFrame) -> tuple[float, float]:
+    # Seconds and peak MB allocated on top of the input frame
+    tracemalloc.start()
+    start = time.perf_counter()
+    func(data)
+    seconds = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return seconds, peak / 2**20
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Horizon features: legacy pandas rolling loop vs the cumulative-sum engine")
+    parser.add_argument("--rows", default="10000,1000000,3000000")
+    args = parser.parse_args()
+
+    results = {}
+    for rows in [int(size) for size in args.rows.split(",")]:
+        data = synthetic_history(rows)
+        legacy_s, legacy_mb = measure(legacy_features, data)
+        engine_s, engine_mb = measure(engine_features, data)
+
+        # Same features up to the last bits of the rolling mean
+        legacy, engine = legacy_features(data), engine_features(data)
+        for name, values in engine.items():
+            np.testing.assert_allclose(values, legacy[name].to_numpy(dtype=np.float64), rtol=1e-9)
+
+        results[rows] = {
+            "legacy_s": round(legacy_s, 4), "engine_s": round(engine_s, 4), "speedup": round(legacy_s / engine_s, 1),
+            "legacy_peak_mb": round(legacy_mb, 1), "engine_peak_mb": round(engine_mb, 1),
+        }
+        print(f"[Benchmark] - {rows} rows: {results[rows]}")
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+import argparse
+import json
+import multiprocessing
+import os
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from src.data.helpers.dataset_store import read_dataset, to_frame, write_dataset
+from src.data.helpers.features import HORIZONS
+
+PROJECTION = ["Date", "Close", "Volume", "Open", "High", "Low", "Target"]
+
+
+def synthetic_processed(rows: int) -> pd.DataFrame:
+    # Columns of data/processed/stock/sp500.csv, as written by process_data
+    rng = np.random.default_rng(4)
+    close = 1000 + 200 * np.sin(np.arange(rows) / 500) + rng.normal(0, 5, rows)
+    data = {
+        # Hourly stamps keep multi-million row histories inside the timestamp range (~340 years for 3M rows)
+        "Date": pd.date_range("1900-01-01", periods=rows, freq="h"),
+        "Open": close * 0.99, "High": close * 1.01, "Low": close * 0.98, "Close": close,
+        "Volume": rng.integers(1_000, 1_000_000, rows),
+        "Tomorrow": np.append(close[1:], np.nan), "Target": rng.integers(0, 2, rows),
+    }
+    for horizon in HORIZONS:
+        data[f"Close_Ratio_{horizon}"] = rng.normal(1, 0.01, rows)
+        data[f"Trend_{horizon}"] = rng.integers(0, horizon, rows).astype(float)
+    data["Open_Nasdaq"] = close * 0.3
+    return pd.DataFrame(data)
+
+
+READERS = {
+    "csv": lambda folder: pd.read_csv(os.path.join(folder, "data.csv")),
+    "csv_projected": lambda folder: pd.read_csv(os.path.join(folder, "data.csv"), usecols=PROJECTION),
+    "arrow": lambda folder: to_frame(read_dataset(os.path.join(folder, "data"))),
+    "arrow_projected": lambda folder: to_frame(read_dataset(os.path.join(folder, "data"), PROJECTION)),
+    # What split_data and run_checkpoint do - Arrow table only, no pandas conversion
+    "arrow_table": lambda folder: read_dataset(os.path.join(folder, "data")),
+}
+
+
+def memory_kb(field: str) -> int:
+    # Linux only; unlike ru_maxrss, VmHWM starts over in a freshly exec'd process
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith(field):
+                return int(line.split()[1])
+    return 0
+
+
+def measure_reader(name: str, folder: str, queue) -> None:
+    # Runs in a fresh process, so the high-water mark above the idle baseline is this read alone
+    baseline = memory_kb("VmRSS")
+    start = time.perf_counter()
+    result = READERS[name](folder)
+    seconds = time.perf_counter() - start
+    peak = memory_kb("VmHWM")
+    queue.put({"seconds": round(seconds, 4), "peak_rss_mb": round((peak - baseline) / 1024, 1), "rows": len(result)})
+
+
+def run_reader(name: str, folder: str) -> dict:
+    context = multiprocessing.get_context("spawn")
+    queue = context.Queue()
+    process = context.Process(target=measure_reader, args=(name, folder, queue))
+    process.start()
+    result = queue.get()
+    process.join()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Read time and peak RSS: processed CSV vs year-partitioned Arrow dataset")
+    parser.add_argument("--rows", default="9000,1000000,3000000")
+    args = parser.parse_args()
+
+    results = {}
+    for rows in [int(size) for size in args.rows.split(",")]:
+        with tempfile.TemporaryDirectory() as folder:
+            frame = synthetic_processed(rows)
+            frame.to_csv(os.path.join(folder, "data.csv"), index=True)
+            write_dataset(frame, os.path.join(folder, "data"))
+            del frame
+
+            results[rows] = {name: run_reader(name, folder) for name in READERS}
+        print(f"[Benchmark] - {rows} rows: {results[rows]}")
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
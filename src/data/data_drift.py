@@ -1,19 +1,25 @@
 import os
 
-import pandas as pd
 from evidently.report import Report
 from evidently.metric_preset import DataDriftPreset
 
-if __name__ == "__main__":
-    report = Report(metrics=[DataDriftPreset()])
+from src.models.helpers.helper_dataset import load_dataset
 
-    current = pd.read_csv("data/current_data.csv")
-    reference = pd.read_csv("data/reference_data.csv")
+REPORT_FILE = "reports/sites/data_drift.html"
 
+
+def data_drift(reference, current, report_file=REPORT_FILE):
+    report = Report(metrics=[DataDriftPreset()])
     report.run(reference_data=reference, current_data=current)
 
     # if directory doesn't exist create one
-    if not os.path.exists("reports/sites"):
-        os.makedirs("reports/sites")
+    os.makedirs(os.path.dirname(report_file), exist_ok=True)
+
+    report.save_html(report_file)
+
+
+if __name__ == "__main__":
+    current = load_dataset("data/current_data")
+    reference = load_dataset("data/reference_data")
 
-    report.save_html("reports/sites/data_drift.html")
\ No newline at end of file
+    data_drift(reference, current)
\ No newline at end of file
@@ -1,33 +1,203 @@
-import yfinance as yf
-import pandas as pd
+import argparse
 import os
+from datetime import date, timedelta
+from typing import Callable, Iterator
+
+import pandas as pd
+import yfinance as yf
+
+RAW_DIRECTORY = "data/raw/stock"
+# First daily bar Yahoo Finance has for ^GSPC
+FIRST_DATE = date(1927, 12, 30)
+CHUNK_DAYS = 5 * 365
+# Longer than any weekend plus exchange holidays - a bigger hole between stored bars means missed runs
+GAP_DAYS = 5
+COLUMNS = ["Open", "High", "Low", "Close", "Volume", "Dividends", "Stock Splits"]
+
+
+def fetch_stock_data(ticker: str, start: date, end: date) -> pd.DataFrame:
+    # end is exclusive, same as yfinance
+    stock = yf.Ticker(ticker)
+    return stock.history(start=start, end=end, interval="1d")
+
+
+def date_keys(dates) -> pd.Index:
+    # "2024-05-01 00:00:00-04:00" -> "2024-05-01", the exchange-local trading day
+    if isinstance(dates, pd.DatetimeIndex):
+        # Formatting tz-aware timestamps as strings is slow, wall-clock datetime64 days are not
+        local = dates.tz_localize(None) if dates.tz is not None else dates
+        return pd.Index(local.to_numpy().astype("datetime64[D]").astype(str))
+    return pd.Index(pd.Series(dates).astype(str).str[:10])
+
+
+def normalize(data: pd.DataFrame) -> pd.DataFrame:
+    # One row per trading day (the latest fetch wins), in date order
+    data = data[[column for column in COLUMNS if column in data.columns]]
+    data.index.name = "Date"
+    keys = date_keys(data.index)
+    keep = ~keys.duplicated(keep="last")
+    return data[keep].iloc[keys[keep].argsort(kind="stable")]
+
+
+def chunks(start: date, end: date, days: int = CHUNK_DAYS) -> Iterator[tuple[date, date]]:
+    while start < end:
+        chunk_end = min(start + timedelta(days=days), end)
+        yield start, chunk_end
+        start = chunk_end
+
+
+def repair_torn_tail(file_path: str) -> None:
+    # A run killed mid-append leaves half a line - drop it, the next fetch brings the row back
+    if not os.path.isfile(file_path):
+        return
+    with open(file_path, "rb+") as f:
+        size = f.seek(0, os.SEEK_END)
+        if size == 0:
+            return
+        f.seek(max(0, size - 65536))
+        tail = f.read()
+        if tail.endswith(b"\n"):
+            return
+        f.truncate(size - len(tail) + tail.rfind(b"\n") + 1)
+
+
+def last_stored_date(file_path: str) -> date | None:
+    # Only the end of the file is read, so a daily run does not depend on the history length
+    if not os.path.isfile(file_path):
+        return None
+    with open(file_path, "rb") as f:
+        size = f.seek(0, os.SEEK_END)
+        f.seek(max(0, size - 4096))
+        lines = f.read().decode().splitlines()
+    for line in reversed(lines):
+        key = line[:10]
+        if len(key) == 10 and key[:4].isdigit():
+            return date.fromisoformat(key)
+    return None
+
+
+def append_rows(data: pd.DataFrame, file_path: str) -> None:
+    os.makedirs(os.path.dirname(file_path), exist_ok=True)
+    exists = os.path.isfile(file_path) and os.path.getsize(file_path) > 0
+    with open(file_path, "a", newline="") as f:
+        data.to_csv(f, header=not exists, index=True)
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def write_atomic(data: pd.DataFrame, file_path: str) -> None:
+    os.makedirs(os.path.dirname(file_path), exist_ok=True)
+    tmp_path = f"{file_path}.tmp"
+    with open(tmp_path, "w", newline="") as f:
+        data.to_csv(f, index=True)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, file_path)
+
+
+def update_prices(
+    ticker: str,
+    file_path: str,
+    fetch: Callable[[str, date, date], pd.DataFrame] = fetch_stock_data,
+    today: date | None = None,
+    chunk_days: int = CHUNK_DAYS,
+    first_date: date = FIRST_DATE,
+    naive_dates: bool = False,
+) -> int:
+    """Appends the bars after the last stored one; returns the number of new rows.
+
+    naive_dates stores plain "YYYY-MM-DD" trading days instead of exchange-local timestamps.
+    """
+    repair_torn_tail(file_path)
+
+    last = last_stored_date(file_path)
+    start = last + timedelta(days=1) if last else first_date
+    end = (today or date.today()) + timedelta(days=1)
+
+    added = 0
+    for chunk_start, chunk_end in chunks(start, end, chunk_days):
+        data = normalize(fetch(ticker, chunk_start, chunk_end))
+        if last is not None:
+            # Providers may return the boundary bar again
+            data = data[date_keys(data.index) > last.isoformat()]
+        if data.empty:
+            continue
+        if naive_dates:
+            data.index = pd.DatetimeIndex(date_keys(data.index), name="Date")
+
+        # Every chunk is committed on its own, so an interrupted backfill resumes after the last stored bar
+        append_rows(data, file_path)
+        last = date.fromisoformat(date_keys(data.index)[-1])
+        added += len(data)
+
+    print(f"[Fetch data] - {ticker}: {added} new rows, last bar {last}")
+    return added
+
+
+def find_gaps(file_path: str, gap_days: int = GAP_DAYS) -> list[tuple[date, date]]:
+    dates = pd.to_datetime(date_keys(pd.read_csv(file_path, usecols=["Date"])["Date"]), format='%Y-%m-%d')
+    dates = dates.sort_values()
+    holes = dates[1:] - dates[:-1] > pd.Timedelta(days=gap_days)
+    return [
+        (before.date() + timedelta(days=1), after.date())
+        for before, after in zip(dates[:-1][holes], dates[1:][holes])
+    ]
+
+
+def repair_prices(
+    ticker: str,
+    file_path: str,
+    fetch: Callable[[str, date, date], pd.DataFrame] = fetch_stock_data,
+    gap_days: int = GAP_DAYS,
+) -> int:
+    """Backfills holes inside the stored range and removes duplicate dates; rewrites the file atomically."""
+    repair_torn_tail(file_path)
+    gaps = find_gaps(file_path, gap_days)
+
+    stored = pd.read_csv(file_path, index_col="Date")
+    fetched = [fetch(ticker, start, end) for start, end in gaps]
+    merged = normalize(pd.concat([stored, *[normalize(data) for data in fetched]]))
+
+    write_atomic(merged, file_path)
+    print(f"[Fetch data] - {ticker}: {len(gaps)} gaps backfilled, {len(stored)} -> {len(merged)} rows")
+    return len(merged) - len(stored)
+
+
+def rebuild_prices(
+    ticker: str,
+    file_path: str,
+    fetch: Callable[[str, date, date], pd.DataFrame] = fetch_stock_data,
+    today: date | None = None,
+    chunk_days: int = CHUNK_DAYS,
+    first_date: date = FIRST_DATE,
+) -> int:
+    """Full history into a side file in chunks, swapped in at the end; rerunning resumes an interrupted rebuild."""
+    partial_path = f"{file_path}.rebuild"
+    rows = update_prices(ticker, partial_path, fetch, today, chunk_days, first_date)
+    os.replace(partial_path, file_path)
+    return rows
 
-def fetch_stock_data(ticker: str, period: str, interval: str) -> pd.DataFrame:
-    sp500 = yf.Ticker(ticker)
-    sp500 = sp500.history(period=period, interval=interval)
-    return sp500
-
-def save_data(data: pd.DataFrame, directory: str, filename: str) -> None:
-    if data is not None:
-        raw_data_directory = directory
-        if not os.path.exists(raw_data_directory):
-            os.makedirs(raw_data_directory)
-        filename = f"{filename}.csv"
-        file_path = os.path.join(raw_data_directory, filename)
-        file_exists = os.path.isfile(file_path)
-        print(data.head())
-        if file_exists:
-            data.to_csv(file_path, mode='a', header=False, index=True)
-        else:
-            data.to_csv(file_path, index=True)
 
 def main():
-    df = fetch_stock_data("^GSPC", "1d", "1d")
-    save_data(df, "data/raw/stock", "sp500")
+    parser = argparse.ArgumentParser(description="Incrementally fetch daily bars into data/raw/stock")
+    parser.add_argument("--ticker", default="^GSPC")
+    parser.add_argument("--name", default="sp500", help="file name in data/raw/stock, without .csv")
+    parser.add_argument("--repair", action="store_true", help="backfill holes and drop duplicate dates")
+    parser.add_argument("--rebuild", action="store_true", help="refetch the full history")
+    args = parser.parse_args()
+
+    file_path = os.path.join(RAW_DIRECTORY, f"{args.name}.csv")
+
+    if args.rebuild:
+        rebuild_prices(args.ticker, file_path)
+    elif args.repair:
+        repair_prices(args.ticker, file_path)
+    else:
+        update_prices(args.ticker, file_path)
 
 
 if __name__ == "__main__":
     main()
 
 # ^GSPC: Period is invalid, must be one of ['1d', '5d', '1mo', '3mo', '6mo', '1y', '2y', '5y', '10y', 'ytd', 'max']
-# ^GSPC: Invalid input - interval is not supported. Valid intervals: [1m, 2m, 5m, 15m, 30m, 60m, 90m, 1h, 1d, 5d, 1wk, 1mo, 3mo]
\ No newline at end of file
+# ^GSPC: Invalid input - interval is not supported. Valid intervals: [1m, 2m, 5m, 15m, 30m, 60m, 90m, 1h, 1d, 5d, 1wk, 1mo, 3mo]
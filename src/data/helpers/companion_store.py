@@ -0,0 +1,65 @@
+import os
+from datetime import date
+from typing import Callable
+
+import numpy as np
+import pandas as pd
+
+from src.data.fetch_data import fetch_stock_data, update_prices
+
+COMPANION_DIRECTORY = "data/raw/companion"
+# Secondary series merged into the processed S&P 500 data: file name -> (ticker, first bar on Yahoo Finance)
+COMPANIONS = {
+    "ndx": ("^NDX", date(1985, 10, 1)),
+}
+
+
+def companion_path(name: str, directory: str = COMPANION_DIRECTORY) -> str:
+    return os.path.join(directory, f"{name}.csv")
+
+
+def update_companion(
+    name: str,
+    directory: str = COMPANION_DIRECTORY,
+    fetch: Callable[[str, date, date], pd.DataFrame] = fetch_stock_data,
+    today: date | None = None,
+) -> int:
+    """Appends new bars of a companion ticker; offline, the cached bars are used as they are."""
+    ticker, first_date = COMPANIONS[name]
+    file_path = companion_path(name, directory)
+    try:
+        return update_prices(ticker, file_path, fetch, today, first_date=first_date, naive_dates=True)
+    except Exception as e:
+        if not os.path.isfile(file_path):
+            raise
+        print(f"[Companion store] - {ticker} not updated, using cached bars: {e}")
+        return 0
+
+
+def load_companion(name: str, column: str = "Open", directory: str = COMPANION_DIRECTORY) -> pd.Series:
+    # Dates are stored timezone-free, so they parse straight into a sorted datetime64 index
+    data = pd.read_csv(
+        companion_path(name, directory), usecols=["Date", column], parse_dates=["Date"], float_precision="round_trip",
+    )
+    series = data.set_index("Date")[column]
+    series = series[~series.index.duplicated(keep="last")]
+    return series.sort_index()
+
+
+def asof_join(dates: pd.Series, series: pd.Series, tolerance: pd.Timedelta = pd.Timedelta(0)) -> np.ndarray:
+    """Latest value of series at or before each date, NaN if it is older than tolerance.
+
+    series must have a sorted, unique datetime index. The default tolerance only matches the
+    same day, which gives the same result as a left merge on Date.
+    """
+    lookup = dates.to_numpy("datetime64[ns]")
+    if series.empty:
+        return np.full(len(lookup), np.nan)
+    index = series.index.to_numpy("datetime64[ns]")
+    values = series.to_numpy(dtype=np.float64)
+
+    position = np.searchsorted(index, lookup, side="right") - 1
+    found = position >= 0
+    position = np.clip(position, 0, None)
+    found &= (lookup - index[position]) <= tolerance.to_timedelta64()
+    return np.where(found, values[position], np.nan)
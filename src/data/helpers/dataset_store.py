@@ -0,0 +1,128 @@
+import hashlib
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.ipc as ipc
+
+PARTITION_FILE = "part.arrow"
+# Everything not listed here is stored as float32, which is what the ONNX models take as input anyway
+COLUMN_TYPES = {
+    "Date": pa.timestamp("s"),
+    "Volume": pa.int64(),
+    "Target": pa.int8(),
+}
+# Written by to_csv(index=True) in process_data, only a row number
+DROPPED_COLUMNS = ["Unnamed: 0"]
+
+
+def column_type(column: str) -> pa.DataType:
+    return COLUMN_TYPES.get(column, pa.float32())
+
+
+def to_table(frame: pd.DataFrame) -> pa.Table:
+    frame = frame.drop(columns=[column for column in DROPPED_COLUMNS if column in frame.columns])
+    arrays = {}
+    for column in frame.columns:
+        kind = column_type(column)
+        if pa.types.is_timestamp(kind):
+            values = frame[column]
+            if not pd.api.types.is_datetime64_any_dtype(values):
+                # Raw CSV dates carry the exchange offset, "2024-05-01 00:00:00-04:00"
+                values = pd.to_datetime(values.str[:10], format="%Y-%m-%d")
+            values = values.dt.tz_localize(None) if values.dt.tz is not None else values
+            values = values.to_numpy("datetime64[s]")
+        else:
+            values = frame[column].to_numpy(dtype=kind.to_pandas_dtype())
+        # Straight from numpy, so NaN stays a float value instead of becoming a null
+        arrays[column] = pa.array(values, type=kind)
+    return pa.table(arrays)
+
+
+def partition_path(root: str, year: int) -> str:
+    return os.path.join(root, f"year={year}", PARTITION_FILE)
+
+
+def partition_years(root: str) -> list[int]:
+    if not os.path.isdir(root):
+        return []
+    return sorted(int(name[5:]) for name in os.listdir(root) if name.startswith("year="))
+
+
+def write_partition(table: pa.Table, path: str) -> None:
+    # Uncompressed IPC file, so readers can map it instead of decoding it; swapped in atomically
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with pa.OSFile(tmp_path, "wb") as sink, ipc.new_file(sink, table.schema) as writer:
+        writer.write_table(table)
+    os.replace(tmp_path, path)
+
+
+def split_years(table: pa.Table) -> dict[int, pa.Table]:
+    years = table.column("Date").to_numpy().astype("datetime64[Y]").astype(int) + 1970
+    return {int(year): table.filter(pa.array(years == year)) for year in np.unique(years)}
+
+
+def write_dataset(frame: pd.DataFrame | pa.Table, root: str) -> None:
+    """Replaces the dataset at root with frame, one Arrow IPC file per calendar year of Date."""
+    table = frame if isinstance(frame, pa.Table) else to_table(frame)
+    parts = split_years(table)
+    for year, part in parts.items():
+        write_partition(part, partition_path(root, year))
+    for year in set(partition_years(root)) - set(parts):
+        shutil.rmtree(os.path.dirname(partition_path(root, year)))
+
+
+def append_dataset(frame: pd.DataFrame | pa.Table, root: str) -> None:
+    """Rows from frame's first date onward replace what is stored; only the touched years are rewritten."""
+    table = frame if isinstance(frame, pa.Table) else to_table(frame)
+    first = table.column("Date").to_numpy().min()
+    for year, part in split_years(table).items():
+        path = partition_path(root, year)
+        if os.path.isfile(path):
+            stored = read_partition(path, memory_map=False)
+            keep = stored.filter(pa.array(stored.column("Date").to_numpy() < first))
+            part = pa.concat_tables([keep, part.cast(keep.schema)])
+        write_partition(part, path)
+
+
+def read_partition(path: str, columns: list[str] | None = None, memory_map: bool = True) -> pa.Table:
+    # A memory-mapped read allocates nothing for the column data, buffers point into the page cache
+    source = pa.memory_map(path) if memory_map else pa.OSFile(path)
+    table = ipc.open_file(source).read_all()
+    return table.select(columns) if columns is not None else table
+
+
+def read_dataset(
+    root: str,
+    columns: list[str] | None = None,
+    years: tuple[int | None, int | None] = (None, None),
+    memory_map: bool = True,
+) -> pa.Table:
+    """Reads the projected columns of the partitions within years (inclusive), zero-copy when memory mapped."""
+    low, high = years
+    selected = [
+        year for year in partition_years(root)
+        if (low is None or year >= low) and (high is None or year <= high)
+    ]
+    if not selected:
+        raise FileNotFoundError(f"No partitions in {root} for years {years}")
+    return pa.concat_tables([read_partition(partition_path(root, year), columns, memory_map) for year in selected])
+
+
+def dataset_hash(root: str) -> str:
+    # Content of every partition, so a rewritten file with the same mtime still counts as a change
+    digest = hashlib.sha256()
+    for year in partition_years(root):
+        digest.update(f"{year}:".encode())
+        with open(partition_path(root, year), "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                digest.update(chunk)
+    return digest.hexdigest()
+
+
+def to_frame(table: pa.Table) -> pd.DataFrame:
+    # split_blocks lets pandas keep single-chunk columns as views over the Arrow buffers
+    return table.to_pandas(split_blocks=True)
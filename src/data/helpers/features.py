@@ -0,0 +1,90 @@
+import numpy as np
+
+HORIZONS = [2, 5, 60, 250, 1000]
+
+
+def empty_state(horizons: list[int] = HORIZONS) -> dict:
+    # Prefix sums over all rows seen so far, only the tail a window can still reach is kept
+    return {
+        "horizons": np.array(horizons),
+        "rows": np.array(0),
+        "close_sum": np.array([0.0]),
+        "close_count": np.array([0]),
+        "target_sum": np.array([0]),
+    }
+
+
+def extend_prefix(tail: np.ndarray, values: np.ndarray) -> np.ndarray:
+    # np.cumsum adds strictly left to right, so continuing from a saved prefix gives the
+    # same bits as one pass over the whole history
+    return np.concatenate([tail, np.cumsum(np.concatenate([tail[-1:], values]))[1:]])
+
+
+def window_sums(prefix: np.ndarray, offset: int, first: int, total: int, horizon: int) -> np.ndarray:
+    """Sum of the `horizon` values ending at each row in [first, total), NaN until a full window exists.
+
+    prefix[k - offset] holds the sum of the first k values; both sides of the difference are
+    plain slices, so a horizon costs two reads of the prefix array and no per-row indexing.
+    """
+    sums = np.full(total - first, np.nan)
+    start = max(first, horizon - 1)
+    if start < total:
+        sums[start - first:] = (
+            prefix[start + 1 - offset:total + 1 - offset]
+            - prefix[start + 1 - horizon - offset:total + 1 - horizon - offset]
+        )
+    return sums
+
+
+def horizon_features(close: np.ndarray, state: dict | None = None) -> tuple[int, dict[str, np.ndarray], dict]:
+    """Tomorrow, Target, Close_Ratio_h and Trend_h for every horizon, from one cumulative-sum pass over close.
+
+    With a state from a previous call only the rows after it are computed, starting with the
+    last row of that call (its Target was not known yet). Returns the first computed row,
+    the feature columns and the state for the next call.
+    """
+    state = state or empty_state()
+    horizons = [int(h) for h in state["horizons"]]
+    keep = max(horizons) + 1
+    n, total = int(state["rows"]), len(close)
+    first = max(n - 1, 0)
+
+    new_close = close[n:]
+    valid = ~np.isnan(new_close)
+    # P[k] = sum of the first k closes, prefix arrays start at index p0
+    close_sum = extend_prefix(state["close_sum"], np.where(valid, new_close, 0.0))
+    close_count = extend_prefix(state["close_count"], valid.astype(np.int64))
+    p0 = n + 1 - len(state["close_sum"])
+
+    # Target of the previous last row is known now, the new last row stays provisional (0)
+    tomorrow = np.append(close[first + 1:], np.nan)
+    target = (tomorrow > close[first:]).astype(np.int64)
+    final_targets = max(n - 1, 0)
+    target_sum = extend_prefix(state["target_sum"], target[final_targets - first:total - 1 - first])
+    t0 = final_targets + 1 - len(state["target_sum"])
+
+    features = {"Tomorrow": tomorrow, "Target": target}
+    for horizon in horizons:
+        sums = window_sums(close_sum, p0, first, total, horizon)
+        counts = window_sums(close_count, p0, first, total, horizon)
+        # A missing close anywhere in the window leaves it incomplete, like rolling(horizon).mean()
+        sums[counts != horizon] = np.nan
+        features[f"Close_Ratio_{horizon}"] = close[first:] / (sums / horizon)
+        # Trend = number of up days among the previous `horizon` days, i.e. the window ending a row earlier
+        features[f"Trend_{horizon}"] = window_sums(target_sum, t0, first - 1, total - 1, horizon)
+
+    new_state = {
+        **state,
+        "rows": np.array(total),
+        "close_sum": close_sum[-keep:],
+        "close_count": close_count[-keep:],
+        "target_sum": target_sum[-keep:],
+    }
+    return first, features, new_state
+
+
+def latest_horizon_features(close: np.ndarray, horizons: list[int] = HORIZONS) -> dict[str, float]:
+    # Features of the newest bar, e.g. for serving; needs max(horizons) + 1 closes to fill every window
+    close = np.asarray(close, dtype=np.float64)[-(max(horizons) + 1):]
+    _, features, _ = horizon_features(close, empty_state(horizons))
+    return {name: float(values[-1]) for name, values in features.items() if name not in ("Tomorrow", "Target")}
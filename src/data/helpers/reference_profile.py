@@ -0,0 +1,220 @@
+import json
+import math
+import os
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from src.data.helpers.dataset_store import partition_path, partition_years, read_partition, to_frame
+
+PROFILE_FILE = "data/reference_profile.json"
+# Quantiles are within 1% of the true value; the bucket grid is the same for every sketch, so sketches merge exactly
+RELATIVE_ACCURACY = 0.01
+GAMMA = (1 + RELATIVE_ACCURACY) / (1 - RELATIVE_ACCURACY)
+LOG_GAMMA = math.log(GAMMA)
+# Magnitudes below this share the zero bucket
+MIN_VALUE = 1e-9
+KEY_OFFSET = 1 - math.ceil(math.log(MIN_VALUE) / LOG_GAMMA)
+# Monthly periods kept for rolling windows, older ones are dropped so the profile does not grow with history
+MAX_PERIODS = int(os.getenv("PROFILE_MAX_PERIODS", "360"))
+
+
+def bucket_keys(values: np.ndarray) -> np.ndarray:
+    """Ordered bucket key per value: negative keys for negative values, 0 for ~zero, positive keys above."""
+    magnitude = np.abs(values)
+    keys = np.zeros(len(values), dtype=np.int64)
+    nonzero = magnitude >= MIN_VALUE
+    index = np.ceil(np.log(magnitude[nonzero]) / LOG_GAMMA).astype(np.int64) + KEY_OFFSET
+    keys[nonzero] = np.where(values[nonzero] > 0, index, -index)
+    return keys
+
+
+def bucket_values(keys: np.ndarray) -> np.ndarray:
+    # Value with the smallest relative error to everything in the bucket (gamma^(i-1), gamma^i]
+    index = np.abs(keys) - KEY_OFFSET
+    return np.where(keys == 0, 0.0, np.sign(keys) * 2 * GAMMA ** index.astype(np.float64) / (GAMMA + 1))
+
+
+@dataclass(frozen=True)
+class ColumnSketch:
+    # Sorted bucket keys and their counts - the histogram the quantiles and CDF are read from
+    keys: np.ndarray
+    counts: np.ndarray
+    count: int
+    missing: int
+    mean: float
+    m2: float
+    minimum: float
+    maximum: float
+
+    @property
+    def std(self) -> float:
+        return math.sqrt(self.m2 / (self.count - 1)) if self.count > 1 else float("nan")
+
+    def quantiles(self, q) -> np.ndarray:
+        if self.count == 0:
+            return np.full(np.shape(q), np.nan)
+        rank = np.asarray(q) * (self.count - 1)
+        bucket = np.searchsorted(np.cumsum(self.counts), rank, side="right")
+        return np.clip(bucket_values(self.keys[np.minimum(bucket, len(self.keys) - 1)]), self.minimum, self.maximum)
+
+    def to_dict(self) -> dict:
+        return {
+            "keys": self.keys.tolist(), "counts": self.counts.tolist(), "count": self.count, "missing": self.missing,
+            "mean": self.mean, "m2": self.m2, "minimum": self.minimum, "maximum": self.maximum,
+        }
+
+    @staticmethod
+    def from_dict(data: dict) -> "ColumnSketch":
+        return ColumnSketch(
+            np.array(data["keys"], dtype=np.int64), np.array(data["counts"], dtype=np.int64),
+            data["count"], data["missing"], data["mean"], data["m2"], data["minimum"], data["maximum"],
+        )
+
+
+EMPTY_SKETCH = ColumnSketch(np.zeros(0, np.int64), np.zeros(0, np.int64), 0, 0, 0.0, 0.0, float("inf"), float("-inf"))
+
+
+def sketch_values(values) -> ColumnSketch:
+    values = np.asarray(values, dtype=np.float64)
+    valid = values[~np.isnan(values)]
+    missing = len(values) - len(valid)
+    if len(valid) == 0:
+        return ColumnSketch(EMPTY_SKETCH.keys, EMPTY_SKETCH.counts, 0, missing, 0.0, 0.0, float("inf"), float("-inf"))
+
+    keys, counts = np.unique(bucket_keys(valid), return_counts=True)
+    mean = float(valid.mean())
+    return ColumnSketch(
+        keys, counts.astype(np.int64), len(valid), missing,
+        mean, float(((valid - mean) ** 2).sum()), float(valid.min()), float(valid.max()),
+    )
+
+
+def align(a: ColumnSketch, b: ColumnSketch) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    # Both histograms on the union of their buckets
+    keys = np.union1d(a.keys, b.keys)
+    counts_a = np.zeros(len(keys), dtype=np.int64)
+    counts_b = np.zeros(len(keys), dtype=np.int64)
+    counts_a[np.searchsorted(keys, a.keys)] = a.counts
+    counts_b[np.searchsorted(keys, b.keys)] = b.counts
+    return keys, counts_a, counts_b
+
+
+def merge_sketches(a: ColumnSketch, b: ColumnSketch) -> ColumnSketch:
+    keys, counts_a, counts_b = align(a, b)
+    count = a.count + b.count
+    if count == 0:
+        return ColumnSketch(keys, counts_a + counts_b, 0, a.missing + b.missing, 0.0, 0.0, float("inf"), float("-inf"))
+
+    # Chan et al. pairwise update, so merging periods gives the moments of the combined data
+    delta = b.mean - a.mean
+    mean = a.mean + delta * b.count / count
+    m2 = a.m2 + b.m2 + delta ** 2 * a.count * b.count / count
+    return ColumnSketch(
+        keys, counts_a + counts_b, count, a.missing + b.missing,
+        mean, m2, min(a.minimum, b.minimum), max(a.maximum, b.maximum),
+    )
+
+
+def merge_profiles(a: dict[str, ColumnSketch], b: dict[str, ColumnSketch]) -> dict[str, ColumnSketch]:
+    return {column: merge_sketches(a.get(column, EMPTY_SKETCH), b.get(column, EMPTY_SKETCH)) for column in {**a, **b}}
+
+
+def sketch_frame(frame: pd.DataFrame) -> dict[str, ColumnSketch]:
+    return {column: sketch_values(frame[column].to_numpy()) for column in frame.select_dtypes("number").columns}
+
+
+class ReferenceProfile:
+    """Per-month column sketches of the reference data; windows merge the most recent months."""
+
+    def __init__(self, periods: dict[str, dict[str, ColumnSketch]] | None = None, last_date: str | None = None, max_periods: int = MAX_PERIODS):
+        self.periods = periods or {}
+        self.last_date = last_date
+        self.max_periods = max_periods
+
+    def update(self, frame: pd.DataFrame, date_column: str = "Date", before=None) -> int:
+        """Adds the rows after the last profiled date (and before `before`); returns how many were added."""
+        dates = pd.to_datetime(frame[date_column]).to_numpy("datetime64[D]")
+        keep = np.ones(len(dates), dtype=bool)
+        if self.last_date is not None:
+            keep &= dates > np.datetime64(self.last_date)
+        if before is not None:
+            keep &= dates < np.datetime64(before, "D")
+        frame, dates = frame[keep], dates[keep]
+        if len(frame) == 0:
+            return 0
+
+        months = dates.astype("datetime64[M]")
+        data = frame.drop(columns=[date_column])
+        for month in np.unique(months):
+            period = str(month)
+            sketch = sketch_frame(data[months == month])
+            self.periods[period] = merge_profiles(self.periods.get(period, {}), sketch)
+
+        for period in sorted(self.periods)[:-self.max_periods]:
+            del self.periods[period]
+        self.last_date = str(dates.max())
+        return len(frame)
+
+    def window(self, periods: int | None = None) -> dict[str, ColumnSketch]:
+        """Merged sketches of the last `periods` months, or of everything kept."""
+        selected = sorted(self.periods)
+        if periods is not None:
+            selected = selected[-periods:]
+        merged: dict[str, ColumnSketch] = {}
+        for period in selected:
+            merged = merge_profiles(merged, self.periods[period])
+        return merged
+
+    def save(self, path: str = PROFILE_FILE) -> None:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        data = {
+            "relative_accuracy": RELATIVE_ACCURACY,
+            "last_date": self.last_date,
+            "periods": {
+                period: {column: sketch.to_dict() for column, sketch in columns.items()}
+                for period, columns in self.periods.items()
+            },
+        }
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(data, f)
+        os.replace(tmp_path, path)
+
+    @staticmethod
+    def load(path: str = PROFILE_FILE, max_periods: int = MAX_PERIODS) -> "ReferenceProfile":
+        if not os.path.exists(path):
+            return ReferenceProfile(max_periods=max_periods)
+        with open(path) as f:
+            data = json.load(f)
+        if data["relative_accuracy"] != RELATIVE_ACCURACY:
+            # Different bucket grid, the sketches cannot be merged with new ones
+            return ReferenceProfile(max_periods=max_periods)
+        periods = {
+            period: {column: ColumnSketch.from_dict(sketch) for column, sketch in columns.items()}
+            for period, columns in data["periods"].items()
+        }
+        return ReferenceProfile(periods, data["last_date"], max_periods)
+
+
+def update_profile(root: str, profile_file: str = PROFILE_FILE) -> int:
+    """Adds the rows of the dataset at root that are newer than the profile; returns how many.
+
+    The newest row is left out: it has no Tomorrow/Target yet and process_data rewrites it on the
+    next run, when it is no longer the newest and gets profiled with its final values.
+    """
+    profile = ReferenceProfile.load(profile_file)
+    years = partition_years(root)
+    if not years:
+        raise FileNotFoundError(f"No partitions in {root}")
+    provisional = read_partition(partition_path(root, years[-1]), ["Date"]).column("Date").to_numpy().max()
+    first_year = int(profile.last_date[:4]) if profile.last_date is not None else None
+    added = 0
+    # One year partition in memory at a time
+    for year in years:
+        if first_year is None or year >= first_year:
+            added += profile.update(to_frame(read_partition(partition_path(root, year))), before=provisional)
+    profile.save(profile_file)
+    print(f"[Reference profile] - {added} new rows, {len(profile.periods)} months, last date {profile.last_date}")
+    return added
@@ -1,36 +1,387 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+from dataclasses import asdict, dataclass
+
 import numpy as np
 import pandas as pd
+from scipy.special import kolmogorov
+
+from src.data.helpers.dataset_store import dataset_hash
+from src.data.helpers.reference_profile import (
+    EMPTY_SKETCH, PROFILE_FILE, ColumnSketch, ReferenceProfile, align, bucket_values, merge_sketches, sketch_values,
+)
+from src.models.helpers.helper_dataset import load_dataset
+
+DRIFT_CACHE_DIR = os.getenv("DRIFT_CACHE_DIR", ".cache/drift")
+# Sorted references kept on disk; the reference changes at every checkpoint, older ones are not read again
+DRIFT_CACHE_KEEP = int(os.getenv("DRIFT_CACHE_KEEP", "2"))
+REPORT_FILE = "reports/drift/ks.json"
+PROFILE_REPORT_FILE = "reports/drift/profile.json"
+# Rows per Arrow batch of the current data when it is streamed against a profile
+BATCH_ROWS = 65536
+PSI_BINS = 10
+# Empty bins would make PSI infinite
+PSI_EPSILON = 1e-6
+STATISTICS = ("psi", "wasserstein")
+
+
+@dataclass(frozen=True)
+class SortedSample:
+    columns: tuple[str, ...]
+    # (rows, columns) in column-major order, every column ascending with its NaNs at the end
+    values: np.ndarray
+    counts: np.ndarray
+    # (rows + 1, columns), prefix[k, j] = sum of the k smallest values of column j
+    prefix: np.ndarray
+
+    def column(self, name: str) -> np.ndarray:
+        j = self.columns.index(name)
+        return self.values[:self.counts[j], j]
+
+    def column_prefix(self, name: str) -> np.ndarray:
+        j = self.columns.index(name)
+        return self.prefix[:self.counts[j] + 1, j]
+
+
+@dataclass(frozen=True)
+class ColumnDrift:
+    statistic: float
+    p_value: float
+    drift: bool
+    reference_size: int
+    current_size: int
+    psi: float | None = None
+    wasserstein: float | None = None
+
+
+@dataclass(frozen=True)
+class DriftReport:
+    alpha: float
+    columns: dict[str, ColumnDrift]
+
+    @property
+    def drifted(self) -> list[str]:
+        return [name for name, result in self.columns.items() if result.drift]
+
+    def to_dict(self) -> dict:
+        return {
+            "alpha": self.alpha,
+            "drifted": self.drifted,
+            "columns": {name: asdict(result) for name, result in self.columns.items()},
+        }
+
+
+def numeric_columns(frame: pd.DataFrame) -> list[str]:
+    # Date has no distribution to compare
+    return list(frame.select_dtypes("number").columns)
+
+
+def sort_sample(frame: pd.DataFrame, columns: list[str] | None = None) -> SortedSample:
+    columns = numeric_columns(frame) if columns is None else columns
+    # One sort call for all columns; np.sort puts NaN last, so each column is a prefix of valid values.
+    # Column-major, so a column is one contiguous block - also when memory mapped from the cache
+    values = np.sort(np.asfortranarray(frame[columns].to_numpy(dtype=np.float64)), axis=0)
+    counts = (~np.isnan(values)).sum(axis=0)
+    prefix = np.zeros((len(values) + 1, len(columns)), order="F")
+    np.cumsum(values, axis=0, out=prefix[1:])
+    return SortedSample(tuple(columns), values, counts, prefix)
+
+
+def sample_hash(frame: pd.DataFrame, columns: list[str]) -> str:
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(json.dumps(columns).encode())
+    # Frames from the pipeline carry the hash of their dataset files, no need to hash the values again
+    if "content_hash" in frame.attrs:
+        digest.update(frame.attrs["content_hash"].encode())
+        return digest.hexdigest()
+    for column in columns:
+        values = np.ascontiguousarray(frame[column].to_numpy())
+        digest.update(f"{column}:{values.dtype}:".encode())
+        digest.update(values.data)
+    return digest.hexdigest()
+
+
+def sorted_reference(frame: pd.DataFrame, columns: list[str] | None = None, cache_dir: str | None = DRIFT_CACHE_DIR) -> SortedSample:
+    """Sorted reference columns, cached on disk by content - the reference only changes at a checkpoint."""
+    columns = numeric_columns(frame) if columns is None else columns
+    if cache_dir is None:
+        return sort_sample(frame, columns)
+
+    folder = os.path.join(cache_dir, f"reference-{sample_hash(frame, columns)}")
+    if os.path.isdir(folder):
+        # Marks it as recently used for evict_references
+        os.utime(folder)
+        return load_sorted(folder)
+
+    sample = sort_sample(frame, columns)
+    os.makedirs(cache_dir, exist_ok=True)
+    tmp_folder = tempfile.mkdtemp(dir=cache_dir)
+    np.save(os.path.join(tmp_folder, "values.npy"), sample.values)
+    np.save(os.path.join(tmp_folder, "prefix.npy"), sample.prefix)
+    with open(os.path.join(tmp_folder, "meta.json"), "w") as f:
+        json.dump({"columns": list(sample.columns), "counts": sample.counts.tolist()}, f)
+    try:
+        os.rename(tmp_folder, folder)
+    except OSError:
+        # Another run cached the same reference first
+        shutil.rmtree(tmp_folder)
+    evict_references(cache_dir)
+    return sample
+
+
+def evict_references(cache_dir: str, keep: int = DRIFT_CACHE_KEEP) -> None:
+    folders = [entry for entry in os.scandir(cache_dir) if entry.is_dir() and entry.name.startswith("reference-")]
+    folders.sort(key=lambda entry: entry.stat().st_mtime, reverse=True)
+    for entry in folders[keep:]:
+        # Readers that still map the files keep them until they are done, removal only unlinks them
+        shutil.rmtree(entry.path, ignore_errors=True)
+
+
+def load_sorted(folder: str) -> SortedSample:
+    # Memory mapped: a drift check only reads the pages its binary searches land on
+    with open(os.path.join(folder, "meta.json")) as f:
+        meta = json.load(f)
+    return SortedSample(
+        tuple(meta["columns"]),
+        np.load(os.path.join(folder, "values.npy"), mmap_mode="r"),
+        np.array(meta["counts"]),
+        np.load(os.path.join(folder, "prefix.npy"), mmap_mode="r"),
+    )
+
+
+def ks_statistic(reference: np.ndarray, current: np.ndarray) -> float:
+    """Exact two-sample KS statistic sup |F_ref - F_cur| of two sorted, NaN-free samples.
+
+    Between two distinct current values F_cur is constant and F_ref only grows, so the supremum
+    is reached at a current value or just before one. That needs len(current) binary searches
+    into the reference and never touches the whole reference.
+    """
+    if len(reference) == 0 or len(current) == 0:
+        return np.nan
+    ends = np.flatnonzero(np.append(current[1:] != current[:-1], True)) + 1
+    points = current[ends - 1]
+    cdf_current = ends / len(current)
+    cdf_current_before = np.concatenate([[0.0], cdf_current[:-1]])
+
+    cdf_reference = np.searchsorted(reference, points, side="right") / len(reference)
+    cdf_reference_before = np.searchsorted(reference, points, side="left") / len(reference)
+    return float(max(
+        np.abs(cdf_reference - cdf_current).max(),
+        np.abs(cdf_reference_before - cdf_current_before).max(),
+    ))
+
+
+def ks_p_values(statistics: np.ndarray, reference_sizes: np.ndarray, current_sizes: np.ndarray) -> np.ndarray:
+    # Asymptotic (Kolmogorov distribution) p-value, for all columns at once
+    with np.errstate(divide="ignore", invalid="ignore"):
+        effective = np.sqrt(reference_sizes * current_sizes / (reference_sizes + current_sizes))
+    return kolmogorov(effective * statistics)
+
+
+def psi(reference: np.ndarray, current: np.ndarray, bins: int = PSI_BINS) -> float:
+    # Population stability index over the reference deciles
+    if len(reference) == 0 or len(current) == 0:
+        return np.nan
+    edges = np.unique(reference[(np.arange(1, bins) * (len(reference) - 1)) // bins])
+    expected = np.diff(np.searchsorted(reference, edges, side="right"), prepend=0, append=len(reference)) / len(reference)
+    actual = np.diff(np.searchsorted(current, edges, side="right"), prepend=0, append=len(current)) / len(current)
+    return psi_from_shares(expected, actual)
+
+
+def psi_from_shares(expected: np.ndarray, actual: np.ndarray) -> float:
+    expected, actual = np.clip(expected, PSI_EPSILON, None), np.clip(actual, PSI_EPSILON, None)
+    return float(np.sum((actual - expected) * np.log(actual / expected)))
+
+
+def wasserstein(reference: np.ndarray, current: np.ndarray, reference_prefix: np.ndarray | None = None) -> float:
+    """Area between the two empirical CDFs, from binary searches and the reference prefix sums.
+
+    F_cur is a constant t between two distinct current values; over such an interval the area
+    |F_ref - t| splits where F_ref reaches t, and the integral of F_ref up to x is
+    (k * x - prefix[k]) / n with k = #(reference <= x).
+    """
+    if len(reference) == 0 or len(current) == 0:
+        return np.nan
+    n, m = len(reference), len(current)
+    if reference_prefix is None:
+        reference_prefix = np.concatenate([[0.0], np.cumsum(reference)])
+
+    def area(x):
+        k = np.searchsorted(reference, x, side="right")
+        return (k * x - reference_prefix[k]) / n
+
+    ends = np.flatnonzero(np.append(current[1:] != current[:-1], True)) + 1
+    points = current[ends - 1]
+    # Intervals (-inf, p0), [p0, p1), ..., [p_last, +inf) with F_cur = 0, ends/m..., 1
+    low = np.concatenate([[min(reference[0], points[0])], points])
+    high = np.concatenate([points, [max(reference[-1], points[-1])]])
+    below = np.concatenate([[0], ends])
+    level = below / m
+
+    # First reference value with F_ref >= level, i.e. the ceil(level * n)-th smallest
+    needed = -(-below * n // m)
+    crossing = np.where(needed >= 1, reference[np.clip(needed - 1, 0, n - 1)], -np.inf)
+    crossing = np.clip(crossing, low, high)
+
+    under = level * (crossing - low) - (area(crossing) - area(low))
+    over = (area(high) - area(crossing)) - level * (high - crossing)
+    return float(np.sum(under + over))
+
+
+def drift_report(
+    reference: pd.DataFrame | SortedSample,
+    current: pd.DataFrame | SortedSample,
+    alpha: float = 0.05,
+    statistics: tuple[str, ...] = (),
+) -> DriftReport:
+    """KS drift of every numeric column; statistics adds "psi" and/or "wasserstein"."""
+    if isinstance(reference, pd.DataFrame):
+        reference = sorted_reference(reference)
+    if isinstance(current, pd.DataFrame):
+        current = sort_sample(current, [column for column in reference.columns if column in current.columns])
+
+    columns = [column for column in current.columns if column in reference.columns]
+    samples = [(reference.column(column), current.column(column)) for column in columns]
+    d = np.array([ks_statistic(ref, cur) for ref, cur in samples])
+    reference_sizes = np.array([len(ref) for ref, _ in samples], dtype=np.float64)
+    current_sizes = np.array([len(cur) for _, cur in samples], dtype=np.float64)
+    p_values = ks_p_values(d, reference_sizes, current_sizes)
+
+    results = {}
+    for j, (column, (ref, cur)) in enumerate(zip(columns, samples)):
+        results[column] = ColumnDrift(
+            statistic=float(d[j]),
+            p_value=float(p_values[j]),
+            drift=bool(p_values[j] < alpha),
+            reference_size=len(ref),
+            current_size=len(cur),
+            psi=psi(ref, cur) if "psi" in statistics else None,
+            wasserstein=wasserstein(ref, cur, reference.column_prefix(column)) if "wasserstein" in statistics else None,
+        )
+    return DriftReport(alpha, results)
+
+
+def sketch_statistics(reference: ColumnSketch, current: ColumnSketch, bins: int = PSI_BINS) -> tuple[float, float, float]:
+    """KS, PSI and Wasserstein distance of two sketches, evaluated on their shared bucket grid.
+
+    Both CDFs are exact at every bucket edge, so KS can only miss a difference inside one bucket,
+    and values are off by at most the sketch's relative accuracy.
+    """
+    if reference.count == 0 or current.count == 0:
+        return np.nan, np.nan, np.nan
+    keys, counts_reference, counts_current = align(reference, current)
+    cdf_reference = np.cumsum(counts_reference) / reference.count
+    cdf_current = np.cumsum(counts_current) / current.count
+    statistic = float(np.abs(cdf_reference - cdf_current).max())
+
+    # Reference deciles rounded to bucket edges
+    edges = np.unique(np.searchsorted(cdf_reference, np.arange(1, bins) / bins))
+    edges = edges[edges < len(keys) - 1]
+    expected = np.diff(np.concatenate([[0.0], cdf_reference[edges], [1.0]]))
+    actual = np.diff(np.concatenate([[0.0], cdf_current[edges], [1.0]]))
+
+    # Between two bucket representatives both CDFs are flat
+    distance = float(np.sum(np.abs(cdf_reference - cdf_current)[:-1] * np.diff(bucket_values(keys))))
+    return statistic, psi_from_shares(expected, actual), distance
+
+
+def profile_drift(
+    reference: dict[str, ColumnSketch],
+    batches,
+    alpha: float = 0.05,
+    statistics: tuple[str, ...] = (),
+) -> DriftReport:
+    """Drift of the current data, given as an iterable of frames, against a profile window.
+
+    The current data is only sketched batch by batch, so memory depends on the batch size and
+    the number of buckets, not on how many rows either side has.
+    """
+    current: dict[str, ColumnSketch] = {}
+    for batch in batches:
+        for column in reference:
+            if column in batch.columns:
+                current[column] = merge_sketches(current.get(column, EMPTY_SKETCH), sketch_values(batch[column].to_numpy()))
+
+    columns = [column for column in reference if column in current]
+    results = [sketch_statistics(reference[column], current[column]) for column in columns]
+    d = np.array([result[0] for result in results])
+    reference_sizes = np.array([reference[column].count for column in columns], dtype=np.float64)
+    current_sizes = np.array([current[column].count for column in columns], dtype=np.float64)
+    p_values = ks_p_values(d, reference_sizes, current_sizes)
+
+    return DriftReport(alpha, {
+        column: ColumnDrift(
+            statistic=float(d[j]),
+            p_value=float(p_values[j]),
+            drift=bool(p_values[j] < alpha),
+            reference_size=reference[column].count,
+            current_size=current[column].count,
+            psi=results[j][1] if "psi" in statistics else None,
+            wasserstein=results[j][2] if "wasserstein" in statistics else None,
+        )
+        for j, column in enumerate(columns)
+    })
 
 
 def ks_test(sample1, sample2):
-    sample1 = sample1.dropna()
-    sample2 = sample2.dropna()
-
-    if np.array_equal(sample1, sample2):
-        # If the samples are equal, return trivial valuesx
-        return 0.0, 1.0
-    else:
-        # Calculate the cumulative distribution functions
-        hist1, bin_edges1 = np.histogram(sample1, bins=100, density=True)
-        hist2, bin_edges2 = np.histogram(sample2, bins=100, density=True)
-        cdf1 = np.cumsum(hist1 * np.diff(bin_edges1))
-        cdf2 = np.cumsum(hist2 * np.diff(bin_edges2))
-        d = np.max(np.abs(cdf1 - cdf2))
-        # Calculate the p-value using an approximation
-        p_value = 1.0 - np.exp(-2 * (d ** 2))
-        return d, p_value
+    sample1 = np.sort(np.asarray(sample1.dropna(), dtype=np.float64))
+    sample2 = np.sort(np.asarray(sample2.dropna(), dtype=np.float64))
+    d = ks_statistic(sample2, sample1)
+    p_value = ks_p_values(np.array([d]), np.array([len(sample2)]), np.array([len(sample1)]))[0]
+    return d, float(p_value)
+
+
+def print_report(report: DriftReport) -> None:
+    for column, result in report.columns.items():
+        if result.drift:
+            print(f"Data drift detected in column {column} with p-value {result.p_value}")
+        else:
+            print(f"No data drift detected in column {column} with p-value {result.p_value}")
+
+
+def write_report(report: DriftReport, report_file: str | None) -> None:
+    if report_file is not None:
+        os.makedirs(os.path.dirname(report_file), exist_ok=True)
+        with open(report_file, "w") as f:
+            json.dump(report.to_dict(), f, indent=2)
+
+
+def ks_report(reference_data, current_data, alpha=0.0, statistics=STATISTICS, report_file=REPORT_FILE):
+    report = drift_report(reference_data, current_data, alpha, statistics)
+    print_report(report)
+    write_report(report, report_file)
+    return report
+
+
+def profile_report(
+    current_data,
+    profile_file=PROFILE_FILE,
+    window=None,
+    alpha=0.0,
+    statistics=STATISTICS,
+    report_file=PROFILE_REPORT_FILE,
+):
+    """Same report as ks_report, against the last `window` months of the reference profile.
+
+    current_data is an Arrow table (memory mapped in the pipeline) and is converted one batch at a time.
+    """
+    profile = ReferenceProfile.load(profile_file)
+    if not profile.periods:
+        raise FileNotFoundError(f"No reference profile in {profile_file}, run the checkpoint first")
+    batches = (batch.to_pandas() for batch in current_data.to_batches(max_chunksize=BATCH_ROWS))
+    report = profile_drift(profile.window(window), batches, alpha, statistics)
+    print_report(report)
+    write_report(report, report_file)
+    return report
 
 
 if __name__ == "__main__":
-    current_data = pd.read_csv("data/current_data.csv")
-    reference_data = pd.read_csv("data/reference_data.csv")
+    current_data = load_dataset("data/current_data")
+    reference_data = load_dataset("data/reference_data")
+    reference_data.attrs["content_hash"] = dataset_hash("data/reference_data")
 
     #alpha = 0.1
-    alpha = 0.0
-
-    for column in current_data.columns:
-        d, p_value = ks_test(current_data[column], reference_data[column])
-        if p_value < alpha:
-            print(f"Data drift detected in column {column} with p-value {p_value}")
-        else:
-            print(f"No data drift detected in column {column} with p-value {p_value}")
\ No newline at end of file
+    ks_report(reference_data, current_data, alpha=0.0)
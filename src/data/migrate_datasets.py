@@ -0,0 +1,33 @@
+import os
+
+import pandas as pd
+
+from src.data.helpers.dataset_store import partition_years, write_dataset
+
+# CSV hand-offs from before the Arrow store; reference_data is only rewritten by run_checkpoint,
+# so without this the drift stages have no reference until someone runs the checkpoint
+LEGACY_DATASETS = [
+    "data/reference_data",
+    "data/current_data",
+    "data/validation/train",
+    "data/validation/test",
+]
+
+
+def migrate_dataset(root: str) -> bool:
+    """Converts <root>.csv into the dataset at root, unless the dataset already exists."""
+    csv_path = f"{root}.csv"
+    if partition_years(root) or not os.path.isfile(csv_path):
+        return False
+    write_dataset(pd.read_csv(csv_path), root)
+    print(f"[Migrate] - {csv_path} -> {root}")
+    return True
+
+
+def main():
+    migrated = [root for root in LEGACY_DATASETS if migrate_dataset(root)]
+    print(f"[Migrate] - {len(migrated)} datasets converted")
+
+
+if __name__ == "__main__":
+    main()
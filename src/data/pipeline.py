@@ -0,0 +1,226 @@
+import argparse
+import hashlib
+import importlib
+import json
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from contextlib import nullcontext
+from dataclasses import dataclass
+
+import pandas as pd
+import pyarrow as pa
+
+from src.data.helpers.dataset_store import dataset_hash, read_dataset, to_frame
+
+DATASETS = {
+    "current": "data/current_data",
+    "reference": "data/reference_data",
+}
+STATE_FILE = "reports/pipeline/state.json"
+TIMINGS_FILE = "reports/pipeline/timings.json"
+
+
+@dataclass(frozen=True)
+class Stage:
+    name: str
+    # "module:function", imported only when the stage runs - a split_data run never loads evidently
+    target: str
+    inputs: tuple[str, ...]
+    outputs: tuple[str, ...] = ()
+    after: tuple[str, ...] = ()
+    # Arrow tables instead of pandas frames
+    arrow: bool = False
+    # Files the stage reads itself; their content is part of the key, they are not loaded
+    files: tuple[str, ...] = ()
+
+
+STAGES = [
+    Stage("validate", "src.data.validate:run_validation", ("reference", "current")),
+    Stage("data_drift", "src.data.data_drift:data_drift", ("reference", "current"), ("reports/sites/data_drift.html",)),
+    Stage("stability_tests", "src.data.stability_tests:stability_tests", ("reference", "current"), ("reports/sites/stability_tests.html",)),
+    Stage("ks_test", "src.data.ks:ks_report", ("reference", "current"), ("reports/drift/ks.json",)),
+    # Against the sketched reference profile, the current data is streamed from the mapped table
+    Stage("profile_drift", "src.data.ks:profile_report", ("current",), ("reports/drift/profile.json",), arrow=True, files=("data/reference_profile.json",)),
+    # Same order as the workflow jobs: data is split only after it was validated
+    Stage("split_data", "src.data.split_data:split_data", ("current",), ("data/validation/train", "data/validation/test"), ("validate",), arrow=True),
+]
+
+
+class Datasets:
+    """Every dataset is read once; stages share the same immutable Arrow table and pandas view of it."""
+
+    def __init__(self, roots: dict[str, str]):
+        self.roots = roots
+        self._tables: dict[str, pa.Table] = {}
+        self._frames: dict[str, pd.DataFrame] = {}
+        self._hashes: dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    def table(self, name: str) -> pa.Table:
+        with self._lock:
+            if name not in self._tables:
+                self._tables[name] = read_dataset(self.roots[name])
+            return self._tables[name]
+
+    def frame(self, name: str) -> pd.DataFrame:
+        table = self.table(name)
+        with self._lock:
+            if name not in self._frames:
+                frame = to_frame(table)
+                # Lets stages key their own caches (e.g. the sorted KS reference) without rehashing the values
+                frame.attrs["content_hash"] = self._content_hash(name)
+                self._frames[name] = frame
+            return self._frames[name]
+
+    def content_hash(self, name: str) -> str:
+        with self._lock:
+            return self._content_hash(name)
+
+    def _content_hash(self, name: str) -> str:
+        if name not in self._hashes:
+            self._hashes[name] = dataset_hash(self.roots[name])
+        return self._hashes[name]
+
+
+def resolve(target: str):
+    module, function = target.split(":")
+    return getattr(importlib.import_module(module), function)
+
+
+def stage_key(stage: Stage, datasets: Datasets) -> str:
+    inputs = {name: datasets.content_hash(name) for name in stage.inputs}
+    files = {path: file_hash(path) for path in stage.files}
+    return hashlib.sha256(json.dumps([stage.target, inputs, files], sort_keys=True).encode()).hexdigest()
+
+
+def file_hash(path: str) -> str | None:
+    if not os.path.isfile(path):
+        return None
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def select_stages(stages: list[Stage], names: list[str] | None) -> list[Stage]:
+    if names is None:
+        return stages
+    unknown = set(names) - {stage.name for stage in stages}
+    if unknown:
+        raise ValueError(f"Unknown stages: {', '.join(sorted(unknown))}")
+    return [stage for stage in stages if stage.name in names]
+
+
+def read_state(state_file: str) -> dict:
+    if not os.path.exists(state_file):
+        return {}
+    with open(state_file) as f:
+        return json.load(f)
+
+
+def write_json(data: dict, path: str) -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(data, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def run_pipeline(
+    stages: list[Stage] = STAGES,
+    datasets: Datasets | None = None,
+    state_file: str = STATE_FILE,
+    timings_file: str | None = TIMINGS_FILE,
+    force: bool = False,
+    workers: int = 4,
+) -> dict[str, dict]:
+    """Runs the stages as a DAG: a stage starts once the selected stages in its `after` finished.
+
+    A stage is skipped when its inputs hash to the same key as on its last successful run and
+    its outputs still exist. Returns the per-stage report (status, seconds).
+    """
+    datasets = datasets or Datasets(DATASETS)
+    names = {stage.name for stage in stages}
+    pending = {stage.name: stage for stage in stages}
+    state = read_state(state_file)
+    report: dict[str, dict] = {}
+    start = time.perf_counter()
+
+    def execute(stage: Stage) -> dict:
+        stage_start = time.perf_counter()
+        key = stage_key(stage, datasets)
+        outputs_exist = all(os.path.exists(path) for path in stage.outputs)
+        if not force and state.get(stage.name) == key and outputs_exist:
+            return {"status": "skipped", "seconds": round(time.perf_counter() - stage_start, 4)}
+
+        load = datasets.table if stage.arrow else datasets.frame
+        try:
+            inputs = [load(name) for name in stage.inputs]
+            loaded = time.perf_counter()
+            resolve(stage.target)(*inputs)
+        except Exception as e:
+            return {"status": "failed", "seconds": round(time.perf_counter() - stage_start, 4), "error": repr(e)}
+
+        state[stage.name] = key
+        return {
+            "status": "ran",
+            "seconds": round(time.perf_counter() - stage_start, 4),
+            # Reading the inputs, zero once another stage loaded them
+            "load_seconds": round(loaded - stage_start, 4),
+        }
+
+    def ready(stage: Stage) -> bool:
+        return all(dependency not in names or dependency in report for dependency in stage.after)
+
+    # Stages share frames; with copy-on-write a stage that modifies one only changes its own copy.
+    # Always on from pandas 3, before that only switched on for the stages, not for the caller
+    copy_on_write = pd.option_context("mode.copy_on_write", True) if int(pd.__version__.split(".")[0]) < 3 else nullcontext()
+    with copy_on_write, ThreadPoolExecutor(max_workers=workers) as pool:
+        running = {}
+        while pending or running:
+            for name, stage in list(pending.items()):
+                upstream = [report.get(dependency, {}).get("status") for dependency in stage.after]
+                if "failed" in upstream or "blocked" in upstream:
+                    report[name] = {"status": "blocked", "seconds": 0.0}
+                    del pending[name]
+                elif ready(stage):
+                    running[pool.submit(execute, stage)] = name
+                    del pending[name]
+
+            if not running:
+                if pending:
+                    raise ValueError(f"Stages wait on each other: {', '.join(sorted(pending))}")
+                break
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name = running.pop(future)
+                report[name] = future.result()
+                print(f"[Pipeline] - {name}: {report[name]}")
+
+    write_json(state, state_file)
+    if timings_file is not None:
+        write_json({"total_seconds": round(time.perf_counter() - start, 4), "stages": report}, timings_file)
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Validation, drift and split stages in one process")
+    parser.add_argument("--stages", help="comma separated subset, e.g. split_data")
+    parser.add_argument("--force", action="store_true", help="run stages even if their inputs did not change")
+    parser.add_argument("--workers", type=int, default=4)
+    args = parser.parse_args()
+
+    report = run_pipeline(
+        select_stages(STAGES, args.stages.split(",") if args.stages else None),
+        force=args.force,
+        workers=args.workers,
+    )
+    if any(result["status"] in ("failed", "blocked") for result in report.values()):
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
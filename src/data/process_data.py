@@ -1,57 +1,111 @@
-import pandas as pd
+import argparse
 import os
-import yfinance as yf
-
-def fetch_stock_data(ticker: str, period: str, interval: str) -> pd.DataFrame:
-    stock = yf.Ticker(ticker)
-    data = stock.history(period=period, interval=interval)
-    return data
 
-def process_data(sp500_data: pd.DataFrame, nasdaq_data: pd.DataFrame, directory: str, filename: str) -> None:
-    sp500_data.drop(columns=['Dividends', 'Stock Splits'], inplace=True)
-    sp500_data['Tomorrow'] = sp500_data['Close'].shift(-1)
-    sp500_data['Target'] = (sp500_data['Tomorrow'] > sp500_data['Close']).astype(int)
-
-    horizons = [2, 5, 60, 250, 1000]
+import numpy as np
+import pandas as pd
+from src.data.helpers.companion_store import asof_join, load_companion, update_companion
+from src.data.helpers.dataset_store import append_dataset, write_dataset
+from src.data.helpers.features import HORIZONS, empty_state, horizon_features
 
-    for horizon in horizons:
-        rolling_averages = sp500_data.drop(columns=['Date']).rolling(horizon).mean()
+START_DATE = pd.to_datetime('1990-01-01')
 
-        ratio_column = f"Close_Ratio_{horizon}"
-        sp500_data[ratio_column] = sp500_data["Close"] / rolling_averages["Close"]
 
-        trend_column = f"Trend_{horizon}"
-        sp500_data[trend_column] = sp500_data.drop(columns=['Date']).shift(1).rolling(horizon).sum()["Target"]
+def build_rows(sp500_data: pd.DataFrame, nasdaq_open: pd.Series, first: int, features: dict[str, np.ndarray]) -> pd.DataFrame:
+    sp500_data = sp500_data.iloc[first:].drop(columns=['Dividends', 'Stock Splits'])
+    sp500_data = sp500_data.assign(**{name: values for name, values in features.items()})
 
     sp500_data['Date'] = sp500_data['Date'].str.split(' ').str[0]
     sp500_data['Date'] = pd.to_datetime(sp500_data['Date'], format='%Y-%m-%d')
-    sp500_data = sp500_data[sp500_data['Date'] > pd.to_datetime('1990-01-01')]
+    sp500_data = sp500_data[sp500_data['Date'] > START_DATE].reset_index(drop=True)
+
+    # Nasdaq 100 odprtje istega dne, oba indeksa imata datume brez časovne cone
+    sp500_data['Open_Nasdaq'] = asof_join(sp500_data['Date'], nasdaq_open)
+    return sp500_data
+
+
+def load_state(state_path: str, sp500_data: pd.DataFrame, horizons: list[int]) -> dict | None:
+    if not os.path.isfile(state_path):
+        return None
+    with np.load(state_path) as saved:
+        state = {name: saved[name] for name in saved.files}
 
-    # Pridobitev Nasdaqa iz yfinance
-    nasdaq_data = nasdaq_data.reset_index()
-    nasdaq_data['Date'] = pd.to_datetime(nasdaq_data['Date']).dt.tz_localize(None)
+    rows = int(state["rows"])
+    # Raw file shrank, was rewritten (fetch_data --repair/--rebuild) or horizons changed - start over
+    if list(state["horizons"]) != horizons or rows > len(sp500_data) or rows == 0:
+        return None
+    if sp500_data['Date'].iloc[rows - 1] != str(state["last_date"]):
+        return None
+    return state
 
-    # Pretvorba S&P 500 datuma v enako časovno cono
-    sp500_data['Date'] = sp500_data['Date'].dt.tz_localize(None)
 
-    # Združite podatke S&P 500 in Nasdaq 100 na osnovi datuma
-    sp500_data = pd.merge(sp500_data, nasdaq_data[['Date', 'Open']], on='Date', how='left', suffixes=('', '_Nasdaq'))
-    sp500_data.rename(columns={'Open_x': 'Open', 'Open_y': 'Open_nasdaq'}, inplace=True)
+def drop_last_line(file_path: str) -> None:
+    with open(file_path, "rb+") as f:
+        size = f.seek(0, os.SEEK_END)
+        f.seek(max(0, size - 65536))
+        tail = f.read()
+        f.truncate(size - len(tail) + tail.rstrip(b"\n").rfind(b"\n") + 1)
 
-    if sp500_data is not None:
-        raw_data_directory = directory
-        if not os.path.exists(raw_data_directory):
-            os.makedirs(raw_data_directory)
-        filename = f"{filename}.csv"
-        file_path = os.path.join(raw_data_directory, filename)
 
-        sp500_data.to_csv(file_path, index=True)
+def process_data(
+    sp500_data: pd.DataFrame,
+    nasdaq_open: pd.Series,
+    directory: str,
+    filename: str,
+    incremental: bool = True,
+    horizons: list[int] = HORIZONS,
+) -> None:
+    os.makedirs(directory, exist_ok=True)
+    file_path = os.path.join(directory, f"{filename}.csv")
+    state_path = os.path.join(directory, f"{filename}.state.npz")
+    # Arrow copy for the downstream stages, see dataset_store
+    dataset_root = os.path.join(directory, filename)
+
+    resumable = incremental and os.path.isfile(file_path) and os.path.isdir(dataset_root)
+    state = load_state(state_path, sp500_data, horizons) if resumable else None
+    if state is not None and int(state["rows"]) == len(sp500_data):
+        print("[Process data] - No new rows")
+        return
+
+    full = state is None
+    output_rows = 0 if full else int(state["output_rows"])
+    first, features, new_state = horizon_features(sp500_data['Close'].to_numpy(dtype=np.float64), state or empty_state(horizons))
+    rows = build_rows(sp500_data, nasdaq_open, first, features)
+
+    if full:
+        rows.to_csv(file_path, index=True)
+        write_dataset(rows, dataset_root)
+        output_rows = len(rows)
+    else:
+        # The previous last row is written again, now with its Tomorrow/Target
+        if pd.Timestamp(sp500_data['Date'].iloc[first][:10]) > START_DATE:
+            drop_last_line(file_path)
+            output_rows -= 1
+        rows.index = pd.RangeIndex(output_rows, output_rows + len(rows))
+        with open(file_path, "a", newline="") as f:
+            rows.to_csv(f, header=False, index=True)
+        append_dataset(rows, dataset_root)
+        output_rows += len(rows)
+
+    new_state["output_rows"] = np.array(output_rows)
+    new_state["last_date"] = np.array(sp500_data['Date'].iloc[-1])
+    tmp_path = f"{state_path}.tmp.npz"
+    np.savez(tmp_path, **new_state)
+    os.replace(tmp_path, state_path)
+
+    print(f"[Process data] - {'Rebuilt' if full else 'Appended'} {len(rows)} rows")
+
 
 def main():
+    parser = argparse.ArgumentParser(description="Rolling features for data/raw/stock/sp500.csv")
+    parser.add_argument("--full", action="store_true", help="recompute the whole history instead of appending")
+    args = parser.parse_args()
+
     sp500 = pd.read_csv("data/raw/stock/sp500.csv")
-    nasdaq100 = fetch_stock_data("^NDX", "max", "1d")  # Nasdaq 100 index
+    # Nasdaq 100 index, only the bars since the last run are downloaded
+    update_companion("ndx")
+    nasdaq_open = load_companion("ndx", "Open")
 
-    process_data(sp500, nasdaq100, "data/processed/stock", "sp500")
+    process_data(sp500, nasdaq_open, "data/processed/stock", "sp500", incremental=not args.full)
 
 if __name__ == "__main__":
     main()
@@ -1,6 +1,7 @@
 import great_expectations as ge
 from great_expectations.checkpoint.types.checkpoint_result import CheckpointResult
-import pandas as pd
+from src.data.helpers.dataset_store import read_dataset, write_dataset
+from src.data.helpers.reference_profile import update_profile
 
 
 def main():
@@ -12,9 +13,11 @@ def main():
     else:
         print("[Validate]: Checkpoint validation passed!")
 
-    current_data = pd.read_csv("data/current_data.csv")
-    reference_data_path = "data/reference_data.csv"
-    current_data.to_csv(reference_data_path, index=False)
+    current_data = read_dataset("data/current_data")
+    reference_data_path = "data/reference_data"
+    write_dataset(current_data, reference_data_path)
+    # Sketches of every month seen so far, the drift check can compare against any rolling window of them
+    update_profile("data/current_data")
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -1,16 +1,19 @@
 import os
-import pandas as pd
 
-def split_data():
-    current_data = pd.read_csv('data/current_data.csv')
+from src.data.helpers.dataset_store import read_dataset, write_dataset
+
+def split_data(current_data=None, directory='data/validation'):
+    if current_data is None:
+        current_data = read_dataset('data/current_data')
 
     test_size = int(0.05 * len(current_data))
 
-    test_data = current_data.tail(test_size)
-    train_data = current_data.iloc[:-test_size]
+    # Arrow slices, nothing is copied until the partitions are written
+    test_data = current_data.slice(len(current_data) - test_size)
+    train_data = current_data.slice(0, len(current_data) - test_size)
 
-    test_data.to_csv('data/validation/test.csv', index=False)
-    train_data.to_csv('data/validation/train.csv', index=False)
+    write_dataset(test_data, os.path.join(directory, 'test'))
+    write_dataset(train_data, os.path.join(directory, 'train'))
 
 def main():
     validation_directory = 'data/validation'
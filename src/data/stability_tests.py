@@ -1,18 +1,26 @@
-import pandas as pd
 from evidently.test_preset import DataStabilityTestPreset
 from evidently.test_suite import TestSuite
 from evidently.tests import TestNumberOfColumnsWithMissingValues, TestNumberOfRowsWithMissingValues
 
-if __name__ == "__main__":
+from src.models.helpers.helper_dataset import load_dataset
+
+REPORT_FILE = "reports/sites/stability_tests.html"
+
+
+def stability_tests(reference_data, current_data, report_file=REPORT_FILE):
     tests = TestSuite(tests=[
         TestNumberOfColumnsWithMissingValues(),
         TestNumberOfRowsWithMissingValues(),
         DataStabilityTestPreset()
     ])
 
-    current_data = pd.read_csv("data/current_data.csv")
-    reference_data = pd.read_csv("data/reference_data.csv")
-
     tests.run(reference_data=reference_data, current_data=current_data)
 
-    tests.save_html("reports/sites/stability_tests.html")
\ No newline at end of file
+    tests.save_html(report_file)
+
+
+if __name__ == "__main__":
+    current_data = load_dataset("data/current_data")
+    reference_data = load_dataset("data/reference_data")
+
+    stability_tests(reference_data, current_data)
\ No newline at end of file
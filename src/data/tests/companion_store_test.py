@@ -0,0 +1,41 @@
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+from src.data.helpers.companion_store import asof_join, companion_path, load_companion, update_companion
+from src.data.tests.fetch_data_test import FakeProvider
+
+
+def test_updates_append_only_new_bars(tmp_path):
+    provider = FakeProvider()
+    update_companion("ndx", str(tmp_path), provider, today=date(2024, 5, 3))
+    provider.calls.clear()
+
+    assert update_companion("ndx", str(tmp_path), provider, today=date(2024, 5, 7)) == 2
+    assert provider.calls == [(date(2024, 5, 4), date(2024, 5, 8))]
+
+    # Stored without the exchange offset, read back as a sorted naive index
+    with open(companion_path("ndx", str(tmp_path))) as f:
+        assert f.readlines()[-1].startswith("2024-05-07,")
+    series = load_companion("ndx", "Open", str(tmp_path))
+    assert series.index.tz is None and series.index.is_monotonic_increasing
+    assert series.index[0] == pd.Timestamp("1985-10-01")
+    assert series.iloc[-1] == date(2024, 5, 7).toordinal()
+
+
+def test_offline_run_uses_cached_bars(tmp_path):
+    update_companion("ndx", str(tmp_path), FakeProvider(), today=date(2024, 5, 3))
+
+    assert update_companion("ndx", str(tmp_path), FakeProvider(fail_after=0), today=date(2024, 5, 7)) == 0
+    assert load_companion("ndx", "Open", str(tmp_path)).index[-1] == pd.Timestamp("2024-05-03")
+
+
+def test_asof_join_matches_left_merge():
+    series = pd.Series([1.0, 2.0, 3.0], index=pd.to_datetime(["2024-05-01", "2024-05-03", "2024-05-06"]))
+    dates = pd.Series(pd.to_datetime(["2024-04-30", "2024-05-01", "2024-05-02", "2024-05-03", "2024-05-07"]))
+
+    merged = pd.merge(dates.rename("Date").to_frame(), series.rename("Open").rename_axis("Date").reset_index(), how="left")
+    np.testing.assert_array_equal(asof_join(dates, series), merged["Open"].to_numpy())
+    np.testing.assert_array_equal(asof_join(dates, series, pd.Timedelta(days=1)), [np.nan, 1.0, 1.0, 2.0, 3.0])
+    assert np.isnan(asof_join(dates, series.iloc[:0])).all()
@@ -0,0 +1,76 @@
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pytest
+
+from src.data.helpers.dataset_store import append_dataset, partition_years, read_dataset, to_frame, write_dataset
+from src.data.migrate_datasets import migrate_dataset
+
+
+@pytest.fixture
+def frame():
+    days = pd.bdate_range("2019-12-20", "2021-01-08")
+    return pd.DataFrame({
+        "Unnamed: 0": np.arange(len(days)),
+        "Date": days,
+        "Close": np.linspace(3000, 3800, len(days)),
+        "Volume": np.arange(len(days)) * 1000,
+        "Target": np.arange(len(days)) % 2,
+        "Trend_2": np.where(np.arange(len(days)) < 2, np.nan, 1.0),
+    })
+
+
+def test_partitions_by_year_with_explicit_types(tmp_path, frame):
+    write_dataset(frame, str(tmp_path))
+    table = read_dataset(str(tmp_path))
+
+    assert partition_years(str(tmp_path)) == [2019, 2020, 2021]
+    assert table.column_names == ["Date", "Close", "Volume", "Target", "Trend_2"]
+    assert [str(kind) for kind in table.schema.types] == ["timestamp[s]", "float", "int64", "int8", "float"]
+    # NaN stays a value, readers see the same missing values as in the CSV
+    assert table.column("Trend_2").null_count == 0
+    np.testing.assert_array_equal(to_frame(table)["Close"], frame["Close"].astype(np.float32))
+
+
+def test_projection_and_year_range(tmp_path, frame):
+    write_dataset(frame, str(tmp_path))
+    table = read_dataset(str(tmp_path), columns=["Date", "Close"], years=(2020, 2020))
+
+    assert table.column_names == ["Date", "Close"]
+    assert table.num_rows == len(frame[frame["Date"].dt.year == 2020])
+
+
+def test_memory_mapped_read_does_not_copy(tmp_path, frame):
+    write_dataset(frame, str(tmp_path))
+    before = pa.total_allocated_bytes()
+    table = read_dataset(str(tmp_path), columns=["Close", "Volume"])
+
+    assert table.num_rows == len(frame)
+    assert pa.total_allocated_bytes() == before
+
+
+def test_append_rewrites_from_first_new_date(tmp_path, frame):
+    write_dataset(frame.iloc[:-3], str(tmp_path))
+    # Last stored row again (with its final values) plus the new days
+    update = frame.iloc[-4:].copy()
+    update["Target"] = 1
+    append_dataset(update, str(tmp_path))
+
+    stored = to_frame(read_dataset(str(tmp_path)))
+    assert len(stored) == len(frame)
+    assert stored["Target"].tolist()[-4:] == [1, 1, 1, 1]
+    assert stored["Date"].is_monotonic_increasing
+
+
+def test_legacy_csv_is_migrated_once(tmp_path, frame):
+    root = str(tmp_path / "reference_data")
+    # Same layout process_data's CSV had: row number column and plain dates
+    frame.assign(Date=frame["Date"].dt.strftime("%Y-%m-%d")).to_csv(f"{root}.csv", index=False)
+
+    assert migrate_dataset(root)
+    assert not migrate_dataset(root)
+    assert not migrate_dataset(str(tmp_path / "missing"))
+
+    stored = to_frame(read_dataset(root))
+    assert stored.columns.tolist() == ["Date", "Close", "Volume", "Target", "Trend_2"]
+    assert stored["Date"].tolist() == frame["Date"].tolist()
@@ -0,0 +1,23 @@
+import numpy as np
+
+from src.data.helpers.features import empty_state, horizon_features, latest_horizon_features
+
+
+def test_latest_features_match_full_history():
+    rng = np.random.default_rng(5)
+    close = 100 + np.cumsum(rng.normal(0, 1, 3000))
+
+    _, features, _ = horizon_features(close, empty_state())
+    latest = latest_horizon_features(close)
+
+    assert set(latest) == {name for name in features if name not in ("Tomorrow", "Target")}
+    for name, value in latest.items():
+        np.testing.assert_allclose(value, features[name][-1], rtol=1e-12)
+
+
+def test_short_history_leaves_long_horizons_empty():
+    latest = latest_horizon_features(np.linspace(100, 110, 100))
+
+    assert latest["Close_Ratio_60"] > 1
+    assert latest["Trend_60"] == 60
+    assert np.isnan(latest["Close_Ratio_250"]) and np.isnan(latest["Trend_1000"])
@@ -0,0 +1,109 @@
+from datetime import date
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.data.fetch_data import FIRST_DATE, find_gaps, rebuild_prices, repair_prices, update_prices
+
+
+class FakeProvider:
+    """Business-day bars for any range, like yfinance's history(start=, end=)."""
+
+    def __init__(self, fail_after: int | None = None):
+        self.calls = []
+        self.fail_after = fail_after
+
+    def __call__(self, ticker: str, start: date, end: date) -> pd.DataFrame:
+        if self.fail_after is not None and len(self.calls) >= self.fail_after:
+            raise ConnectionError("provider down")
+        self.calls.append((start, end))
+        days = pd.bdate_range(start, end, inclusive="left", tz="America/New_York")
+        close = np.array([d.toordinal() for d in days], dtype=float)
+        return pd.DataFrame({
+            "Open": close, "High": close + 1, "Low": close - 1, "Close": close,
+            "Volume": 1000, "Dividends": 0.0, "Stock Splits": 0.0,
+        }, index=pd.DatetimeIndex(days, name="Date"))
+
+
+def stored_dates(path) -> list[str]:
+    return pd.read_csv(path)["Date"].str[:10].tolist()
+
+
+@pytest.fixture
+def file_path(tmp_path):
+    return str(tmp_path / "raw" / "sp500.csv")
+
+
+def test_daily_runs_only_fetch_new_days(file_path):
+    provider = FakeProvider()
+    rebuild_prices("^GSPC", file_path, provider, today=date(2024, 5, 3), chunk_days=5 * 365)
+    assert stored_dates(file_path)[0] == FIRST_DATE.isoformat()
+    assert stored_dates(file_path)[-1] == "2024-05-03"
+
+    provider.calls.clear()
+    assert update_prices("^GSPC", file_path, provider, today=date(2024, 5, 3)) == 0
+    assert provider.calls == []
+
+    assert update_prices("^GSPC", file_path, provider, today=date(2024, 5, 7)) == 2
+    assert provider.calls == [(date(2024, 5, 4), date(2024, 5, 8))]
+
+    dates = stored_dates(file_path)
+    assert dates[-2:] == ["2024-05-06", "2024-05-07"]
+    assert len(dates) == len(set(dates))
+
+
+def test_missed_runs_are_backfilled_in_chunks(file_path):
+    provider = FakeProvider()
+    update_prices("^GSPC", file_path, provider, today=date(2024, 1, 10), first_date=date(2023, 1, 1))
+    provider.calls.clear()
+
+    update_prices("^GSPC", file_path, provider, today=date(2024, 3, 15), chunk_days=30)
+
+    assert provider.calls[0][0] == date(2024, 1, 11)
+    assert len(provider.calls) == 3
+    assert find_gaps(file_path) == []
+
+
+def test_interrupted_backfill_resumes(file_path):
+    with pytest.raises(ConnectionError):
+        update_prices("^GSPC", file_path, FakeProvider(fail_after=2), today=date(2024, 5, 3), chunk_days=100, first_date=date(2023, 1, 1))
+    partial = stored_dates(file_path)
+    assert partial[-1] < "2024-05-03"
+
+    provider = FakeProvider()
+    update_prices("^GSPC", file_path, provider, today=date(2024, 5, 3), chunk_days=100)
+
+    dates = stored_dates(file_path)
+    assert dates[:len(partial)] == partial
+    assert dates[-1] == "2024-05-03"
+    assert len(dates) == len(set(dates))
+
+
+def test_torn_last_line_is_dropped(file_path):
+    provider = FakeProvider()
+    update_prices("^GSPC", file_path, provider, today=date(2024, 5, 2), first_date=date(2024, 1, 1))
+    with open(file_path, "a") as f:
+        f.write("2024-05-03 00:00:00-04:00,12")
+
+    update_prices("^GSPC", file_path, provider, today=date(2024, 5, 3))
+
+    assert stored_dates(file_path)[-2:] == ["2024-05-02", "2024-05-03"]
+    assert pd.read_csv(file_path)["Close"].notna().all()
+
+
+def test_repair_fills_holes_and_drops_duplicates(file_path):
+    provider = FakeProvider()
+    update_prices("^GSPC", file_path, provider, today=date(2024, 5, 31), first_date=date(2024, 1, 1))
+
+    # Old blind appends: a duplicated day and a missing fortnight
+    data = pd.read_csv(file_path)
+    keys = data["Date"].str[:10]
+    broken = pd.concat([data[(keys < "2024-05-06") | (keys > "2024-05-17")], data[keys == "2024-05-31"]])
+    broken.to_csv(file_path, index=False)
+    assert find_gaps(file_path) == [(date(2024, 5, 4), date(2024, 5, 20))]
+
+    repair_prices("^GSPC", file_path, provider)
+
+    repaired = pd.read_csv(file_path)
+    assert repaired.equals(data)
@@ -0,0 +1,103 @@
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+from scipy import stats
+
+from src.data.ks import drift_report, ks_report, ks_statistic, psi, sort_sample, sorted_reference, wasserstein
+
+
+@pytest.fixture(autouse=True)
+def in_tmp_path(tmp_path, monkeypatch):
+    # Reference cache and reports are written relative to the working directory
+    monkeypatch.chdir(tmp_path)
+
+
+@pytest.fixture
+def frames():
+    rng = np.random.default_rng(11)
+    reference = pd.DataFrame({
+        "Date": pd.bdate_range("2000-01-01", periods=5000),
+        "Close": rng.normal(100, 10, 5000),
+        # Many ties, like Target and the Trend columns
+        "Target": rng.integers(0, 2, 5000),
+        "Trend_5": rng.integers(0, 6, 5000).astype(float),
+    })
+    current = pd.DataFrame({
+        "Date": pd.bdate_range("2020-01-01", periods=700),
+        "Close": rng.normal(103, 10, 700),
+        "Target": rng.integers(0, 2, 700),
+        "Trend_5": np.where(rng.random(700) < 0.1, np.nan, rng.integers(0, 6, 700)),
+    })
+    return reference, current
+
+
+def test_statistics_match_scipy(frames):
+    reference, current = frames
+    report = drift_report(reference, current, alpha=0.05, statistics=("psi", "wasserstein"))
+
+    assert list(report.columns) == ["Close", "Target", "Trend_5"]
+    for column, result in report.columns.items():
+        ref, cur = reference[column].dropna(), current[column].dropna()
+        expected = stats.ks_2samp(ref, cur, method="asymp")
+        assert result.statistic == pytest.approx(expected.statistic, abs=1e-12)
+        assert result.p_value == pytest.approx(stats.kstwobign.sf(np.sqrt(len(ref) * len(cur) / (len(ref) + len(cur))) * expected.statistic))
+        assert result.wasserstein == pytest.approx(stats.wasserstein_distance(ref, cur))
+        assert result.current_size == len(cur)
+
+    assert report.drifted == ["Close"]
+
+
+def test_ks_statistic_is_exact_on_small_samples():
+    reference = np.sort(np.array([1.0, 2.0, 2.0, 3.0, 10.0]))
+    current = np.sort(np.array([2.0, 2.0, 4.0]))
+    # F_ref(2) = 3/5, F_cur(2) = 2/3; below 2: 1/5 vs 0; at 3: 4/5 vs 2/3; just below 4: 4/5 vs 2/3; at 4: 4/5 vs 1
+    assert ks_statistic(reference, current) == pytest.approx(0.2)
+    assert ks_statistic(reference, reference) == 0.0
+
+
+def test_psi_is_zero_for_same_distribution_and_grows_with_shift():
+    rng = np.random.default_rng(3)
+    reference = np.sort(rng.normal(0, 1, 100_000))
+
+    assert psi(reference, reference) == pytest.approx(0.0, abs=1e-9)
+    assert psi(reference, np.sort(rng.normal(0.5, 1, 5000))) > psi(reference, np.sort(rng.normal(0.1, 1, 5000))) > 0
+
+
+def test_sorted_reference_is_reused(tmp_path, frames):
+    reference, current = frames
+    first = sorted_reference(reference, cache_dir=str(tmp_path))
+    cached = sorted_reference(reference, cache_dir=str(tmp_path))
+
+    assert len(list(tmp_path.iterdir())) == 1
+    assert cached.columns == first.columns
+    np.testing.assert_array_equal(cached.values, first.values)
+    np.testing.assert_array_equal(cached.column("Close"), np.sort(reference["Close"]))
+
+    # A pre-sorted reference gives the same report as the frame
+    assert drift_report(cached, current) == drift_report(sort_sample(reference), current)
+
+
+def test_report_is_written_for_other_stages(tmp_path, frames):
+    reference, current = frames
+    report = ks_report(reference, current, alpha=0.05)
+
+    with open(tmp_path / "reports" / "drift" / "ks.json") as f:
+        written = json.load(f)
+    assert written == json.loads(json.dumps(report.to_dict()))
+    assert written["drifted"] == ["Close"]
+
+
+def test_only_recent_references_are_kept(tmp_path, frames):
+    reference, _ = frames
+    cache_dir = tmp_path / "cache"
+    for shift in range(4):
+        sorted_reference(reference.assign(Close=reference["Close"] + shift), cache_dir=str(cache_dir))
+
+    kept = list(cache_dir.iterdir())
+    assert len(kept) == 2
+    # The newest reference is still served from the cache
+    cached = sorted_reference(reference.assign(Close=reference["Close"] + 3), cache_dir=str(cache_dir))
+    assert len(list(cache_dir.iterdir())) == 2
+    np.testing.assert_array_equal(cached.column("Close"), np.sort(reference["Close"] + 3))
@@ -0,0 +1,119 @@
+import threading
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.data.helpers.dataset_store import read_dataset, write_dataset
+from src.data import pipeline
+from src.data.pipeline import Datasets, Stage, run_pipeline
+
+calls = []
+barrier = threading.Barrier(2, timeout=5)
+
+
+def record(*frames):
+    calls.append([id(frame) for frame in frames])
+
+
+def meet(*frames):
+    # Only returns if the other stage runs at the same time
+    barrier.wait()
+
+
+def fail(*frames):
+    raise RuntimeError("broken stage")
+
+
+
+
+def frame(rows: int, seed: int) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        "Date": pd.bdate_range("2020-01-01", periods=rows),
+        "Close": rng.normal(100, 5, rows),
+        "Target": rng.integers(0, 2, rows),
+    })
+
+
+@pytest.fixture
+def roots(tmp_path):
+    roots = {"current": str(tmp_path / "current_data"), "reference": str(tmp_path / "reference_data")}
+    write_dataset(frame(600, 1), roots["current"])
+    write_dataset(frame(600, 2), roots["reference"])
+    calls.clear()
+    return roots
+
+
+def run(stages, datasets, tmp_path, **kwargs):
+    return run_pipeline(stages, datasets, str(tmp_path / "state.json"), str(tmp_path / "timings.json"), **kwargs)
+
+
+def test_datasets_are_loaded_once_and_shared(tmp_path, roots, monkeypatch):
+    reads = []
+
+    def counting_read(root, *args, **kwargs):
+        # Runs under the loader lock, like the real read
+        reads.append(root)
+        return read_dataset(root, *args, **kwargs)
+
+    monkeypatch.setattr(pipeline, "read_dataset", counting_read)
+    stages = [Stage(f"stage_{i}", f"{__name__}:record", ("reference", "current")) for i in range(3)]
+    report = run(stages, Datasets(roots), tmp_path)
+
+    assert sorted(reads) == sorted(roots.values())
+    assert len({tuple(ids) for ids in calls}) == 1
+    assert {result["status"] for result in report.values()} == {"ran"}
+    assert (tmp_path / "timings.json").exists()
+
+
+def test_independent_stages_run_in_parallel(tmp_path, roots):
+    stages = [Stage(name, f"{__name__}:meet", ("current",)) for name in ["a", "b"]]
+    report = run(stages, Datasets(roots), tmp_path, workers=2)
+
+    assert report["a"]["status"] == report["b"]["status"] == "ran"
+
+
+def test_unchanged_inputs_are_skipped(tmp_path, roots):
+    stages = [Stage("ks", f"{__name__}:record", ("reference", "current"))]
+    run(stages, Datasets(roots), tmp_path)
+    assert run(stages, Datasets(roots), tmp_path)["ks"]["status"] == "skipped"
+
+    write_dataset(frame(601, 1), roots["current"])
+    assert run(stages, Datasets(roots), tmp_path)["ks"]["status"] == "ran"
+    assert run(stages, Datasets(roots), tmp_path, force=True)["ks"]["status"] == "ran"
+    assert len(calls) == 3
+
+
+def test_failed_stage_blocks_dependants(tmp_path, roots):
+    stages = [
+        Stage("validate", f"{__name__}:fail", ("current",)),
+        Stage("split", f"{__name__}:record", ("current",), after=("validate",)),
+        Stage("drift", f"{__name__}:record", ("current",)),
+    ]
+    report = run(stages, Datasets(roots), tmp_path)
+
+    assert report["validate"]["status"] == "failed"
+    assert report["split"]["status"] == "blocked"
+    assert report["drift"]["status"] == "ran"
+    # Not recorded as done, so the next run tries again
+    assert run(stages, Datasets(roots), tmp_path)["validate"]["status"] == "failed"
+
+
+def test_repo_stages_on_shared_data(tmp_path, roots, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    stages = [
+        Stage("ks_test", "src.data.ks:ks_report", ("reference", "current")),
+        Stage("split_data", "src.data.split_data:split_data", ("current",), ("data/validation/train",), arrow=True),
+    ]
+    report = run(stages, Datasets(roots), tmp_path)
+
+    assert report["ks_test"]["status"] == report["split_data"]["status"] == "ran"
+    assert read_dataset("data/validation/train").num_rows + read_dataset("data/validation/test").num_rows == 600
+
+
+@pytest.mark.skipif(int(pd.__version__.split(".")[0]) >= 3, reason="copy-on-write is always on from pandas 3")
+def test_pandas_options_are_left_as_they_were(tmp_path, roots):
+    before = pd.get_option("mode.copy_on_write")
+    run([Stage("ks", f"{__name__}:record", ("reference", "current"))], Datasets(roots), tmp_path)
+    assert pd.get_option("mode.copy_on_write") == before
@@ -0,0 +1,76 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.data.helpers.dataset_store import read_dataset, to_frame
+from src.data.process_data import process_data
+
+
+def raw_bars(days: int) -> pd.DataFrame:
+    # Same shape as data/raw/stock/sp500.csv read back with pd.read_csv
+    dates = pd.bdate_range("1985-01-01", periods=days, tz="America/New_York")
+    rng = np.random.default_rng(7)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, days)))
+    close[[40, 41, 3000]] = np.nan
+    return pd.DataFrame({
+        "Date": [str(d) for d in dates],
+        "Open": close * 0.99, "High": close * 1.01, "Low": close * 0.98, "Close": close,
+        "Volume": np.arange(days) * 1000, "Dividends": 0.0, "Stock Splits": 0.0,
+    })
+
+
+def nasdaq_bars(days: int) -> pd.Series:
+    # Starts later and misses days, so Open_Nasdaq has holes like the real join
+    dates = pd.bdate_range("1986-01-01", periods=days)[::3]
+    return pd.Series(np.linspace(200, 900, len(dates)), index=pd.DatetimeIndex(dates, name="Date"), name="Open")
+
+
+@pytest.fixture
+def bars():
+    return raw_bars(3600), nasdaq_bars(3600)
+
+
+def test_incremental_runs_match_full_rebuild(tmp_path, bars):
+    sp500, nasdaq = bars
+    process_data(sp500, nasdaq, str(tmp_path / "full"), "sp500", incremental=False)
+
+    directory = str(tmp_path / "daily")
+    process_data(sp500.iloc[:3400], nasdaq, directory, "sp500")
+    # Single days, a multi-day catch-up and a run without new rows
+    for end in [3401, 3402, 3450, 3450, 3599, 3600]:
+        process_data(sp500.iloc[:end], nasdaq, directory, "sp500")
+
+    full = (tmp_path / "full" / "sp500.csv").read_bytes()
+    assert (tmp_path / "daily" / "sp500.csv").read_bytes() == full
+    pd.testing.assert_frame_equal(
+        to_frame(read_dataset(str(tmp_path / "daily" / "sp500"))),
+        to_frame(read_dataset(str(tmp_path / "full" / "sp500"))),
+    )
+
+
+def test_features_follow_rolling_definition(tmp_path, bars):
+    sp500, nasdaq = bars
+    process_data(sp500, nasdaq, str(tmp_path), "sp500")
+    processed = pd.read_csv(tmp_path / "sp500.csv", index_col=0)
+
+    close = sp500["Close"]
+    target = (close.shift(-1) > close).astype(int)
+    keep = (pd.to_datetime(sp500["Date"].str[:10]) > "1990-01-01").to_numpy()
+    for horizon in [2, 60, 1000]:
+        ratio = (close / close.rolling(horizon).mean())[keep].to_numpy()
+        trend = target.shift(1).rolling(horizon).sum()[keep].to_numpy()
+        np.testing.assert_allclose(processed[f"Close_Ratio_{horizon}"], ratio, rtol=1e-12)
+        np.testing.assert_array_equal(processed[f"Trend_{horizon}"], trend)
+    np.testing.assert_array_equal(processed["Target"], target[keep])
+
+
+def test_rewritten_raw_file_triggers_rebuild(tmp_path, bars):
+    sp500, nasdaq = bars
+    process_data(sp500.iloc[:3500], nasdaq, str(tmp_path), "sp500")
+
+    # fetch_data --repair inserted a missing day in the middle
+    repaired = sp500.drop(index=3200).reset_index(drop=True)
+    process_data(repaired, nasdaq, str(tmp_path / "full"), "sp500", incremental=False)
+    process_data(repaired, nasdaq, str(tmp_path), "sp500")
+
+    assert (tmp_path / "sp500.csv").read_bytes() == (tmp_path / "full" / "sp500.csv").read_bytes()
@@ -0,0 +1,124 @@
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pytest
+
+from src.data.helpers.dataset_store import append_dataset, write_dataset
+from src.data.helpers.reference_profile import (
+    RELATIVE_ACCURACY, ReferenceProfile, merge_sketches, sketch_values, update_profile,
+)
+from src.data.ks import drift_report, profile_drift, profile_report
+
+
+@pytest.fixture
+def frames():
+    rng = np.random.default_rng(5)
+    reference = pd.DataFrame({
+        "Date": pd.bdate_range("2000-01-03", periods=5000),
+        "Close": rng.normal(100, 10, 5000),
+        "Change": rng.normal(0, 1, 5000),
+        "Target": rng.integers(0, 2, 5000),
+    })
+    current = pd.DataFrame({
+        "Date": pd.bdate_range("2020-01-01", periods=700),
+        "Close": rng.normal(103, 10, 700),
+        "Change": np.where(rng.random(700) < 0.1, np.nan, rng.normal(0, 1, 700)),
+        "Target": rng.integers(0, 2, 700),
+    })
+    return reference, current
+
+
+def test_merged_sketch_equals_sketch_of_all_values():
+    rng = np.random.default_rng(1)
+    a, b = rng.normal(-5, 20, 3000), rng.lognormal(0, 2, 2000)
+    merged = merge_sketches(sketch_values(a), sketch_values(b))
+    whole = sketch_values(np.concatenate([a, b, [np.nan]]))
+
+    np.testing.assert_array_equal(merged.keys, whole.keys)
+    np.testing.assert_array_equal(merged.counts, whole.counts)
+    assert (merged.count, merged.missing, whole.missing) == (5000, 0, 1)
+    assert merged.mean == pytest.approx(whole.mean)
+    assert merged.std == pytest.approx(whole.std)
+    assert (merged.minimum, merged.maximum) == (whole.minimum, whole.maximum)
+
+
+def test_quantiles_are_within_relative_accuracy():
+    values = np.random.default_rng(2).lognormal(3, 1, 50_000)
+    q = np.array([0.01, 0.25, 0.5, 0.75, 0.99])
+    expected = np.quantile(values, q, method="lower")
+
+    assert np.all(np.abs(sketch_values(values).quantiles(q) - expected) <= RELATIVE_ACCURACY * expected * 1.001)
+
+
+def test_profile_is_built_incrementally(tmp_path, frames):
+    reference, _ = frames
+    whole = ReferenceProfile()
+    whole.update(reference)
+
+    profile = ReferenceProfile()
+    assert profile.update(reference[:3000]) == 3000
+    profile.save(str(tmp_path / "profile.json"))
+    profile = ReferenceProfile.load(str(tmp_path / "profile.json"))
+    # Rows up to the last profiled date are not counted twice
+    assert profile.update(reference[2000:]) == 2000
+
+    assert sorted(profile.periods) == sorted(whole.periods)
+    for column, sketch in whole.window().items():
+        np.testing.assert_array_equal(profile.window()[column].counts, sketch.counts)
+        assert profile.window()[column].mean == pytest.approx(sketch.mean)
+
+    # Rolling window over the last 12 months (data ends in March 2019), older months fall out of a bounded profile
+    assert profile.window(12)["Close"].count == (reference["Date"] >= "2018-04-01").sum()
+    bounded = ReferenceProfile(max_periods=24)
+    bounded.update(reference)
+    assert sorted(bounded.periods) == sorted(whole.periods)[-24:]
+
+
+def test_profile_drift_is_close_to_exact_report(frames):
+    reference, current = frames
+    profile = ReferenceProfile()
+    profile.update(reference)
+
+    exact = drift_report(reference, current, alpha=0.05, statistics=("psi", "wasserstein"))
+    batches = [current[start:start + 100].drop(columns=["Date"]) for start in range(0, len(current), 100)]
+    approximate = profile_drift(profile.window(), batches, alpha=0.05, statistics=("psi", "wasserstein"))
+
+    assert approximate.drifted == exact.drifted == ["Close"]
+    for column, result in exact.columns.items():
+        estimate = approximate.columns[column]
+        assert (estimate.reference_size, estimate.current_size) == (result.reference_size, result.current_size)
+        assert estimate.statistic == pytest.approx(result.statistic, abs=0.02)
+        assert estimate.wasserstein == pytest.approx(result.wasserstein, rel=0.05, abs=0.02)
+        assert estimate.psi == pytest.approx(result.psi, abs=0.05)
+
+
+def test_profile_report_streams_arrow_batches(tmp_path, monkeypatch, frames):
+    reference, current = frames
+    monkeypatch.chdir(tmp_path)
+    write_dataset(reference, "data/reference_data")
+
+    # The newest row is provisional and waits for the next run
+    assert update_profile("data/reference_data", "profile.json") == len(reference) - 1
+    assert update_profile("data/reference_data", "profile.json") == 0
+
+    report = profile_report(pa.Table.from_pandas(current), "profile.json", alpha=0.05)
+    assert report.drifted == ["Close"]
+    assert (tmp_path / "reports" / "drift" / "profile.json").exists()
+
+
+def test_provisional_row_is_profiled_with_its_final_values(tmp_path, frames):
+    reference, _ = frames
+    reference = reference.assign(Tomorrow=reference["Close"].shift(-1))
+    first = reference[:-1].copy()
+    first.loc[first.index[-1], "Tomorrow"] = np.nan
+    write_dataset(first, str(tmp_path / "data"))
+    update_profile(str(tmp_path / "data"), str(tmp_path / "profile.json"))
+
+    # Next run: the provisional row is rewritten with its Tomorrow, one new provisional row follows
+    append_dataset(reference[-2:].assign(Tomorrow=[reference["Tomorrow"].iloc[-2], np.nan]), str(tmp_path / "data"))
+    assert update_profile(str(tmp_path / "data"), str(tmp_path / "profile.json")) == 1
+
+    profile = ReferenceProfile.load(str(tmp_path / "profile.json")).window()
+    expected = sketch_values(reference["Tomorrow"][:-1].to_numpy(np.float32))
+    assert (profile["Tomorrow"].count, profile["Tomorrow"].missing) == (expected.count, 0)
+    np.testing.assert_array_equal(profile["Tomorrow"].counts, expected.counts)
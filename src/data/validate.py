@@ -1,14 +1,15 @@
 import os
 from datetime import datetime
-import pandas as pd
 from dotenv import load_dotenv
 from pymongo import MongoClient
 
+from src.models.helpers.helper_dataset import load_dataset
+
 load_dotenv()
 
 
 def read_data(filename):
-    return pd.read_csv(filename)
+    return load_dataset(filename)
 
 
 def validate(reference_data, current_data):
@@ -52,22 +53,30 @@ def validate(reference_data, current_data):
     return validation_result
 
 
-def main():
+def save_result(result):
     # MongoDB connection setup
     MONGO_URI = os.getenv("MONGO_URI")
     client = MongoClient(MONGO_URI)
     db = client.get_database("db")
     collection = db.get_collection("validation-results")
 
-    reference_data = read_data('data/reference_data.csv')
-    current_data = read_data('data/current_data.csv')
-    result = validate(reference_data, current_data)
-
     # Add timestamp to the result
     result["timestamp"] = datetime.now().isoformat()
 
     collection.insert_one(result)
 
 
+def run_validation(reference_data, current_data):
+    result = validate(reference_data, current_data)
+    save_result(result)
+    return result
+
+
+def main():
+    reference_data = read_data('data/reference_data')
+    current_data = read_data('data/current_data')
+    run_validation(reference_data, current_data)
+
+
 if __name__ == "__main__":
     main()
\ No newline at end of file
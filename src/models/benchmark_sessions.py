@@ -0,0 +1,63 @@
+import argparse
+import json
+import os
+import statistics
+import time
+
+import numpy as np
+
+from src.models.helpers.onnx_sessions import PROFILES, create_session, optimized_model_path
+
+
+def benchmark_profile(model_path: str, profile: str, batch_sizes: list[int], repeats: int) -> dict:
+    optimized_path = optimized_model_path(model_path, profile)
+    if os.path.exists(optimized_path):
+        os.remove(optimized_path)
+
+    # First load runs the optimizer and writes the optimized graph, the second one reuses it
+    start = time.perf_counter()
+    create_session(model_path, profile)
+    cold_load = time.perf_counter() - start
+
+    start = time.perf_counter()
+    session = create_session(model_path, profile)
+    warm_load = time.perf_counter() - start
+
+    input_name = session.get_inputs()[0].name
+    n_features = session.get_inputs()[0].shape[1]
+    rng = np.random.default_rng(1)
+
+    latencies = {}
+    for batch_size in batch_sizes:
+        X = rng.random((batch_size, n_features), dtype=np.float32) * 5000
+        session.run(None, {input_name: X})
+
+        timings = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            session.run(None, {input_name: X})
+            timings.append(time.perf_counter() - start)
+
+        latencies[str(batch_size)] = {
+            "p50_ms": statistics.median(timings) * 1000,
+            "mean_ms": statistics.fmean(timings) * 1000,
+        }
+
+    return {"cold_load_ms": cold_load * 1000, "warm_load_ms": warm_load * 1000, "latency": latencies}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load time and per-call latency of each ONNX session profile")
+    parser.add_argument("--model", default="models/sp500/sp500_model_production.onnx")
+    parser.add_argument("--batch-sizes", default="1,100,10000")
+    parser.add_argument("--repeats", type=int, default=200)
+    args = parser.parse_args()
+
+    batch_sizes = [int(size) for size in args.batch_sizes.split(",")]
+    results = {profile: benchmark_profile(args.model, profile, batch_sizes, args.repeats) for profile in PROFILES}
+
+    print(json.dumps({"model": args.model, "profiles": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
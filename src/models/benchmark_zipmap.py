@@ -0,0 +1,90 @@
+import argparse
+import json
+import os
+import statistics
+import tempfile
+import time
+
+import numpy as np
+import onnxruntime as ort
+from skl2onnx import convert_sklearn
+from skl2onnx.common.data_types import FloatTensorType
+from sklearn.ensemble import RandomForestClassifier
+
+from src.models.helpers.onnx_sessions import create_session
+
+THRESHOLD = 0.6
+
+
+def export_models(n_features: int, folder: str) -> dict[str, str]:
+    # Small forest on random data - the per-row overhead does not depend on what the trees learned
+    rng = np.random.default_rng(1)
+    X = rng.random((2000, n_features), dtype=np.float32)
+    y = (X[:, 0] > 0.5).astype(int)
+    model = RandomForestClassifier(n_estimators=20, max_depth=6, random_state=1).fit(X, y)
+
+    initial_type = [("input", FloatTensorType([None, n_features]))]
+    paths = {}
+    for name, options in [("zipmap", None), ("dense", {id(model): {"zipmap": False}})]:
+        paths[name] = os.path.join(folder, f"{name}.onnx")
+        with open(paths[name], "wb") as f:
+            f.write(convert_sklearn(model, initial_types=initial_type, options=options).SerializeToString())
+    return paths
+
+
+def zipmap_classes(session: ort.InferenceSession, X: np.ndarray) -> list[int]:
+    # What the evaluation scripts used to do with ZipMap output: one dict per row, thresholded in Python
+    probabilities = session.run([session.get_outputs()[1].name], {session.get_inputs()[0].name: X})[0]
+    return [1 if prediction[1] > THRESHOLD else 0 for prediction in probabilities]
+
+
+def dense_classes(session: ort.InferenceSession, X: np.ndarray) -> np.ndarray:
+    probabilities = session.run([session.get_outputs()[1].name], {session.get_inputs()[0].name: X})[0]
+    return (probabilities[:, 1] > THRESHOLD).astype(int)
+
+
+def time_call(func, repeats: int) -> float:
+    func()
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Classifier scoring time with ZipMap vs dense probability output")
+    parser.add_argument("--batch-sizes", default="1,100,10000,1000000")
+    parser.add_argument("--repeats", type=int, default=20)
+    parser.add_argument("--features", type=int, default=6)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as folder:
+        paths = export_models(args.features, folder)
+        variants = {
+            "zipmap": (ort.InferenceSession(paths["zipmap"]), zipmap_classes),
+            # Old artifact through the create_session compatibility path
+            "zipmap_stripped": (create_session(paths["zipmap"], cache_optimized=False), dense_classes),
+            "dense": (ort.InferenceSession(paths["dense"]), dense_classes),
+        }
+
+        rng = np.random.default_rng(2)
+        results = {}
+        for batch_size in [int(size) for size in args.batch_sizes.split(",")]:
+            X = rng.random((batch_size, args.features), dtype=np.float32)
+            repeats = max(1, min(args.repeats, 10_000_000 // (batch_size * 100)))
+            timings = {
+                name: time_call(lambda: classify(session, X), repeats) * 1000
+                for name, (session, classify) in variants.items()
+            }
+            results[str(batch_size)] = {
+                **{f"{name}_ms": value for name, value in timings.items()},
+                "zipmap_per_row_overhead_us": (timings["zipmap"] - timings["dense"]) * 1000 / batch_size,
+            }
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -2,16 +2,13 @@ import os
 
 import pandas as pd
 
+from src.data.helpers.dataset_store import read_dataset
 
-def load_dataset() -> pd.DataFrame:
-    dataset = pd.read_csv("data/processed/mbajk_processed.csv")
-    dataset.drop(columns=["date"], inplace=True)
-    return dataset
 
-
-def load_dataset(file: str) -> pd.DataFrame:
-    dataset = pd.read_csv(file)
-    return dataset
+def load_dataset(path: str, columns: list[str] | None = None) -> pd.DataFrame:
+    # Year-partitioned Arrow dataset (see dataset_store); columns=None reads all of them.
+    # The frame owns its data - callers fill and drop in place, zero-copy views over the file are read-only
+    return read_dataset(path, columns, memory_map=False).to_pandas()
 
 
 def write_metrics_to_file(file_path: str, model_name: str, accuracy: float, precision: float, recall: float, f1: float) -> None:
@@ -0,0 +1,171 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+from typing import Callable
+
+from src.models.helpers.model_registry import ModelType, get_model_version, init_tracking
+
+CACHE_DIR = os.getenv("MODEL_CACHE_DIR", "models/cache")
+MODELS_DIR = "models/sp500"
+# Versions kept per (model, stage) besides the one currently published
+MAX_VERSIONS = int(os.getenv("MODEL_CACHE_MAX_VERSIONS", "3"))
+
+
+def file_checksum(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def atomic_copy(source: str, target: str) -> None:
+    # Readers see either the old file or the complete new one, never a half written model
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(target), suffix=".tmp")
+    os.close(fd)
+    try:
+        shutil.copyfile(source, tmp_path)
+        os.replace(tmp_path, target)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+
+
+def fetch_artifact(model_name: str, version: str, target_dir: str) -> str:
+    from mlflow import MlflowClient
+    from mlflow.artifacts import download_artifacts
+
+    # The raw model.onnx as logged by mlflow.onnx - no load_onnx/save_model round trip
+    source = MlflowClient().get_model_version(model_name, version).source
+    local_dir = download_artifacts(artifact_uri=source, dst_path=target_dir)
+    return os.path.join(local_dir, "model.onnx")
+
+
+class ModelCache:
+    """Local copies of registry models keyed by (name, stage, version, checksum).
+
+    Versions live under models/cache/<name>/<stage>/<version>-<checksum>.onnx; the version
+    currently registered for a stage is published to models/sp500/<name>_<stage>.onnx,
+    which is what training, evaluation and serving load.
+    """
+
+    def __init__(
+        self,
+        root: str = CACHE_DIR,
+        models_dir: str = MODELS_DIR,
+        max_versions: int = MAX_VERSIONS,
+        fetch_version: Callable[[str, ModelType], str | None] = get_model_version,
+        fetch: Callable[[str, str, str], str] = fetch_artifact,
+        connect: Callable[[], None] | None = init_tracking,
+    ):
+        self.root = root
+        self.models_dir = models_dir
+        self.max_versions = max_versions
+        self.fetch_version = fetch_version
+        self.fetch = fetch
+        self.connect = connect
+
+        self.hits = 0
+        self.downloads = 0
+        self._lock = threading.Lock()
+
+    @property
+    def index_path(self) -> str:
+        return os.path.join(self.root, "index.json")
+
+    def published_path(self, model_name: str, model_type: ModelType) -> str:
+        return os.path.join(self.models_dir, f"{model_name}_{model_type.name.lower()}.onnx")
+
+    def resolve(self, model_name: str, model_type: ModelType) -> str | None:
+        stage = model_type.name.lower()
+        try:
+            if self.connect is not None:
+                self.connect()
+            version = self.fetch_version(model_name, model_type)
+        except Exception as e:
+            # Registry unreachable - whatever was published last is still the best we have
+            path = self.published_path(model_name, model_type)
+            print(f"[Model cache] - Registry unavailable, using local {model_name} ({stage}): {e}")
+            return path if os.path.exists(path) else None
+
+        if version is None:
+            return None
+
+        with self._lock:
+            index = self._read_index()
+            entries = index.setdefault(f"{model_name}/{stage}", {"published": None, "versions": {}})
+
+            entry = entries["versions"].get(version)
+            if entry is not None and self._is_intact(entry):
+                self.hits += 1
+            else:
+                entry = self._download(model_name, stage, version)
+                entries["versions"][version] = entry
+                self.downloads += 1
+                print(f"[Model cache] - Cached {model_name} ({stage}) version {version}")
+
+            entry["last_used"] = time.time()
+            self._publish(model_name, model_type, entries, version, entry)
+            self._evict(entries)
+            self._write_index(index)
+
+        return self.published_path(model_name, model_type)
+
+    def stats(self) -> dict:
+        return {"hits": self.hits, "downloads": self.downloads}
+
+    def _download(self, model_name: str, stage: str, version: str) -> dict:
+        folder = os.path.join(self.root, model_name, stage)
+        os.makedirs(folder, exist_ok=True)
+
+        with tempfile.TemporaryDirectory(dir=folder) as tmp_dir:
+            downloaded = self.fetch(model_name, version, tmp_dir)
+            checksum = file_checksum(downloaded)
+            path = os.path.join(folder, f"{version}-{checksum[:16]}.onnx")
+            # Same filesystem, so the rename is atomic
+            os.replace(downloaded, path)
+
+        return {"path": path, "checksum": checksum}
+
+    def _publish(self, model_name: str, model_type: ModelType, entries: dict, version: str, entry: dict) -> None:
+        target = self.published_path(model_name, model_type)
+        # Checked against the file itself, so a stale or hand-copied artifact is replaced as well
+        if not (os.path.exists(target) and file_checksum(target) == entry["checksum"]):
+            atomic_copy(entry["path"], target)
+        entries["published"] = {"version": version, "checksum": entry["checksum"]}
+
+    def _evict(self, entries: dict) -> None:
+        published = entries["published"]["version"] if entries["published"] else None
+        candidates = sorted(
+            (version for version in entries["versions"] if version != published),
+            key=lambda version: entries["versions"][version].get("last_used", 0),
+            reverse=True,
+        )
+        for version in candidates[self.max_versions:]:
+            entry = entries["versions"].pop(version)
+            if os.path.exists(entry["path"]):
+                os.remove(entry["path"])
+
+    def _is_intact(self, entry: dict) -> bool:
+        return os.path.exists(entry["path"]) and file_checksum(entry["path"]) == entry["checksum"]
+
+    def _read_index(self) -> dict:
+        if not os.path.exists(self.index_path):
+            return {}
+        with open(self.index_path) as f:
+            return json.load(f)
+
+    def _write_index(self, index: dict) -> None:
+        os.makedirs(self.root, exist_ok=True)
+        tmp_path = f"{self.index_path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(index, f, indent=2)
+        os.replace(tmp_path, self.index_path)
+
+
+model_cache = ModelCache()
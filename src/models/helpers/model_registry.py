@@ -1,21 +1,16 @@
 import os
-import dagshub.auth as dh_auth
-import joblib
-import onnx
-import onnxruntime as ort
 from enum import Enum, auto
-from mlflow.onnx import load_model as load_onnx
-from mlflow.sklearn import load_model as load_scaler
-from dagshub.data_engine.datasources import mlflow
-from mlflow import MlflowClient
-from sklearn.preprocessing import MinMaxScaler
 from dotenv import load_dotenv
-import dagshub
 
+# mlflow, dagshub and onnx are imported inside the functions that need them, so that
+# importing ModelType (e.g. from the serving app) does not pull in the whole MLOps stack.
 
 load_dotenv()
 
 def get_latest_model_version(model_name: str):
+    from mlflow import MlflowClient
+    from mlflow.onnx import load_model as load_onnx
+
     try:
         client = MlflowClient()
         model_version = client.get_latest_versions(model_name, stages=["staging"])[0]
@@ -27,6 +22,9 @@ def get_latest_model_version(model_name: str):
         return None
 
 def get_latest_scaler_version(model_name: str):
+    from mlflow import MlflowClient
+    from mlflow.sklearn import load_model as load_scaler
+
     try:
         client = MlflowClient()
         model_version = client.get_latest_versions(f"{model_name}_scaler", stages=["staging"])[0]
@@ -38,6 +36,9 @@ def get_latest_scaler_version(model_name: str):
         return None
 
 def get_production_model(model_name: str):
+    from mlflow import MlflowClient
+    from mlflow.onnx import load_model as load_onnx
+
     try:
         client = MlflowClient()
         model_version = client.get_latest_versions(model_name, stages=["production"])[0]
@@ -49,6 +50,9 @@ def get_production_model(model_name: str):
         return None
 
 def get_production_scaler(model_name: str):
+    from mlflow import MlflowClient
+    from mlflow.sklearn import load_model as load_scaler
+
     try:
         client = MlflowClient()
         model_version = client.get_latest_versions(f"{model_name}_scaler", stages=["production"])[0]
@@ -64,35 +68,47 @@ class ModelType(Enum):
     PRODUCTION = auto()
 
 
-def download_model(model_name: str, model_type: ModelType) -> str | None:
+_tracking_ready = False
+
+def init_tracking() -> None:
+    global _tracking_ready
+    # Token and dagshub.init only need to happen once per process
+    if _tracking_ready:
+        return
+
+    import dagshub
+    import dagshub.auth as dh_auth
+    from dagshub.data_engine.datasources import mlflow
+
     dh_auth.add_app_token(token=os.getenv("DAGSHUB_TOKEN"))
     dagshub.init('iis-projekt', 'jernej10', mlflow=True)
     mlflow.set_tracking_uri('https://dagshub.com/jernej10/iis-projekt.mlflow')
+    _tracking_ready = True
 
-    folder_name = f"models/sp500"
-    model_type_str = model_type.name.lower()
-
-    model_func = get_latest_model_version if model_type == ModelType.LATEST else get_production_model
-
-    model = model_func(model_name)
 
-    if not os.path.exists(folder_name):
-        os.makedirs(folder_name)
+def get_model_version(model_name: str, model_type: ModelType) -> str | None:
+    from mlflow import MlflowClient
 
-    if model is None:
+    stage = "staging" if model_type == ModelType.LATEST else "production"
+    try:
+        client = MlflowClient()
+        return client.get_latest_versions(model_name, stages=[stage])[0].version
+    except IndexError:
+        print(f"{model_type.name.capitalize()} model {model_name} not found.")
         return None
 
-    onnx.save_model(model, f"{folder_name}/{model_name}_{model_type.name.lower()}.onnx")
-    print(f"{model_type_str.capitalize()} model for {model_name} has been downloaded.")
-    model_path = f"{folder_name}/{model_name}_{model_type}.onnx"
 
-    return model_path
+def download_model(model_name: str, model_type: ModelType) -> str | None:
+    from src.models.helpers.model_cache import model_cache
+
+    # Only downloads when the registered version is not cached yet; returns models/sp500/<name>_<stage>.onnx
+    return model_cache.resolve(model_name, model_type)
 
 
 def empty_model_registry():
-    dh_auth.add_app_token(token=os.getenv("DAGSHUB_TOKEN"))
-    dagshub.init('iis-projekt', 'jernej10', mlflow=True)
-    mlflow.set_tracking_uri('https://dagshub.com/jernej10/iis-projekt.mlflow')
+    from mlflow import MlflowClient
+
+    init_tracking()
 
     client = MlflowClient()
 
@@ -0,0 +1,105 @@
+import os
+
+import onnxruntime as ort
+
+# Named session profiles. Single-row serving wants no thread fan-out, offline/batch
+# scoring wants every core. Graph optimization stays at EXTENDED because the saved
+# optimized graph has to stay portable between machines (ALL adds hardware-specific layouts).
+PROFILES = {
+    "default": {},
+    "low_latency": {
+        "intra_op_num_threads": 1,
+        "inter_op_num_threads": 1,
+        "execution_mode": ort.ExecutionMode.ORT_SEQUENTIAL,
+        "graph_optimization_level": ort.GraphOptimizationLevel.ORT_ENABLE_EXTENDED,
+        "enable_cpu_mem_arena": True,
+        "enable_mem_pattern": True,
+    },
+    "throughput": {
+        "intra_op_num_threads": os.cpu_count() or 1,
+        "inter_op_num_threads": 1,
+        "execution_mode": ort.ExecutionMode.ORT_SEQUENTIAL,
+        "graph_optimization_level": ort.GraphOptimizationLevel.ORT_ENABLE_EXTENDED,
+        "enable_cpu_mem_arena": True,
+        "enable_mem_pattern": True,
+    },
+    "low_memory": {
+        "intra_op_num_threads": 1,
+        "inter_op_num_threads": 1,
+        "execution_mode": ort.ExecutionMode.ORT_SEQUENTIAL,
+        "graph_optimization_level": ort.GraphOptimizationLevel.ORT_ENABLE_EXTENDED,
+        "enable_cpu_mem_arena": False,
+        "enable_mem_pattern": False,
+    },
+}
+
+
+def session_options(profile: str) -> ort.SessionOptions:
+    if profile not in PROFILES:
+        raise ValueError(f"Unknown ONNX session profile '{profile}', expected one of {list(PROFILES)}")
+
+    options = ort.SessionOptions()
+    for name, value in PROFILES[profile].items():
+        setattr(options, name, value)
+    return options
+
+
+def optimized_model_path(model_path: str, profile: str) -> str:
+    root, _ = os.path.splitext(model_path)
+    return f"{root}.{profile}.opt.onnx"
+
+
+def is_zipmap_output(output) -> bool:
+    # sklearn classifiers exported with the default ZipMap return one {class: probability} dict per row
+    return output.type.startswith("seq(map(")
+
+
+def strip_zipmap(model_path: str) -> bytes:
+    """Serialized model whose ZipMap outputs are replaced by the dense [N, classes] tensor feeding them."""
+    import onnx
+
+    model = onnx.load(model_path)
+    graph = model.graph
+    for node in [node for node in graph.node if node.op_type == "ZipMap"]:
+        graph.node.remove(node)
+        for i, output in enumerate(graph.output):
+            if output.name == node.output[0]:
+                dense = onnx.helper.make_tensor_value_info(node.input[0], onnx.TensorProto.FLOAT, [None, None])
+                # Same position, so get_outputs()[1] is still the probabilities
+                graph.output.remove(output)
+                graph.output.insert(i, dense)
+    return model.SerializeToString()
+
+
+def create_session(model_path: str, profile: str = "default", cache_optimized: bool = True) -> ort.InferenceSession:
+    session = _create_session(model_path, profile, cache_optimized)
+    if not any(is_zipmap_output(output) for output in session.get_outputs()):
+        return session
+
+    # Compatibility path for artifacts exported with ZipMap - serve them with a dense probability tensor
+    print(f"[ONNX sessions] - Removing ZipMap from {model_path}")
+    options = session_options(profile)
+    if cache_optimized and profile != "default":
+        options.optimized_model_filepath = optimized_model_path(model_path, profile)
+    return ort.InferenceSession(strip_zipmap(model_path), sess_options=options)
+
+
+def _create_session(model_path: str, profile: str, cache_optimized: bool) -> ort.InferenceSession:
+    options = session_options(profile)
+
+    if not cache_optimized or profile == "default":
+        return ort.InferenceSession(model_path, sess_options=options)
+
+    optimized_path = optimized_model_path(model_path, profile)
+
+    if os.path.exists(optimized_path) and os.path.getmtime(optimized_path) >= os.path.getmtime(model_path):
+        # Graph was optimized on an earlier startup - skip the optimization passes
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_DISABLE_ALL
+        try:
+            return ort.InferenceSession(optimized_path, sess_options=options)
+        except Exception as e:
+            print(f"[ONNX sessions] - Could not load {optimized_path}, re-optimizing: {e}")
+            options = session_options(profile)
+
+    options.optimized_model_filepath = optimized_path
+    return ort.InferenceSession(model_path, sess_options=options)
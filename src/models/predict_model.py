@@ -2,11 +2,11 @@ import os
 import numpy as np
 import mlflow
 from mlflow import MlflowClient
-import onnxruntime as ort
 
 from src.models.helpers.helper_dataset import load_dataset, write_metrics_to_file, write_regression_metrics_to_file
 from src.models.helpers.helper_training import evaluate_model_performance_classification, evaluate_model_performance_regression
 from src.models.helpers.model_registry import download_model, ModelType
+from src.models.helpers.onnx_sessions import create_session
 
 from dotenv import load_dotenv
 import dagshub
@@ -49,11 +49,11 @@ def predict_model(model_name: str, test_file: str):
         update_production_model(model_name + "_regression")
         return
 
-    latest_model = ort.InferenceSession(latest_model_path)
-    production_model = ort.InferenceSession(production_model_path)
+    latest_model = create_session(latest_model_path, "throughput")
+    production_model = create_session(production_model_path, "throughput")
 
-    latest_model_regression = ort.InferenceSession(latest_model_path_regression)
-    production_model_regression = ort.InferenceSession(production_model_path_regression)
+    latest_model_regression = create_session(latest_model_path_regression, "throughput")
+    production_model_regression = create_session(production_model_path_regression, "throughput")
 
     print("Classification model")
     for node in latest_model.get_outputs():
@@ -81,7 +81,7 @@ def predict_model(model_name: str, test_file: str):
     latest_model_predictions_regression = latest_model_regression.run([label_name_regression], {input_name_regression: X_test_regression})[0]
     print('latest_model_predictions_regression', latest_model_predictions_regression)
     # Determine predicted class based on the probability with a threshold
-    predicted_classes = [1 if prediction[1] > 0.35 else 0 for prediction in latest_model_predictions]
+    predicted_classes = (latest_model_predictions[:, 1] > 0.35).astype(int)
     print(predicted_classes)
 
     accuracy_test, precision_test, recall_test, f1_test = evaluate_model_performance_classification(test_dataset["Target"], predicted_classes)
@@ -111,7 +111,7 @@ def predict_model(model_name: str, test_file: str):
 
 
     production_model_predictions = production_model.run([label_name_probability], {input_name: X_test_classification})[0]
-    predicted_classes = [1 if prediction[1] > 0.35 else 0 for prediction in production_model_predictions]
+    predicted_classes = (production_model_predictions[:, 1] > 0.35).astype(int)
 
     accuracy_production, precision_production, recall_production, f1_production = evaluate_model_performance_classification(test_dataset["Target"], predicted_classes)
 
@@ -142,7 +142,7 @@ def main():
         mlflow.end_run()
 
     model_name = "sp500_model"
-    predict_model(model_name, "data/validation/test.csv")
+    predict_model(model_name, "data/validation/test")
 
 if __name__ == "__main__":
     main()
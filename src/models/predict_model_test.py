@@ -1,7 +1,6 @@
 import os
 import numpy as np
 import mlflow
-import onnxruntime as ort
 
 from dotenv import load_dotenv
 from sklearn.model_selection import train_test_split
@@ -11,6 +10,7 @@ from src.models.helpers.helper_dataset import load_dataset, write_metrics_to_fil
 from src.models.helpers.helper_training import evaluate_model_performance_classification, \
     evaluate_model_performance_regression
 from src.models.helpers.model_registry import download_model, ModelType
+from src.models.helpers.onnx_sessions import create_session
 
 import dagshub
 import dagshub.auth as dh_auth
@@ -49,16 +49,20 @@ def evaluate_classification(model_name: str, test_file: str):
     production_model_path = download_model(model_name, ModelType.PRODUCTION)
     latest_model_path = download_model(model_name, ModelType.LATEST)
 
+    if latest_model_path is None:
+        print("No latest model found.")
+        return
+
     if production_model_path is None:
         update_production_model(model_name)
         return
 
-    latest_model = ort.InferenceSession(f"models/sp500/{model_name}_latest.onnx")
+    latest_model = create_session(latest_model_path, "throughput")
     input_name = latest_model.get_inputs()[0].name
     label_name_probability = latest_model.get_outputs()[1].name
 
     latest_model_predictions = latest_model.run([label_name_probability], {input_name: X_test.values.astype(np.float32)})[0]
-    predicted_classes = [1 if prediction[1] > 0.6 else 0 for prediction in latest_model_predictions]
+    predicted_classes = (latest_model_predictions[:, 1] > 0.6).astype(int)
     print(predicted_classes)
     accuracy, precision, recall, f1 = evaluate_model_performance_classification(y_test.values[-len(predicted_classes):],
                                                                                 predicted_classes)
@@ -78,9 +82,9 @@ def evaluate_classification(model_name: str, test_file: str):
     mlflow.log_metric("f1", f1)
     '''
     # Get production model performance
-    production_model = ort.InferenceSession("models/sp500/sp500_model_production.onnx")
+    production_model = create_session(production_model_path, "throughput")
     production_model_predictions = production_model.run([production_model.get_outputs()[1].name], {input_name: X_test.values.astype(np.float32)})[0]
-    production_predicted_classes = [1 if prediction[1] > 0.6 else 0 for prediction in production_model_predictions]
+    production_predicted_classes = (production_model_predictions[:, 1] > 0.6).astype(int)
 
     _, precision_production, _, _ = evaluate_model_performance_classification(y_test.values, production_predicted_classes)
 
@@ -100,11 +104,15 @@ def evaluate_regression(model_name: str, test_file: str):
     production_model_path = download_model(model_name, ModelType.PRODUCTION)
     latest_model_path = download_model(model_name, ModelType.LATEST)
 
+    if latest_model_path is None:
+        print("No latest model found.")
+        return
+
     if production_model_path is None:
         update_production_model(model_name)
         return
 
-    latest_model = ort.InferenceSession(f"models/sp500/{model_name}_latest.onnx")
+    latest_model = create_session(latest_model_path, "throughput")
     input_name = latest_model.get_inputs()[0].name
     label_name_regression = latest_model.get_outputs()[0].name
 
@@ -126,7 +134,7 @@ def evaluate_regression(model_name: str, test_file: str):
     '''
 
     # Get production model performance
-    production_model = ort.InferenceSession("models/sp500/sp500_model_regression_production.onnx")
+    production_model = create_session(production_model_path, "throughput")
     production_model_predictions = production_model.run([label_name_regression], {input_name: X_test.values.astype(np.float32)})[0]
     mse_production, _, _ = evaluate_model_performance_regression(y_test.values, production_model_predictions)
 
@@ -145,7 +153,7 @@ def main():
     if mlflow.active_run():
         mlflow.end_run()
 
-    file = "data/current_data.csv"
+    file = "data/current_data"
 
     evaluate_classification("sp500_model", file)
     evaluate_regression("sp500_model_regression", file)
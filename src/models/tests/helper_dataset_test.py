@@ -0,0 +1,35 @@
+import numpy as np
+import pandas as pd
+
+from src.data.helpers.dataset_store import write_dataset
+from src.models.helpers.helper_dataset import load_dataset
+from src.models.train_model_test import load_and_prepare_data
+
+
+def test_training_loader_reads_arrow_dataset(tmp_path):
+    days = pd.bdate_range("2019-12-02", "2020-02-28")
+    frame = pd.DataFrame({
+        "Date": days[::-1],
+        "Close": np.linspace(3000, 3400, len(days)),
+        "Volume": np.arange(len(days)) * 1000,
+        "Target": np.arange(len(days)) % 2,
+        # Rolling columns start with NaN, the loader fills them with the column mean
+        "Trend_5": np.where(np.arange(len(days)) < 5, np.nan, 2.0),
+    })
+    write_dataset(frame, str(tmp_path))
+
+    dataset = load_and_prepare_data(str(tmp_path))
+
+    assert len(dataset) == len(frame) - 1
+    assert "Date" not in dataset.columns
+    assert not dataset.isna().any().any()
+    assert dataset["Trend_5"].eq(2.0).all()
+
+
+def test_loaded_frame_is_writable(tmp_path):
+    frame = pd.DataFrame({"Date": pd.bdate_range("2020-01-01", periods=5), "Close": np.arange(5.0)})
+    write_dataset(frame, str(tmp_path))
+
+    dataset = load_dataset(str(tmp_path))
+    dataset.loc[0, "Close"] = 10.0
+    assert dataset["Close"].iloc[0] == 10.0
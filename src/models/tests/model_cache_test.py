@@ -0,0 +1,94 @@
+import os
+
+import pytest
+
+from src.models.helpers.model_cache import ModelCache, file_checksum
+from src.models.helpers.model_registry import ModelType
+
+
+class FakeRegistry:
+    def __init__(self):
+        self.version = "1"
+        self.fetches = []
+
+    def fetch_version(self, model_name, model_type):
+        if self.version == "down":
+            raise ConnectionError("registry down")
+        return self.version
+
+    def fetch(self, model_name, version, target_dir):
+        self.fetches.append(version)
+        path = os.path.join(target_dir, "model.onnx")
+        with open(path, "wb") as f:
+            f.write(f"{model_name} v{version}".encode())
+        return path
+
+
+@pytest.fixture
+def cache(tmp_path):
+    registry = FakeRegistry()
+    cache = ModelCache(
+        root=str(tmp_path / "cache"), models_dir=str(tmp_path / "sp500"), max_versions=1,
+        fetch_version=registry.fetch_version, fetch=registry.fetch, connect=None,
+    )
+    return cache, registry
+
+
+def read(path):
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def test_unchanged_version_is_not_downloaded_again(cache):
+    cache, registry = cache
+
+    first = cache.resolve("sp500_model", ModelType.PRODUCTION)
+    second = cache.resolve("sp500_model", ModelType.PRODUCTION)
+
+    assert first == second == cache.published_path("sp500_model", ModelType.PRODUCTION)
+    assert first.endswith("sp500_model_production.onnx")
+    assert read(first) == b"sp500_model v1"
+    assert registry.fetches == ["1"]
+    assert cache.stats() == {"hits": 1, "downloads": 1}
+
+
+def test_new_version_is_published_and_old_ones_evicted(cache):
+    cache, registry = cache
+
+    for version in ["1", "2", "3"]:
+        registry.version = version
+        path = cache.resolve("sp500_model", ModelType.PRODUCTION)
+        assert read(path) == f"sp500_model v{version}".encode()
+
+    # Published version plus max_versions=1 older one
+    kept = sorted(os.listdir(os.path.join(cache.root, "sp500_model", "production")))
+    assert [name.split("-")[0] for name in kept] == ["2", "3"]
+
+    # Rolling back to a cached version needs no download
+    registry.version = "2"
+    assert read(cache.resolve("sp500_model", ModelType.PRODUCTION)) == b"sp500_model v2"
+    assert registry.fetches == ["1", "2", "3"]
+
+
+def test_corrupt_entry_is_downloaded_again(cache):
+    cache, registry = cache
+    cache.resolve("sp500_model", ModelType.LATEST)
+
+    (cached,) = os.listdir(os.path.join(cache.root, "sp500_model", "latest"))
+    with open(os.path.join(cache.root, "sp500_model", "latest", cached), "wb") as f:
+        f.write(b"truncated")
+
+    path = cache.resolve("sp500_model", ModelType.LATEST)
+    assert registry.fetches == ["1", "1"]
+    assert file_checksum(path) == file_checksum(os.path.join(cache.root, "sp500_model", "latest", cached))
+
+
+def test_registry_outage_falls_back_to_published_model(cache):
+    cache, registry = cache
+    registry.version = "down"
+    assert cache.resolve("sp500_model", ModelType.PRODUCTION) is None
+
+    registry.version = "1"
+    published = cache.resolve("sp500_model", ModelType.PRODUCTION)
+    registry.version = "down"
+    assert cache.resolve("sp500_model", ModelType.PRODUCTION) == published
@@ -0,0 +1,22 @@
+import numpy as np
+
+from src.models.benchmark_zipmap import export_models
+from src.models.helpers.onnx_sessions import create_session, is_zipmap_output
+
+
+def test_zipmap_artifacts_are_served_with_dense_probabilities(tmp_path):
+    paths = export_models(6, str(tmp_path))
+    X = np.random.default_rng(3).random((50, 6), dtype=np.float32)
+
+    stripped = create_session(paths["zipmap"], "low_latency")
+    dense = create_session(paths["dense"], "low_latency")
+
+    assert not any(is_zipmap_output(output) for output in stripped.get_outputs())
+    probabilities = stripped.run([stripped.get_outputs()[1].name], {"input": X})[0]
+    expected = dense.run([dense.get_outputs()[1].name], {"input": X})[0]
+    assert probabilities.shape == (50, 2)
+    np.testing.assert_allclose(probabilities, expected)
+
+    # Second load comes from the cached optimized graph, which is already dense
+    reloaded = create_session(paths["zipmap"], "low_latency")
+    assert not any(is_zipmap_output(output) for output in reloaded.get_outputs())
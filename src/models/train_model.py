@@ -16,7 +16,7 @@ load_dotenv()
 def prepare_and_train_model() -> None:
     client = MlflowClient()
 
-    dataset = load_dataset(f"data/validation/train.csv")
+    dataset = load_dataset("data/validation/train")
     dataset.sort_values(by="Date", inplace=True)
     dataset.drop(columns=["Date"], inplace=True)
 
@@ -40,7 +40,8 @@ def prepare_and_train_model() -> None:
 
     # Convert RandomForest model to ONNX
     initial_type = [('input', FloatTensorType([None, len(predictors)]))]
-    onnx_model = convert_sklearn(model, initial_types=initial_type)
+    # Dense probabilities tensor instead of a ZipMap dict per row
+    onnx_model = convert_sklearn(model, initial_types=initial_type, options={id(model): {"zipmap": False}})
 
     initial_type_regression = [('input', FloatTensorType([None, len(predictors_regression)]))]
     onnx_model_regression = convert_sklearn(model_regression, initial_types=initial_type_regression)
@@ -133,7 +133,7 @@ def prepare_and_train_model(file: str):
     print(f"Models have been trained and saved!")
 
 def main():
-    file = "data/current_data.csv"
+    file = "data/current_data"
 
     initialize_dagshub()
     prepare_and_train_model(file)
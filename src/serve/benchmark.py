@@ -0,0 +1,317 @@
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import tempfile
+import time
+import zlib
+from contextlib import contextmanager
+from typing import Iterator
+
+import numpy as np
+import pandas as pd
+
+# Period -> number of trailing daily bars the replay provider returns
+PERIOD_ROWS = {"1d": 1, "5d": 5, "1mo": 21, "3mo": 63, "6mo": 126, "1y": 252, "2y": 504, "5y": 1260, "10y": 2520}
+
+
+class CsvReplayProvider:
+    """Stands in for yfinance: serves bars from local CSVs (or synthetic ones) per ticker."""
+
+    def __init__(self, files: dict[str, str] | None = None, rows: int = 2000):
+        self.files = files or {}
+        self.rows = rows
+        self._frames: dict[str, pd.DataFrame] = {}
+
+    def __call__(self, ticker: str, period: str, interval: str) -> pd.DataFrame:
+        frame = self._frame(ticker)
+        if period == "max":
+            return frame.copy()
+        return frame.tail(PERIOD_ROWS.get(period, 1)).reset_index(drop=True)
+
+    def _frame(self, ticker: str) -> pd.DataFrame:
+        if ticker not in self._frames:
+            file = self.files.get(ticker)
+            if file and os.path.isfile(file):
+                frame = pd.read_csv(file)
+                frame["Date"] = pd.to_datetime(frame["Date"].astype(str).str[:10], format='%Y-%m-%d')
+            else:
+                frame = synthetic_bars(ticker, self.rows)
+            self._frames[ticker] = frame
+        return self._frames[ticker]
+
+
+def synthetic_bars(ticker: str, rows: int) -> pd.DataFrame:
+    # crc32, not hash(): str hashes are salted per process and reports must compare across runs
+    rng = np.random.default_rng(zlib.crc32(ticker.encode()))
+    close = 4000 * np.exp(np.cumsum(rng.normal(0, 0.01, rows)))
+    return pd.DataFrame({
+        "Date": pd.bdate_range(end=pd.Timestamp.today().normalize(), periods=rows),
+        "Open": close * (1 + rng.normal(0, 0.002, rows)),
+        "High": close * 1.005,
+        "Low": close * 0.995,
+        "Close": close,
+        "Volume": rng.integers(2_000_000_000, 5_000_000_000, rows).astype(float),
+        "Dividends": 0.0,
+        "Stock Splits": 0.0,
+    })
+
+
+class InMemoryCursor:
+    def __init__(self, documents: list[dict]):
+        self.documents = documents
+
+    def sort(self, key: str, direction: int = 1) -> "InMemoryCursor":
+        return InMemoryCursor(sorted(self.documents, key=lambda document: document.get(key), reverse=direction < 0))
+
+    def limit(self, count: int) -> "InMemoryCursor":
+        return InMemoryCursor(self.documents[:count])
+
+    def __iter__(self):
+        return iter(self.documents)
+
+
+class InMemoryCollection:
+    """The subset of the pymongo collection API the service uses."""
+
+    _ids = itertools.count(1)
+
+    def __init__(self):
+        self.documents: list[dict] = []
+
+    def insert_one(self, document: dict):
+        document.setdefault("_id", next(self._ids))
+        self.documents.append(document)
+
+    def insert_many(self, documents: list[dict], ordered: bool = True):
+        for document in documents:
+            self.insert_one(document)
+
+    def bulk_write(self, requests, ordered: bool = True):
+        for request in requests:
+            self.replace_one(request._filter, request._doc, upsert=request._upsert)
+
+    def replace_one(self, filter: dict, document: dict, upsert: bool = False):
+        for i, existing in enumerate(self.documents):
+            if all(existing.get(key) == value for key, value in filter.items()):
+                self.documents[i] = {**document, "_id": existing["_id"]}
+                return
+        if upsert:
+            self.insert_one(dict(document))
+
+    def find(self) -> InMemoryCursor:
+        # Copies, like documents decoded from the wire
+        return InMemoryCursor([dict(document) for document in self.documents])
+
+    def find_one(self, sort: list[tuple[str, int]] | None = None):
+        cursor = self.find()
+        for key, direction in reversed(sort or []):
+            cursor = cursor.sort(key, direction)
+        return next(iter(cursor.limit(1)), None)
+
+
+@contextmanager
+def offline_app(data_dir: str | None = None, model_dir: str = "models/sp500", cold: bool = False) -> Iterator:
+    """Points src.serve.main at local stand-ins for Yahoo, Mongo, MLflow and the model registry."""
+    import src.serve.main as main
+
+    workdir = tempfile.mkdtemp(prefix="serve-benchmark-")
+    files = {}
+    if data_dir:
+        files = {"^GSPC": os.path.join(data_dir, "sp500.csv"), "^NDX": os.path.join(data_dir, "nasdaq100.csv")}
+    provider = CsvReplayProvider(files)
+
+    # Raw price file for /historical-prices, in the format fetch_data writes
+    price_file = files.get("^GSPC")
+    if not price_file or not os.path.isfile(price_file):
+        price_file = os.path.join(workdir, "sp500.csv")
+        provider("^GSPC", "max", "1d").set_index("Date").to_csv(price_file)
+
+    validation_results = InMemoryCollection()
+    validation_results.insert_one({"success": True, "messages": [], "timestamp": "2024-05-01T00:00:00"})
+
+    patches = [
+        (main.market_data, "fetch", provider),
+        # Per-ticker calls into the replay provider instead of a Yahoo batch download
+        (main.market_data, "fetch_many", None),
+        (main.model_sessions, "folder", model_dir),
+        (main.model_sessions, "fetch_version", lambda model_name, model_type: None),
+        (main.model_sessions, "connect", None),
+        (main.model_sessions, "poll_interval", 0),
+        (main.prediction_log, "collection", InMemoryCollection()),
+        (main, "metric_limit_collection", InMemoryCollection()),
+        (main, "validation_results_collection", validation_results),
+        (main.price_store, "file", price_file),
+        (main.metrics_snapshot, "db_path", os.path.join(workdir, "metrics.db")),
+        (main.metrics_snapshot, "experiment_ids", []),
+        (main.metrics_snapshot, "connect", None),
+        (main.metrics_snapshot, "refresh_interval", 0),
+    ]
+    if cold:
+        patches += [
+            (main.market_data, "ttl", lambda interval, now: 0),
+            (main.prediction_cache, "max_entries", 0),
+        ]
+
+    originals = [(target, name, getattr(target, name)) for target, name, _ in patches]
+    for target, name, value in patches:
+        setattr(target, name, value)
+    main.metrics_snapshot._schema_ready = False
+    main.market_data.clear()
+    main.prediction_cache.clear()
+
+    try:
+        yield main.app
+    finally:
+        for target, name, value in originals:
+            setattr(target, name, value)
+        main.metrics_snapshot._schema_ready = False
+        main.market_data.clear()
+        main.prediction_cache.clear()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def batch_payload(rows: int) -> dict:
+    row = {"Close": 5030.0, "Volume": 3.5e9, "Open": 5000.0, "High": 5050.0, "Low": 4980.0, "Open_Nasdaq": 17800.0}
+    return {"rows": [row] * rows}
+
+
+ENDPOINTS = {
+    "root": ("GET", "/", None),
+    "ready": ("GET", "/ready", None),
+    "predict": ("GET", "/predict", None),
+    "predict_regression": ("GET", "/predict/regression", None),
+    "predict_combined": ("GET", "/predict/combined", None),
+    "predict_batch_100": ("POST", "/predict/batch", batch_payload(100)),
+    "predict_tickers_1": ("GET", "/predict/tickers?tickers=SPY", None),
+    "predict_tickers_50": ("GET", "/predict/tickers?tickers=" + ",".join(f"T{i:02d}" for i in range(50)), None),
+    "historical_prices": ("GET", "/historical-prices", None),
+    "historical_prices_columnar": ("GET", "/historical-prices?columnar=true", None),
+    "metric_limit_create": ("POST", "/metric-limit", {"value": 0.5}),
+    "metric_limit_latest": ("GET", "/metric-limit/latest", None),
+    "latest_validation_result": ("GET", "/latest-validation-result", None),
+    "metrics_history": ("GET", "/metrics-history", None),
+    "production_metrics_history": ("GET", "/production-metrics-history", None),
+}
+
+
+def percentile(values: list[float], q: float) -> float:
+    return float(np.percentile(values, q)) if values else 0.0
+
+
+def is_error(response) -> bool:
+    # Handlers report failures as {"error": ...} with a 200 status
+    if not response.headers.get("content-type", "").startswith("application/json"):
+        return False
+    body = response.json()
+    return isinstance(body, dict) and "error" in body
+
+
+async def drive_endpoint(client, method: str, url: str, payload: dict | None, requests: int, concurrency: int) -> dict:
+    latencies: list[float] = []
+    errors = 0
+    counter = itertools.count()
+
+    async def worker():
+        nonlocal errors
+        while next(counter) < requests:
+            start = time.perf_counter()
+            response = await client.request(method, url, json=payload)
+            latencies.append(time.perf_counter() - start)
+            if response.status_code >= 400 or is_error(response):
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    return {
+        "requests": len(latencies),
+        "concurrency": concurrency,
+        "errors": errors,
+        "throughput_rps": len(latencies) / elapsed if elapsed else 0.0,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+        "mean_ms": statistics.fmean(latencies) * 1000 if latencies else 0.0,
+    }
+
+
+async def run_benchmark(app, endpoints: list[str], requests: int, concurrency: int, warmup: int) -> dict:
+    import httpx
+
+    results = {}
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://benchmark") as client:
+        # Same startup work the lifespan hook does, minus the registry
+        import src.serve.main as main
+        await main.warm_up()
+
+        for name in endpoints:
+            method, url, payload = ENDPOINTS[name]
+            for _ in range(warmup):
+                await client.request(method, url, json=payload)
+            results[name] = await drive_endpoint(client, method, url, payload, requests, concurrency)
+    return results
+
+
+def git_commit() -> str | None:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(current: dict, baseline: dict) -> dict:
+    deltas = {}
+    for name, result in current["endpoints"].items():
+        previous = baseline.get("endpoints", {}).get(name)
+        if previous:
+            deltas[name] = {
+                metric: result[metric] / previous[metric] if previous[metric] else None
+                for metric in ["throughput_rps", "p50_ms", "p95_ms", "p99_ms"]
+            }
+    return deltas
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline load test of src.serve.main:app against local stand-ins")
+    parser.add_argument("--endpoints", default=",".join(ENDPOINTS), help="comma separated subset of: " + ", ".join(ENDPOINTS))
+    parser.add_argument("--requests", type=int, default=200, help="requests per endpoint")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--warmup", type=int, default=5)
+    parser.add_argument("--data-dir", default=None, help="directory with sp500.csv / nasdaq100.csv to replay")
+    parser.add_argument("--model-dir", default="models/sp500")
+    parser.add_argument("--cold", action="store_true", help="disable the market data and prediction caches")
+    parser.add_argument("--output", default=None, help="write the JSON report to this file")
+    parser.add_argument("--compare", default=None, help="earlier JSON report to compute ratios against")
+    args = parser.parse_args()
+
+    endpoints = [name.strip() for name in args.endpoints.split(",") if name.strip()]
+
+    with offline_app(args.data_dir, args.model_dir, args.cold) as app:
+        results = asyncio.run(run_benchmark(app, endpoints, args.requests, args.concurrency, args.warmup))
+
+    report = {
+        "commit": git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "settings": {"requests": args.requests, "concurrency": args.concurrency, "cold": args.cold},
+        "endpoints": results,
+    }
+    if args.compare:
+        with open(args.compare) as f:
+            report["ratio_to_baseline"] = compare(report, json.load(f))
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output)
+    print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,76 +1,215 @@
 import os
-import mlflow
-from dotenv import load_dotenv
-import dagshub
-from dagshub.data_engine.datasources import mlflow
-import dagshub.auth as dh_auth
-
-load_dotenv()
-
-
-
-def get_metrics_history():
-    dh_auth.add_app_token(token=os.getenv("DAGSHUB_TOKEN"))
-    dagshub.init('iis-projekt', 'jernej10', mlflow=True)
-    mlflow.set_tracking_uri('https://dagshub.com/jernej10/iis-projekt.mlflow')
-
-    if mlflow.active_run():
-        mlflow.end_run()
-
-    metrics = {"classification": [], "regression": []}
-
-    # Classification metrics
-    runs = mlflow.search_runs(["1"])
-    for index, row in runs.iterrows():
-        metrics["classification"].append({
-            "accuracy": row.get('metrics.accuracy', None),
-            "precision": row.get('metrics.precision', None),
-            "recall": row.get('metrics.recall', None)
-        })
+import sqlite3
+import threading
+from contextlib import contextmanager
+from typing import Callable, Iterator
 
-    # Regression metrics
-    runs = mlflow.search_runs(["3"])
-    for index, row in runs.iterrows():
-        metrics["regression"].append({
-            "mse": row.get('metrics.mse', None),
-            "mae": row.get('metrics.mae', None),
-            "evs": row.get('metrics.evs', None)
-        })
-
-    # End mlflow run
-    mlflow.end_run()
-
-    return metrics
-
-def get_production_metrics_history():
-    dh_auth.add_app_token(token=os.getenv("DAGSHUB_TOKEN"))
-    dagshub.init('iis-projekt', 'jernej10', mlflow=True)
-    mlflow.set_tracking_uri('https://dagshub.com/jernej10/iis-projekt.mlflow')
+import numpy as np
+import pandas as pd
+from dotenv import load_dotenv
 
-    if mlflow.active_run():
-        mlflow.end_run()
+from src.models.helpers.model_registry import init_tracking
 
-    metrics = {"classification": [], "regression": []}
+load_dotenv()
 
-    # Classification metrics
-    runs = mlflow.search_runs(["4"])
-    for index, row in runs.iterrows():
-        metrics["classification"].append({
-            "accuracy": row.get('metrics.accuracy', None),
-            "precision": row.get('metrics.precision', None),
-            "recall": row.get('metrics.recall', None),
-            "f1": row.get('metrics.f1', None)
+METRICS = ["accuracy", "precision", "recall", "f1", "mse", "mae", "evs"]
+
+# Experiment ids on the DagsHub tracking server
+CLASSIFICATION_EXPERIMENT = "1"
+REGRESSION_EXPERIMENT = "3"
+PRODUCTION_EXPERIMENT = "4"
+
+
+class MetricsSnapshot:
+    """Local SQLite copy of the MLflow run metrics, synced incrementally from a start_time cursor."""
+
+    def __init__(
+        self,
+        db_path: str,
+        experiment_ids: list[str],
+        refresh_interval: float = 600,
+        connect: Callable[[], None] | None = init_tracking,
+    ):
+        self.db_path = db_path
+        self.experiment_ids = experiment_ids
+        self.refresh_interval = refresh_interval
+        self.connect = connect
+
+        self._sync_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._connected = False
+        self._synced = False
+        self._reconciled = False
+        self._schema_ready = False
+
+    def sync(self) -> int:
+        import mlflow
+
+        with self._sync_lock:
+            if self.connect is not None and not self._connected:
+                self.connect()
+                self._connected = True
+
+            if mlflow.active_run():
+                mlflow.end_run()
+
+            # The first sync in a process lists every run, later ones only new runs and deletions
+            full = not self._reconciled
+            synced = 0
+            for experiment_id in self.experiment_ids:
+                synced += self._sync_experiment(experiment_id, full)
+
+            self._synced = True
+            self._reconciled = True
+            return synced
+
+    def history(self, experiment_id: str, metrics: list[str]) -> list[dict]:
+        if not self._synced:
+            try:
+                self.sync()
+            except Exception as e:
+                print(f"[Metrics snapshot] - Sync failed, serving local snapshot: {e}")
+            self._synced = True
+
+        columns = ", ".join(f'"{metric}"' for metric in metrics)
+        with self._db() as db:
+            runs = pd.read_sql_query(
+                f"SELECT {columns} FROM runs WHERE experiment_id = ? ORDER BY start_time DESC",
+                db,
+                params=(experiment_id,),
+            )
+
+        # NaN -> None so the JSON response matches what row.get(...) used to produce
+        return runs.astype(object).where(runs.notna(), None).to_dict(orient="records")
+
+    def start(self) -> None:
+        if self.refresh_interval > 0 and self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._refresh, name="metrics-snapshot-refresh", daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def _refresh(self) -> None:
+        while True:
+            try:
+                self.sync()
+            except Exception as e:
+                print(f"[Metrics snapshot] - Sync failed: {e}")
+            if self._stop.wait(self.refresh_interval):
+                break
+
+    def _sync_experiment(self, experiment_id: str, full: bool = False) -> int:
+        import mlflow
+        from mlflow.entities import ViewType
+
+        with self._db() as db:
+            row = db.execute("SELECT start_time FROM sync_cursor WHERE experiment_id = ?", (experiment_id,)).fetchone()
+        cursor = row[0] if row is not None and not full else None
+
+        # >= so runs sharing the cursor timestamp are re-read, upserts make that harmless
+        filter_string = f"attributes.start_time >= {cursor}" if cursor is not None else ""
+        runs = mlflow.search_runs([experiment_id], filter_string=filter_string)
+
+        if full:
+            # Runs the server no longer returns, also ones already garbage collected
+            kept = set(runs["run_id"]) if not runs.empty else set()
+            with self._db() as db:
+                stored = [run_id for (run_id,) in db.execute("SELECT run_id FROM runs WHERE experiment_id = ?", (experiment_id,))]
+            removed = [run_id for run_id in stored if run_id not in kept]
+        else:
+            deleted = mlflow.search_runs([experiment_id], run_view_type=ViewType.DELETED_ONLY)
+            removed = deleted["run_id"].tolist() if not deleted.empty else []
+        if removed:
+            with self._db() as db:
+                db.executemany("DELETE FROM runs WHERE run_id = ?", [(run_id,) for run_id in removed])
+
+        if runs.empty:
+            return 0
+
+        start_times = (runs["start_time"] - pd.Timestamp(0, tz="UTC")) // pd.Timedelta(milliseconds=1)
+        records = pd.DataFrame({
+            "run_id": runs["run_id"],
+            "experiment_id": experiment_id,
+            "start_time": start_times.astype("int64"),
+            "status": runs["status"],
         })
-
-
-    # End mlflow run
-    mlflow.end_run()
-
-    return metrics
+        for metric in METRICS:
+            column = f"metrics.{metric}"
+            records[metric] = runs[column] if column in runs.columns else np.nan
+
+        # Unfinished runs can still log metrics, so the cursor stays at the oldest of them
+        running = records.loc[records["status"] == "RUNNING", "start_time"]
+        next_cursor = int(running.min() if not running.empty else records["start_time"].max())
+
+        placeholders = ", ".join("?" for _ in records.columns)
+        rows = records.astype(object).where(records.notna(), None).itertuples(index=False, name=None)
+        with self._db() as db:
+            db.executemany(f"INSERT OR REPLACE INTO runs ({', '.join(records.columns)}) VALUES ({placeholders})", rows)
+            db.execute("INSERT OR REPLACE INTO sync_cursor (experiment_id, start_time) VALUES (?, ?)", (experiment_id, next_cursor))
+
+        return len(records)
+
+    @contextmanager
+    def _db(self) -> Iterator[sqlite3.Connection]:
+        if not self._schema_ready:
+            self._create_schema()
+
+        connection = sqlite3.connect(self.db_path)
+        try:
+            with connection:
+                yield connection
+        finally:
+            connection.close()
+
+    def _create_schema(self) -> None:
+        directory = os.path.dirname(self.db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        columns = ", ".join(f'"{metric}" REAL' for metric in METRICS)
+        connection = sqlite3.connect(self.db_path)
+        try:
+            with connection:
+                connection.execute(
+                    f"CREATE TABLE IF NOT EXISTS runs (run_id TEXT PRIMARY KEY, experiment_id TEXT, start_time INTEGER, status TEXT, {columns})"
+                )
+                connection.execute("CREATE INDEX IF NOT EXISTS runs_experiment ON runs (experiment_id, start_time)")
+                connection.execute("CREATE TABLE IF NOT EXISTS sync_cursor (experiment_id TEXT PRIMARY KEY, start_time INTEGER)")
+        finally:
+            connection.close()
+        self._schema_ready = True
+
+
+metrics_snapshot = MetricsSnapshot(
+    os.getenv("METRICS_SNAPSHOT_DB", "data/metrics_snapshot.db"),
+    [CLASSIFICATION_EXPERIMENT, REGRESSION_EXPERIMENT, PRODUCTION_EXPERIMENT],
+    refresh_interval=float(os.getenv("METRICS_REFRESH_INTERVAL", "600")),
+)
+
+
+def get_metrics_history(snapshot: MetricsSnapshot = metrics_snapshot):
+    return {
+        "classification": snapshot.history(CLASSIFICATION_EXPERIMENT, ["accuracy", "precision", "recall"]),
+        "regression": snapshot.history(REGRESSION_EXPERIMENT, ["mse", "mae", "evs"]),
+    }
+
+def get_production_metrics_history(snapshot: MetricsSnapshot = metrics_snapshot):
+    return {
+        "classification": snapshot.history(PRODUCTION_EXPERIMENT, ["accuracy", "precision", "recall", "f1"]),
+        # Part of the response clients read; production regression metrics are not tracked in an experiment
+        "regression": [],
+    }
 
 
 
 if __name__ == "__main__":
+    metrics_snapshot.sync()
     metrics = get_metrics_history()
     print(metrics)
-    #print(get_production_metrics_history())
\ No newline at end of file
+    #print(get_production_metrics_history())
@@ -0,0 +1,55 @@
+import asyncio
+import json
+from typing import AsyncIterator
+
+HEARTBEAT_INTERVAL = 15
+
+
+class PredictionBroadcaster:
+    """Fans the latest combined prediction out to every stream subscriber."""
+
+    def __init__(self, heartbeat_interval: float = HEARTBEAT_INTERVAL):
+        self.heartbeat_interval = heartbeat_interval
+        self.latest: dict | None = None
+        self.broadcasts = 0
+        self._subscribers: set[asyncio.Queue] = set()
+
+    def publish(self, result: dict) -> bool:
+        # Only a new bar or model version changes the result, everything else is a repeat
+        if "error" in result or result == self.latest:
+            return False
+
+        self.latest = result
+        self.broadcasts += 1
+        for queue in self._subscribers:
+            # Subscribers only need the newest value - a slow one skips the ones it missed
+            if queue.full():
+                queue.get_nowait()
+            queue.put_nowait(result)
+        return True
+
+    async def subscribe(self) -> AsyncIterator[dict | None]:
+        """Yields the current snapshot, then every new result; None means nothing changed for a heartbeat interval."""
+        queue: asyncio.Queue = asyncio.Queue(maxsize=1)
+        self._subscribers.add(queue)
+        try:
+            if self.latest is not None:
+                yield self.latest
+            while True:
+                try:
+                    yield await asyncio.wait_for(queue.get(), self.heartbeat_interval)
+                except asyncio.TimeoutError:
+                    yield None
+        finally:
+            self._subscribers.discard(queue)
+
+    async def events(self) -> AsyncIterator[str]:
+        async for result in self.subscribe():
+            if result is None:
+                # SSE comment, keeps idle connections open through proxies
+                yield ": keep-alive\n\n"
+            else:
+                yield f"event: prediction\ndata: {json.dumps(result)}\n\n"
+
+    def stats(self) -> dict:
+        return {"subscribers": len(self._subscribers), "broadcasts": self.broadcasts}
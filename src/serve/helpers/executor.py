@@ -0,0 +1,19 @@
+import asyncio
+import functools
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable
+
+UPSTREAM_TIMEOUT = float(os.getenv("UPSTREAM_TIMEOUT", "10"))
+INFERENCE_TIMEOUT = float(os.getenv("INFERENCE_TIMEOUT", "2"))
+BATCH_INFERENCE_TIMEOUT = float(os.getenv("BATCH_INFERENCE_TIMEOUT", "30"))
+DB_TIMEOUT = float(os.getenv("DB_TIMEOUT", "5"))
+
+# Bounded so a burst of slow upstream calls cannot spawn unlimited threads
+blocking_pool = ThreadPoolExecutor(max_workers=int(os.getenv("BLOCKING_POOL_SIZE", "8")), thread_name_prefix="blocking")
+
+
+async def run_blocking(func: Callable[..., Any], *args, timeout: float | None = None, **kwargs) -> Any:
+    loop = asyncio.get_running_loop()
+    future = loop.run_in_executor(blocking_pool, functools.partial(func, *args, **kwargs))
+    return await asyncio.wait_for(future, timeout=timeout)
@@ -0,0 +1,248 @@
+import os
+import threading
+import time
+from contextlib import ExitStack
+from datetime import datetime, timedelta
+from typing import Callable
+from zoneinfo import ZoneInfo
+
+import pandas as pd
+
+MARKET_TZ = ZoneInfo("America/New_York")
+MARKET_OPEN = (9, 30)
+MARKET_CLOSE = (16, 0)
+
+# While the market is open the current bar keeps changing, so it is only cached briefly
+OPEN_SESSION_TTL = {"1d": 60, "5d": 300, "1wk": 300, "1mo": 300}
+INTRADAY_TTL = {"1m": 60, "2m": 120, "5m": 300, "15m": 900, "30m": 1800, "60m": 3600, "90m": 5400, "1h": 3600}
+# Threads yfinance itself uses for one multi-ticker download, separate from the service's blocking pool
+DOWNLOAD_THREADS = int(os.getenv("TICKER_DOWNLOAD_THREADS", "8"))
+
+
+def fetch_from_yahoo(ticker: str, period: str, interval: str) -> pd.DataFrame:
+    import yfinance as yf
+
+    data = yf.Ticker(ticker)
+    data = data.history(period=period, interval=interval)
+    data.reset_index(inplace=True)  # Resetiranje indeksa
+
+    return data
+
+
+def fetch_many_from_yahoo(tickers: list[str], period: str, interval: str) -> dict[str, pd.DataFrame]:
+    import yfinance as yf
+
+    data = yf.download(
+        tickers, period=period, interval=interval, group_by="ticker",
+        actions=True, auto_adjust=True, threads=DOWNLOAD_THREADS, progress=False,
+    )
+    frames = {}
+    for ticker in tickers:
+        if isinstance(data.columns, pd.MultiIndex):
+            frame = data[ticker] if ticker in data.columns.get_level_values(0) else pd.DataFrame()
+        else:
+            frame = data
+        # Rows are the union of all tickers' dates, a failed ticker is all NaN
+        frame = frame.dropna(how="all")
+        frame.columns.name = None
+        frames[ticker] = frame.reset_index()
+    return frames
+
+
+def next_session_open(now: datetime) -> datetime:
+    local = now.astimezone(MARKET_TZ)
+    candidate = local.replace(hour=MARKET_OPEN[0], minute=MARKET_OPEN[1], second=0, microsecond=0)
+    if candidate <= local:
+        candidate += timedelta(days=1)
+    while candidate.weekday() >= 5:
+        candidate += timedelta(days=1)
+    return candidate
+
+
+def is_session_open(now: datetime) -> bool:
+    local = now.astimezone(MARKET_TZ)
+    if local.weekday() >= 5:
+        return False
+    opens = local.replace(hour=MARKET_OPEN[0], minute=MARKET_OPEN[1], second=0, microsecond=0)
+    closes = local.replace(hour=MARKET_CLOSE[0], minute=MARKET_CLOSE[1], second=0, microsecond=0)
+    return opens <= local < closes
+
+
+def session_ttl(interval: str, now: datetime) -> float:
+    if is_session_open(now):
+        return INTRADAY_TTL.get(interval, OPEN_SESSION_TTL.get(interval, 60))
+    # Nothing changes until the next session opens (exchange holidays just cost one extra refetch)
+    return (next_session_open(now) - now.astimezone(MARKET_TZ)).total_seconds()
+
+
+class _Entry:
+    def __init__(self, data: pd.DataFrame, expires_at: float):
+        self.data = data
+        self.expires_at = expires_at
+        self._last: dict | None = None
+
+    def copy(self) -> pd.DataFrame:
+        return self.data.copy()
+
+    def last_row(self) -> dict:
+        # Built once per fetch; a watchlist only needs the latest bar of every ticker, not a frame copy
+        if self._last is None:
+            self._last = self.data.iloc[-1].to_dict() if len(self.data) else {}
+        return self._last
+
+
+EMPTY = _Entry(pd.DataFrame(), 0.0)
+
+
+class MarketDataCache:
+    """Caches provider responses per (ticker, period, interval) until the trading session makes them stale."""
+
+    def __init__(
+        self,
+        fetch: Callable[[str, str, str], pd.DataFrame] = fetch_from_yahoo,
+        ttl: Callable[[str, datetime], float] = session_ttl,
+        clock: Callable[[], float] = time.time,
+        fetch_many: Callable[[list[str], str, str], dict[str, pd.DataFrame]] | None = None,
+    ):
+        self.fetch = fetch
+        self.ttl = ttl
+        self.clock = clock
+        # Batch provider for get_many; None falls back to one fetch call per ticker
+        self.fetch_many = fetch_many
+
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+        self.errors = 0
+
+        self._entries: dict[tuple[str, str, str], _Entry] = {}
+        self._lock = threading.Lock()
+        self._inflight: dict[tuple[str, str, str], threading.Lock] = {}
+
+    def get(self, ticker: str, period: str, interval: str) -> pd.DataFrame:
+        key = (ticker, period, interval)
+        entry = self._fresh(key)
+        if entry is not None:
+            return entry.copy()
+
+        # Only one caller per key goes upstream, the rest wait and reuse its result
+        with self._key_lock(key):
+            entry = self._fresh(key)
+            if entry is not None:
+                return entry.copy()
+
+            with self._lock:
+                self.misses += 1
+            try:
+                result = self.fetch(ticker, period, interval)
+            except Exception as e:
+                result = e
+            return self._settle(key, result).copy()
+
+    def get_many(self, tickers: list[str], period: str, interval: str, latest: bool = False) -> list:
+        """get() for every ticker, with all the misses fetched in one fetch_many call; failures are returned, not raised.
+
+        latest=True returns the last bar of every ticker as a dict ({} when there is no data) instead of frame copies.
+        """
+        view = _Entry.last_row if latest else _Entry.copy
+        entries: dict[str, _Entry | Exception] = {}
+        for ticker in dict.fromkeys(tickers):
+            entry = self._fresh((ticker, period, interval))
+            if entry is not None:
+                entries[ticker] = entry
+
+        missing = sorted(set(tickers) - set(entries))
+        if missing:
+            with ExitStack() as stack:
+                # Always locked in sorted order, so overlapping watchlists cannot deadlock
+                for ticker in missing:
+                    stack.enter_context(self._key_lock((ticker, period, interval)))
+
+                misses = []
+                for ticker in missing:
+                    entry = self._fresh((ticker, period, interval))
+                    if entry is not None:
+                        entries[ticker] = entry
+                    else:
+                        misses.append(ticker)
+
+                if misses:
+                    with self._lock:
+                        self.misses += len(misses)
+                    try:
+                        fetched = self._fetch_many(misses, period, interval)
+                    except Exception as e:
+                        fetched = {ticker: e for ticker in misses}
+                    for ticker in misses:
+                        try:
+                            entries[ticker] = self._settle((ticker, period, interval), fetched.get(ticker, pd.DataFrame()))
+                        except Exception as e:
+                            entries[ticker] = e
+
+        return [entry if isinstance(entry, Exception) else view(entry) for entry in (entries[ticker] for ticker in tickers)]
+
+    def _fetch_many(self, tickers: list[str], period: str, interval: str) -> dict[str, pd.DataFrame | Exception]:
+        if self.fetch_many is not None:
+            return self.fetch_many(tickers, period, interval)
+        fetched = {}
+        for ticker in tickers:
+            try:
+                fetched[ticker] = self.fetch(ticker, period, interval)
+            except Exception as e:
+                fetched[ticker] = e
+        return fetched
+
+    def _fresh(self, key: tuple[str, str, str]) -> _Entry | None:
+        entry = self._entries.get(key)
+        if entry is not None and entry.expires_at > self.clock():
+            with self._lock:
+                self.hits += 1
+            return entry
+        return None
+
+    def _key_lock(self, key: tuple[str, str, str]) -> threading.Lock:
+        with self._lock:
+            return self._inflight.setdefault(key, threading.Lock())
+
+    def _settle(self, key: tuple[str, str, str], result: pd.DataFrame | Exception) -> _Entry:
+        # Caches a fetched frame; on failure falls back to the stale entry, or an empty one / the error without it
+        ticker, period, interval = key
+        entry = self._entries.get(key)
+        try:
+            if isinstance(result, Exception):
+                raise result
+            if result.empty:
+                raise ValueError(f"No data returned for {ticker}")
+        except Exception as e:
+            with self._lock:
+                self.errors += 1
+            if entry is None:
+                if isinstance(e, ValueError):
+                    return EMPTY
+                raise
+            print(f"[Market data] - Serving stale {ticker} {period}/{interval}: {e}")
+            with self._lock:
+                self.stale += 1
+            return entry
+
+        now = self.clock()
+        expires_at = now + self.ttl(interval, datetime.fromtimestamp(now, tz=MARKET_TZ))
+        entry = _Entry(result, expires_at)
+        self._entries[key] = entry
+        return entry
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "stale": self.stale,
+                "errors": self.errors,
+                "entries": len(self._entries),
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+            }
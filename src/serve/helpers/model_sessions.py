@@ -0,0 +1,142 @@
+import os
+import threading
+from dataclasses import dataclass
+from typing import Callable
+
+import onnxruntime as ort
+
+from src.models.helpers.model_registry import ModelType, download_model, get_model_version, init_tracking
+from src.models.helpers.onnx_sessions import create_session
+from src.serve.helpers.telemetry import stage
+
+
+@dataclass(frozen=True)
+class LoadedModel:
+    name: str
+    model_type: ModelType
+    version: str | None
+    session: ort.InferenceSession
+    input_name: str
+    output_names: list[str]
+
+
+def model_path(folder: str, model_name: str, model_type: ModelType) -> str:
+    return os.path.join(folder, f"{model_name}_{model_type.name.lower()}.onnx")
+
+
+class ModelSessions:
+    """Keeps one InferenceSession per (model name, stage) in memory and swaps in new registry versions."""
+
+    def __init__(
+        self,
+        model_names: list[str],
+        model_types: list[ModelType],
+        folder: str = "models/sp500",
+        poll_interval: float = 300,
+        profile: str = "low_latency",
+        fetch_version: Callable[[str, ModelType], str | None] = get_model_version,
+        download: Callable[[str, ModelType], str | None] = download_model,
+        connect: Callable[[], None] | None = init_tracking,
+    ):
+        self.model_names = model_names
+        self.model_types = model_types
+        self.folder = folder
+        self.poll_interval = poll_interval
+        self.profile = profile
+        self.fetch_version = fetch_version
+        self.download = download
+        self.connect = connect
+
+        self._models: dict[tuple[str, ModelType], LoadedModel] = {}
+        self._reload_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def get(self, model_name: str, model_type: ModelType = ModelType.PRODUCTION) -> LoadedModel:
+        model = self._models.get((model_name, model_type))
+        if model is None:
+            # Not preloaded (e.g. app used without lifespan) - fall back to the local artifact
+            model = self._load(model_name, model_type, None)
+        return model
+
+    def versions(self) -> dict[str, str | None]:
+        return {f"{name}:{model_type.name.lower()}": model.version for (name, model_type), model in self._models.items()}
+
+    def refresh(self) -> None:
+        try:
+            if self.connect is not None:
+                self.connect()
+        except Exception as e:
+            print(f"[Model sessions] - Registry unavailable: {e}")
+
+        for model_name in self.model_names:
+            for model_type in self.model_types:
+                try:
+                    self._refresh_one(model_name, model_type)
+                except Exception as e:
+                    print(f"[Model sessions] - Could not refresh {model_name} ({model_type.name.lower()}): {e}")
+
+    def start(self) -> None:
+        self.refresh()
+
+        if self.poll_interval > 0 and self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._poll, name="model-sessions-poll", daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def _poll(self) -> None:
+        while not self._stop.wait(self.poll_interval):
+            self.refresh()
+
+    def _refresh_one(self, model_name: str, model_type: ModelType) -> None:
+        try:
+            version = self.fetch_version(model_name, model_type)
+        except Exception as e:
+            print(f"[Model sessions] - Version lookup failed for {model_name}: {e}")
+            version = None
+
+        current = self._models.get((model_name, model_type))
+
+        if version is None:
+            # Registry unreachable or empty - keep what we have, or load the local artifact once
+            if current is None:
+                self._load(model_name, model_type, None)
+            return
+
+        if current is not None and current.version == version:
+            return
+
+        with stage("model_download"):
+            downloaded = self.download(model_name, model_type)
+        if downloaded is None:
+            return
+
+        self._load(model_name, model_type, version, downloaded)
+        print(f"[Model sessions] - {model_name} ({model_type.name.lower()}) now serving version {version}")
+
+    def _load(self, model_name: str, model_type: ModelType, version: str | None, path: str | None = None) -> LoadedModel:
+        path = path or model_path(self.folder, model_name, model_type)
+
+        with stage("model_load"):
+            session = create_session(path, self.profile)
+
+        model = LoadedModel(
+            name=model_name,
+            model_type=model_type,
+            version=version,
+            session=session,
+            input_name=session.get_inputs()[0].name,
+            output_names=[output.name for output in session.get_outputs()],
+        )
+
+        with self._reload_lock:
+            # Single dict assignment - readers see either the old or the new session, never a mix
+            self._models[(model_name, model_type)] = model
+
+        return model
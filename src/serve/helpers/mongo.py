@@ -0,0 +1,36 @@
+import os
+import threading
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client():
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                from pymongo import MongoClient
+
+                _client = MongoClient(os.getenv("MONGO_URI", "mongodb://localhost:27017"))
+    return _client
+
+
+def close_client() -> None:
+    global _client
+    with _client_lock:
+        if _client is not None:
+            _client.close()
+            _client = None
+
+
+class LazyCollection:
+    """Stands in for a pymongo collection; the client is only created on first use."""
+
+    def __init__(self, name: str, database: str = "db"):
+        self.name = name
+        self.database = database
+
+    def __getattr__(self, attribute):
+        collection = get_client().get_database(self.database).get_collection(self.name)
+        return getattr(collection, attribute)
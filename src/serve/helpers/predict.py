@@ -0,0 +1,71 @@
+import os
+from datetime import date
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+from src.serve.helpers.model_sessions import LoadedModel
+
+PREDICTORS = ["Close", "Volume", "Open", "High", "Low", "Open_Nasdaq"]
+CLASSIFICATION_THRESHOLD = 0.6
+HISTORY_FILE = os.getenv("HISTORY_FILE", "data/processed/stock/sp500.csv")
+
+
+def to_feature_matrix(df: pd.DataFrame) -> np.ndarray:
+    # One contiguous float32 block, which is what onnxruntime wants as input
+    return np.ascontiguousarray(df[PREDICTORS].to_numpy(dtype=np.float32))
+
+
+def latest_feature_rows(rows: list[dict], nasdaq_open: float) -> np.ndarray:
+    # Last bar of every ticker (see MarketDataCache.get_many(latest=True)) plus the shared Nasdaq open,
+    # stacked into one (tickers x features) block straight from the values, no pandas per ticker
+    X = np.empty((len(rows), len(PREDICTORS)), dtype=np.float32)
+    X[:, :-1] = [[row[column] for column in PREDICTORS[:-1]] for row in rows]
+    X[:, -1] = nasdaq_open
+    return X
+
+
+def latest_trading_dates(rows: list[dict]) -> list[str]:
+    # Naive and tz-aware Timestamps both print the exchange-local date first
+    return [str(row["Date"])[:10] for row in rows]
+
+
+def predict_probabilities(model: LoadedModel, X: np.ndarray) -> np.ndarray:
+    return model.session.run([model.output_names[1]], {model.input_name: X})[0]
+
+
+def threshold(probabilities: np.ndarray, limit: float = CLASSIFICATION_THRESHOLD) -> np.ndarray:
+    return (probabilities[:, 1] > limit).astype(np.int64)
+
+
+def regress(model: LoadedModel, X: np.ndarray) -> np.ndarray:
+    return model.session.run([model.output_names[0]], {model.input_name: X})[0].reshape(-1)
+
+
+def predict_both(classifier: LoadedModel, regressor: LoadedModel, X: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    # Both sessions read the same float32 buffer, in one trip to the thread pool
+    return predict_probabilities(classifier, X), regress(regressor, X)
+
+
+def load_feature_history(file: str = HISTORY_FILE) -> pd.DataFrame:
+    # Keyed on the file's size and mtime, so the daily process_data append is picked up without a restart
+    stat = os.stat(file)
+    return read_feature_history(file, stat.st_mtime_ns, stat.st_size)
+
+
+@lru_cache(maxsize=1)
+def read_feature_history(file: str, mtime_ns: int, size: int) -> pd.DataFrame:
+    history = pd.read_csv(file, usecols=["Date", *PREDICTORS])
+    history["Date"] = pd.to_datetime(history["Date"].str[:10], format='%Y-%m-%d')
+    return history.dropna().sort_values("Date").reset_index(drop=True)
+
+
+def history_range(start: date | None, end: date | None, file: str = HISTORY_FILE) -> pd.DataFrame:
+    history = load_feature_history(file)
+    mask = np.ones(len(history), dtype=bool)
+    if start is not None:
+        mask &= (history["Date"] >= pd.Timestamp(start)).to_numpy()
+    if end is not None:
+        mask &= (history["Date"] <= pd.Timestamp(end)).to_numpy()
+    return history[mask]
@@ -0,0 +1,61 @@
+import hashlib
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from src.serve.helpers.model_sessions import LoadedModel
+
+
+def feature_hash(X: np.ndarray) -> str:
+    return hashlib.sha1(np.ascontiguousarray(X).tobytes()).hexdigest()
+
+
+def prediction_key(trading_date: str, models: list[LoadedModel], X: np.ndarray) -> tuple[str, str, str, str]:
+    # A new bar changes the date/features, promoting any of the models changes the version - either way a new key
+    names = "+".join(model.name for model in models)
+    versions = "+".join(model.version or "local" for model in models)
+    return trading_date, names, versions, feature_hash(X)
+
+
+class PredictionCache:
+    """Small LRU of computed predictions keyed by (trading date, model, version, feature hash)."""
+
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+
+        self._entries: OrderedDict[tuple, dict] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: tuple) -> dict | None:
+        with self._lock:
+            result = self._entries.get(key)
+            if result is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return result
+
+    def put(self, key: tuple, result: dict) -> None:
+        with self._lock:
+            self._entries[key] = result
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "entries": len(self._entries),
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+            }
@@ -0,0 +1,132 @@
+import queue
+import threading
+import time
+
+
+class PredictionLogWriter:
+    """Buffers prediction documents in memory and writes them to Mongo in batches from a background thread."""
+
+    def __init__(
+        self,
+        collection,
+        batch_size: int = 100,
+        flush_interval: float = 1.0,
+        max_queue: int = 10_000,
+        key_fields: list[str] | None = None,
+    ):
+        self.collection = collection
+        self.key_fields = key_fields
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+
+        self._queue: queue.Queue = queue.Queue(maxsize=max_queue)
+        self._stop = threading.Event()
+        self._start_lock = threading.Lock()
+        self._thread: threading.Thread | None = None
+
+        self.written = 0
+        self.dropped = 0
+        self.failed = 0
+        self.flushes = 0
+        self.last_flush_latency = 0.0
+        self.total_flush_latency = 0.0
+
+    def try_submit(self, document: dict) -> bool:
+        self._ensure_started()
+        try:
+            self._queue.put_nowait(document)
+            return True
+        except queue.Full:
+            return False
+
+    def submit(self, document: dict, wait: float | None = None) -> bool:
+        # Blocking variant - callers wait here while the queue is full (backpressure)
+        self._ensure_started()
+        try:
+            self._queue.put(document, timeout=wait)
+            return True
+        except queue.Full:
+            self.dropped += 1
+            print("[Prediction log] - Queue full, prediction document dropped")
+            return False
+
+    def start(self) -> None:
+        with self._start_lock:
+            if self._thread is None:
+                self._stop.clear()
+                self._thread = threading.Thread(target=self._run, name="prediction-log-writer", daemon=True)
+                self._thread.start()
+
+    def close(self, timeout: float = 10) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=timeout)
+            self._thread = None
+
+    def stats(self) -> dict:
+        return {
+            "queue_depth": self._queue.qsize(),
+            "written": self.written,
+            "dropped": self.dropped,
+            "failed": self.failed,
+            "flushes": self.flushes,
+            "last_flush_latency": self.last_flush_latency,
+            "avg_flush_latency": self.total_flush_latency / self.flushes if self.flushes else 0.0,
+        }
+
+    def _ensure_started(self) -> None:
+        if self._thread is None:
+            self.start()
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            batch = self._collect()
+            if batch:
+                self._flush(batch)
+
+        # Drain whatever is left on shutdown
+        batch = []
+        while True:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+            if len(batch) >= self.batch_size:
+                self._flush(batch)
+                batch = []
+        if batch:
+            self._flush(batch)
+
+    def _collect(self) -> list[dict]:
+        batch = []
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size and not self._stop.is_set():
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=min(remaining, 0.1)))
+            except queue.Empty:
+                continue
+        return batch
+
+    def _flush(self, batch: list[dict]) -> None:
+        start = time.perf_counter()
+        try:
+            if self.key_fields:
+                from pymongo import ReplaceOne
+
+                # Upsert on the key so reruns replace the document instead of adding another one
+                self.collection.bulk_write([
+                    ReplaceOne({field: document.get(field) for field in self.key_fields}, document, upsert=True)
+                    for document in batch
+                ], ordered=True)
+            else:
+                self.collection.insert_many(batch, ordered=False)
+            self.written += len(batch)
+        except Exception as e:
+            self.failed += len(batch)
+            print(f"[Prediction log] - Could not write {len(batch)} documents: {e}")
+        self.last_flush_latency = time.perf_counter() - start
+        self.total_flush_latency += self.last_flush_latency
+        self.flushes += 1
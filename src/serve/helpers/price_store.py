@@ -0,0 +1,130 @@
+import hashlib
+import io
+import json
+import os
+import threading
+from datetime import date, timedelta
+
+import pandas as pd
+
+PRICE_FILE = os.getenv("PRICE_FILE", "data/raw/stock/sp500.csv")
+MAX_CACHED_RESPONSES = 64
+TAIL_BYTES = 256
+
+
+class PriceStore:
+    """Daily closes read from the CSV that fetch_data appends to, with pre-serialized responses."""
+
+    def __init__(self, file: str = PRICE_FILE):
+        self.file = file
+        self.prices = pd.DataFrame({"Date": pd.Series(dtype="datetime64[ns]"), "Close": pd.Series(dtype="float64")})
+
+        self._columns: list[str] | None = None
+        self._offset = 0
+        self._tail = b""
+        self._mtime = 0.0
+        self._lock = threading.Lock()
+        self._responses: dict[tuple, tuple[bytes, str]] = {}
+
+    def available(self) -> bool:
+        return os.path.isfile(self.file)
+
+    def sync(self) -> None:
+        stat = os.stat(self.file)
+        if stat.st_mtime == self._mtime and stat.st_size == self._offset:
+            return
+
+        with self._lock:
+            offset = self._offset
+            if stat.st_size < self._offset or self._columns is None or not self._prefix_unchanged():
+                self._load_all()
+                offset = None
+            elif stat.st_size > self._offset:
+                self._load_appended()
+            self._mtime = stat.st_mtime
+            # A half-written line is not consumed, the cached responses are still current then
+            if self._offset != offset:
+                self._responses.clear()
+
+    def response(self, start: date | None, end: date | None, step: int, columnar: bool) -> tuple[bytes, str]:
+        self.sync()
+
+        key = (start, end, step, columnar)
+        cached = self._responses.get(key)
+        if cached is not None:
+            return cached
+
+        response = build_response(self.prices, start, end, step, columnar)
+
+        with self._lock:
+            if len(self._responses) >= MAX_CACHED_RESPONSES:
+                self._responses.pop(next(iter(self._responses)))
+            self._responses[key] = response
+
+        return response
+
+    def _load_all(self) -> None:
+        with open(self.file, "rb") as f:
+            content = complete_lines(f.read())
+        header = content.split(b"\n", 1)[0].decode().strip()
+        self._columns = header.split(",")
+        self.prices = to_prices(pd.read_csv(io.BytesIO(content)))
+        self._offset = len(content)
+        self._tail = content[-TAIL_BYTES:]
+
+    def _prefix_unchanged(self) -> bool:
+        # fetch_data appends daily, but a repair/rebuild rewrites the file - then the bytes before the offset differ
+        with open(self.file, "rb") as f:
+            f.seek(self._offset - len(self._tail))
+            return f.read(len(self._tail)) == self._tail
+
+    def _load_appended(self) -> None:
+        # Daily fetches only append rows, so only the new tail has to be parsed
+        with open(self.file, "rb") as f:
+            f.seek(self._offset)
+            content = complete_lines(f.read())
+        if not content:
+            return
+        self._offset += len(content)
+        self._tail = (self._tail + content)[-TAIL_BYTES:]
+
+        appended = to_prices(pd.read_csv(io.BytesIO(content), header=None, names=self._columns))
+        prices = pd.concat([self.prices, appended], ignore_index=True)
+        self.prices = prices.drop_duplicates(subset="Date", keep="last").sort_values("Date").reset_index(drop=True)
+
+
+def complete_lines(content: bytes) -> bytes:
+    # A row fetch_data is still appending stays in the file for the next read
+    return content[:content.rfind(b"\n") + 1]
+
+
+def to_prices(data: pd.DataFrame) -> pd.DataFrame:
+    prices = data[["Date", "Close"]].dropna()
+    dates = pd.to_datetime(prices["Date"].astype(str).str[:10], format='%Y-%m-%d')
+    prices = pd.DataFrame({"Date": dates.to_numpy(), "Close": prices["Close"].to_numpy(dtype="float64")})
+    return prices.drop_duplicates(subset="Date", keep="last").sort_values("Date").reset_index(drop=True)
+
+
+def build_response(prices: pd.DataFrame, start: date | None, end: date | None, step: int, columnar: bool) -> tuple[bytes, str]:
+    # Default window is the last year of stored data
+    last = prices["Date"].iloc[-1].date() if len(prices) else date.today()
+    end = end or last
+    start = start or end - timedelta(days=365)
+
+    body = serialize_prices(prices, start, end, step, columnar)
+    return body, f'"{hashlib.sha1(body).hexdigest()}"'
+
+
+def serialize_prices(prices: pd.DataFrame, start: date, end: date, step: int, columnar: bool) -> bytes:
+    dates = prices["Date"]
+    selected = prices[(dates >= pd.Timestamp(start)) & (dates <= pd.Timestamp(end))].iloc[::step]
+
+    date_strings = selected["Date"].dt.strftime('%Y-%m-%d').tolist()
+    closes = selected["Close"].tolist()
+
+    if columnar:
+        payload = {"prices": {"Date": date_strings, "Close": closes}}
+    else:
+        payload = {"prices": [{"Date": d, "Close": c} for d, c in zip(date_strings, closes)]}
+
+    return json.dumps(payload, separators=(",", ":")).encode()
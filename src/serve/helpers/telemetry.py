@@ -0,0 +1,123 @@
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable
+
+from prometheus_client import CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Gauge, Histogram, generate_latest
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+# Cumulative fields in the helpers' stats() dicts - everything else is exported as a gauge
+COUNTER_FIELDS = {"hits", "misses", "stale", "errors", "written", "dropped", "failed", "flushes", "broadcasts", "downloads"}
+
+registry = CollectorRegistry()
+
+request_latency = Histogram(
+    "serve_request_duration_seconds", "End to end request latency", ["endpoint", "method"],
+    buckets=LATENCY_BUCKETS, registry=registry,
+)
+requests_total = Counter(
+    "serve_requests", "Handled requests", ["endpoint", "method", "status"], registry=registry,
+)
+requests_in_flight = Gauge(
+    "serve_requests_in_flight", "Requests currently being handled", registry=registry,
+)
+stage_latency = Histogram(
+    "serve_stage_duration_seconds", "Time spent per stage of the serving path", ["endpoint", "stage"],
+    buckets=LATENCY_BUCKETS, registry=registry,
+)
+
+# Stage durations of the request being handled; None outside of a request (e.g. background threads)
+_request_stages: ContextVar[dict[str, float] | None] = ContextVar("request_stages", default=None)
+
+
+def observe_stage(name: str, seconds: float) -> None:
+    stages = _request_stages.get()
+    if stages is None:
+        stage_latency.labels("background", name).observe(seconds)
+    else:
+        stages[name] = stages.get(name, 0.0) + seconds
+
+
+@contextmanager
+def stage(name: str):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe_stage(name, time.perf_counter() - start)
+
+
+def server_timing(stages: dict[str, float], total: float) -> str:
+    entries = [f"{name};dur={seconds * 1000:.2f}" for name, seconds in stages.items()]
+    entries.append(f"total;dur={total * 1000:.2f}")
+    return ", ".join(entries)
+
+
+class StatsCollector:
+    """Exports a helper's stats() dict at scrape time, e.g. serve_market_data_hits_total."""
+
+    def __init__(self, prefix: str, stats: Callable[[], dict]):
+        self.prefix = prefix
+        self.stats = stats
+
+    def collect(self):
+        for field, value in self.stats().items():
+            if not isinstance(value, (int, float)):
+                continue
+            name = f"serve_{self.prefix}_{field}"
+            if field in COUNTER_FIELDS:
+                yield CounterMetricFamily(name, f"{self.prefix} {field}", value=value)
+            else:
+                yield GaugeMetricFamily(name, f"{self.prefix} {field}", value=value)
+
+
+def register_stats(prefix: str, stats: Callable[[], dict]) -> None:
+    registry.register(StatsCollector(prefix, stats))
+
+
+def render_metrics() -> tuple[bytes, str]:
+    return generate_latest(registry), CONTENT_TYPE_LATEST
+
+
+class TelemetryMiddleware:
+    """Plain ASGI middleware: request counters and latency, plus a Server-Timing header with the stage breakdown."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stages: dict[str, float] = {}
+        token = _request_stages.set(stages)
+        start = time.perf_counter()
+        status = 500
+
+        async def send_with_timing(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", server_timing(stages, time.perf_counter() - start).encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        requests_in_flight.inc()
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            requests_in_flight.dec()
+            _request_stages.reset(token)
+
+            # Route template rather than the raw path, so static files do not blow up the label set
+            route = scope.get("route")
+            endpoint = getattr(route, "path", "unmatched")
+            method = scope["method"]
+            request_latency.labels(endpoint, method).observe(time.perf_counter() - start)
+            requests_total.labels(endpoint, method, str(status)).inc()
+            for name, seconds in stages.items():
+                stage_latency.labels(endpoint, name).observe(seconds)
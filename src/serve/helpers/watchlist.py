@@ -0,0 +1,13 @@
+import os
+
+DEFAULT_WATCHLIST = "^GSPC,^NDX,^DJI,^RUT,SPY,QQQ,DIA,IWM"
+MAX_TICKERS = int(os.getenv("MAX_TICKERS", "100"))
+
+
+def parse_tickers(tickers: str) -> list[str]:
+    # "spy, QQQ,,spy" -> ["SPY", "QQQ"], order kept for the response
+    symbols = [ticker.strip().upper() for ticker in tickers.split(",")]
+    return list(dict.fromkeys(symbol for symbol in symbols if symbol))
+
+
+WATCHLIST = parse_tickers(os.getenv("WATCHLIST", DEFAULT_WATCHLIST))
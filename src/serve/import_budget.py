@@ -0,0 +1,53 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+# These are only needed once the service talks to the registry, Yahoo or Mongo
+DEFERRED_MODULES = ["mlflow", "dagshub", "sklearn", "onnx", "yfinance", "pymongo"]
+
+
+def measure_imports(module: str = "src.serve.main") -> dict[str, int]:
+    env = dict(os.environ, MLFLOW_DISABLE_AGENT_HINT="1")
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True, env=env, check=True,
+    )
+
+    # Lines look like "import time:   self [us] | cumulative | imported package"
+    cumulative = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative_us, name = line[len("import time:"):].split("|")
+        cumulative[name.strip()] = int(cumulative_us)
+    return cumulative
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check the import time of the serving app with python -X importtime")
+    parser.add_argument("--module", default="src.serve.main")
+    parser.add_argument("--budget-ms", type=float, default=float(os.getenv("IMPORT_BUDGET_MS", "1500")))
+    parser.add_argument("--top", type=int, default=15)
+    args = parser.parse_args()
+
+    cumulative = measure_imports(args.module)
+    total_ms = cumulative[args.module] / 1000
+    deferred = [name for name in DEFERRED_MODULES if name in cumulative]
+    top = sorted(((name, us / 1000) for name, us in cumulative.items() if "." not in name), key=lambda item: -item[1])
+
+    print(json.dumps({
+        "module": args.module,
+        "total_ms": total_ms,
+        "budget_ms": args.budget_ms,
+        "eagerly_imported_deferred_modules": deferred,
+        "top_level_packages_ms": dict(top[:args.top]),
+    }, indent=2))
+
+    if total_ms > args.budget_ms or deferred:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
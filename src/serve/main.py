@@ -1,22 +1,89 @@
+import asyncio
 import os
 import numpy as np
 import pandas as pd
-from fastapi import FastAPI
+from fastapi import FastAPI, Query, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
-import onnxruntime as ort
-import yfinance as yf
 from pydantic import BaseModel
 
-from src.models.helpers.model_registry import download_model, ModelType
-from pymongo import MongoClient
+from fastapi.responses import JSONResponse, StreamingResponse
+from src.models.helpers.model_cache import model_cache
+from src.models.helpers.model_registry import ModelType
 from dotenv import load_dotenv
-from datetime import datetime
+from datetime import date, datetime
+from typing import Literal
+from contextlib import asynccontextmanager
 from fastapi.staticfiles import StaticFiles
 
-from src.serve.experiments import get_metrics_history, get_production_metrics_history
+from src.serve.helpers.broadcast import PredictionBroadcaster
+from src.serve.experiments import get_metrics_history, get_production_metrics_history, metrics_snapshot
+from src.serve.helpers.executor import run_blocking, UPSTREAM_TIMEOUT, INFERENCE_TIMEOUT, BATCH_INFERENCE_TIMEOUT, DB_TIMEOUT
+from src.serve.helpers.market_data import MarketDataCache, fetch_many_from_yahoo
+from src.serve.helpers.model_sessions import ModelSessions
+from src.serve.helpers.mongo import LazyCollection, close_client
+from src.serve.helpers.prediction_cache import PredictionCache, prediction_key
+from src.serve.helpers.prediction_log import PredictionLogWriter
+from src.serve.helpers.price_store import PriceStore, build_response, to_prices
+from src.serve.helpers.predict import PREDICTORS, to_feature_matrix, latest_feature_rows, latest_trading_dates, predict_probabilities, predict_both, threshold, regress, history_range
+from src.serve.helpers.watchlist import MAX_TICKERS, WATCHLIST, parse_tickers
+from src.serve.helpers.telemetry import TelemetryMiddleware, register_stats, render_metrics, stage
 
 load_dotenv()
-app = FastAPI()
+
+# Production sessions are always served, latest (staging) ones only when enabled
+serve_latest = os.getenv("SERVE_LATEST_MODELS", "false").lower() == "true"
+model_sessions = ModelSessions(
+    model_names=["sp500_model", "sp500_model_regression"],
+    model_types=[ModelType.PRODUCTION, ModelType.LATEST] if serve_latest else [ModelType.PRODUCTION],
+    poll_interval=float(os.getenv("MODEL_POLL_INTERVAL", "300")),
+    profile=os.getenv("ONNX_PROFILE", "low_latency"),
+)
+
+# Flipped by warm_up(), reported on /ready
+readiness = {"models": False, "market_data": False}
+
+async def warm_up():
+    # Runs after the server already accepts connections, so cold start is not blocked on the registry
+    await run_blocking(model_sessions.start)
+    readiness["models"] = True
+
+    try:
+        await fetch_index_data()
+        readiness["market_data"] = True
+    except Exception as e:
+        print(f"[Warm up] - Could not prefetch market data: {e}")
+
+async def refresh_prediction_stream(warm_up_task: asyncio.Task):
+    # The first publish waits for warm-up: before it, the sessions would be loaded synchronously
+    # on the event loop and the index bars warm-up is prefetching would be fetched a second time
+    try:
+        await warm_up_task
+    except Exception as e:
+        print(f"[Prediction stream] - Warm up failed: {e}")
+
+    # One computation per interval regardless of how many clients are subscribed
+    while True:
+        try:
+            prediction_stream.publish(await combined_prediction())
+        except Exception as e:
+            print(f"[Prediction stream] - Refresh failed: {e}")
+        await asyncio.sleep(PREDICTION_STREAM_INTERVAL)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    warm_up_task = asyncio.create_task(warm_up())
+    stream_task = asyncio.create_task(refresh_prediction_stream(warm_up_task))
+    prediction_log.start()
+    metrics_snapshot.start()
+    yield
+    warm_up_task.cancel()
+    stream_task.cancel()
+    model_sessions.stop()
+    prediction_log.close()
+    metrics_snapshot.stop()
+    close_client()
+
+app = FastAPI(lifespan=lifespan)
 
 origins = ["*"]
 
@@ -26,22 +93,54 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Server-Timing"],
 )
+app.add_middleware(TelemetryMiddleware)
+
+# MongoDB connection setup - the client is created on first use
+collection = LazyCollection("predictions")
+validation_results_collection = LazyCollection("validation-results")
+metric_limit_collection = LazyCollection("metric-limit")
+
+prediction_cache = PredictionCache()
+prediction_log = PredictionLogWriter(
+    collection,
+    key_fields=["trading_date", "model", "model_version"],
+    batch_size=int(os.getenv("PREDICTION_LOG_BATCH_SIZE", "100")),
+    flush_interval=float(os.getenv("PREDICTION_LOG_FLUSH_INTERVAL", "1")),
+    max_queue=int(os.getenv("PREDICTION_LOG_MAX_QUEUE", "10000")),
+)
+
+market_data = MarketDataCache(fetch_many=fetch_many_from_yahoo)
+price_store = PriceStore()
+
+PREDICTION_STREAM_INTERVAL = float(os.getenv("PREDICTION_STREAM_INTERVAL", "60"))
+prediction_stream = PredictionBroadcaster()
 
-# MongoDB connection setup
-MONGO_URI = os.getenv("MONGO_URI", "mongodb://localhost:27017")
-client = MongoClient(MONGO_URI)
-db = client.get_database("db")
-collection = db.get_collection("predictions")
-validation_results_collection = db.get_collection("validation-results")
-metric_limit_collection = db.get_collection("metric-limit")
+# Cache and writer counters are read at scrape time
+register_stats("market_data", lambda: market_data.stats())
+register_stats("prediction_cache", lambda: prediction_cache.stats())
+register_stats("prediction_log", lambda: prediction_log.stats())
+register_stats("prediction_stream", lambda: prediction_stream.stats())
+register_stats("model_cache", lambda: model_cache.stats())
 
 def fetch_stock_data(ticker: str, period: str, interval: str) -> pd.DataFrame:
-    data = yf.Ticker(ticker)
-    data = data.history(period=period, interval=interval)
-    data.reset_index(inplace=True)  # Resetiranje indeksa
+    return market_data.get(ticker, period, interval)
 
-    return data
+async def fetch_latest_bars(tickers: list[str]) -> list[dict | Exception]:
+    # Cache misses of the whole watchlist go upstream as one download, on one blocking-pool thread;
+    # only the last bar of every ticker comes back
+    try:
+        return await run_blocking(market_data.get_many, tickers, "1d", "1d", latest=True, timeout=UPSTREAM_TIMEOUT)
+    except asyncio.TimeoutError as e:
+        return [e] * len(tickers)
+
+async def fetch_index_data() -> tuple[pd.DataFrame, pd.DataFrame]:
+    # S&P 500 in Nasdaq 100 pridobimo socasno
+    return await asyncio.gather(
+        run_blocking(fetch_stock_data, "^GSPC", "1d", "1d", timeout=UPSTREAM_TIMEOUT),
+        run_blocking(fetch_stock_data, "^NDX", "1d", "1d", timeout=UPSTREAM_TIMEOUT),
+    )
 
 # Mount the /img directory to serve static files
 # TODO fix url for production
@@ -50,10 +149,24 @@ app.mount("/img", StaticFiles(directory="src/serve/img"), name="img")
 class MetricLimit(BaseModel):
     value: float
 
+class FeatureRow(BaseModel):
+    Close: float
+    Volume: float
+    Open: float
+    High: float
+    Low: float
+    Open_Nasdaq: float
+
+class BatchPredictRequest(BaseModel):
+    rows: list[FeatureRow] | None = None
+    start: date | None = None
+    end: date | None = None
+    models: list[Literal["classification", "regression"]] = ["classification", "regression"]
+
 @app.post("/metric-limit")
 async def create_metric_limit(metric_limit: MetricLimit):
     try:
-        metric_limit_collection.insert_one(metric_limit.dict())
+        await run_blocking(metric_limit_collection.insert_one, metric_limit.dict(), timeout=DB_TIMEOUT)
         return {"message": "Metric limit added successfully"}
     except Exception as e:
         return {"error": str(e)}
@@ -61,8 +174,9 @@ async def create_metric_limit(metric_limit: MetricLimit):
 @app.get("/metric-limit/latest")
 async def get_latest_metric_limit():
     try:
-        latest_metric_limit = metric_limit_collection.find().sort("_id", -1).limit(1)
-        latest_metric_limit = list(latest_metric_limit)
+        latest_metric_limit = await run_blocking(
+            lambda: list(metric_limit_collection.find().sort("_id", -1).limit(1)), timeout=DB_TIMEOUT
+        )
         if latest_metric_limit:
             latest_metric_limit[0]["_id"] = str(latest_metric_limit[0]["_id"])
             return {"latest_metric_limit": latest_metric_limit[0]}
@@ -71,128 +185,268 @@ async def get_latest_metric_limit():
     except Exception as e:
         return {"error": str(e)}
 
-@app.get("/predict")
-async def predict():
-    df = fetch_stock_data("^GSPC", "1d", "1d")
+async def combined_prediction() -> dict:
+    # One fetch, one feature matrix and one inference call for both models
+    try:
+        with stage("fetch"):
+            df, nasdaq_data = await fetch_index_data()
+    except asyncio.TimeoutError:
+        return {"error": "Timed out fetching data from Yahoo Finance"}
+
     if df.empty:
         return {"error": "No data fetched from Yahoo Finance"}
 
-    # Pridobitev podatkov Nasdaq 100
-    nasdaq_data = fetch_stock_data("^NDX", "1d", "1d")
+    with stage("features"):
+        df["Open_Nasdaq"] = nasdaq_data["Open"]
 
-    df["Open_Nasdaq"] = nasdaq_data["Open"]
+        if not all(col in df.columns for col in PREDICTORS):
+            return {"error": "Fetched data does not contain the required columns"}
 
-    predictors = ["Close", "Volume", "Open", "High", "Low", "Open_Nasdaq"]
+        # Pripravi podatke za napovedovanje
+        X_test = to_feature_matrix(df)
 
-    if not all(col in df.columns for col in predictors):
-        return {"error": "Fetched data does not contain the required columns"}
+    classifier = model_sessions.get("sp500_model", ModelType.PRODUCTION)
+    regressor = model_sessions.get("sp500_model_regression", ModelType.PRODUCTION)
 
-    df = df.assign(Target=0)
+    trading_date = df["Date"].iloc[-1].strftime('%Y-%m-%d')
+    with stage("cache"):
+        key = prediction_key(trading_date, [classifier, regressor], X_test)
+        cached = prediction_cache.get(key)
+    if cached is not None:
+        return cached
 
     print(df.head())
 
-    X_test = df[predictors]
-    X_test.columns = [f'f{i}' for i in range(X_test.shape[1])]
-
-
-    production_model_path = download_model("sp500_model", ModelType.PRODUCTION)
-    model = ort.InferenceSession("models/sp500/sp500_model_production.onnx")
-
-    input_name = model.get_inputs()[0].name
-    output_name = model.get_outputs()[1].name
-
     try:
-        predictions = model.run([output_name], {input_name: X_test.values.astype(np.float32)})[0]
-        predicted_classes = [1 if prediction[1] > 0.6 else 0 for prediction in predictions]
+        with stage("inference"):
+            probabilities, regression = await run_blocking(
+                predict_both, classifier, regressor, X_test, timeout=INFERENCE_TIMEOUT
+            )
     except Exception as e:
         return {"error": str(e)}
 
-    prediction_result = predicted_classes
+    with stage("threshold"):
+        prediction_result = threshold(probabilities).tolist()
+    result = {
+        "trading_date": trading_date,
+        "prediction": prediction_result,
+        "probability": probabilities[:, 1].tolist(),
+        "regression": regression.tolist(),
+    }
+    prediction_cache.put(key, result)
+    prediction_stream.publish(result)
 
-    # Save to MongoDB
+    # Save to MongoDB - one canonical document per trading day and model version
     document = {
         "timestamp": datetime.now().isoformat(),
-        "input_data": df[predictors].to_dict(orient="records"),
-        "predictions": prediction_result
+        "trading_date": trading_date,
+        "model": classifier.name,
+        "model_version": classifier.version or "local",
+        "regression_model_version": regressor.version or "local",
+        "feature_hash": key[3],
+        "input_data": {"columns": PREDICTORS, "values": X_test.tolist()},
+        "predictions": prediction_result,
+        "probability": result["probability"],
+        "regression": result["regression"],
     }
-    collection.insert_one(document)
+    with stage("persist"):
+        if not prediction_log.try_submit(document):
+            # Queue is full - wait for the writer off the event loop instead of growing without bound
+            await run_blocking(prediction_log.submit, document, wait=DB_TIMEOUT)
 
-    return {"prediction": prediction_result}
-
-@app.get("/predict/regression")
-async def predict_regression():
-    df = fetch_stock_data("^GSPC", "1d", "1d")
-    if df.empty:
-        return {"error": "No data fetched from Yahoo Finance"}
-
-    # Pridobitev podatkov Nasdaq 100
-    nasdaq_data = fetch_stock_data("^NDX", "1d", "1d")
-
-    df["Open_Nasdaq"] = nasdaq_data["Open"]
-
-    predictors = ["Close", "Volume", "Open", "High", "Low", "Open_Nasdaq"]
-
-    if not all(col in df.columns for col in predictors):
-        return {"error": "Fetched data does not contain the required columns"}
-
-    # Dodaj stolpec za ciljni atribut in nastavi vrednosti na 0
-    df = df.assign(Tomorrow=0)
+    return result
 
-    print(df.head())
+@app.get("/predict/combined")
+async def predict_combined():
+    return await combined_prediction()
 
-    # Pripravi podatke za napovedovanje
-    X_test = df[predictors]
-    X_test.columns = [f'f{i}' for i in range(X_test.shape[1])]
+@app.get("/predict/stream")
+async def predict_stream():
+    # Server-Sent Events: snapshot on connect, then one event per new bar or model version
+    return StreamingResponse(
+        prediction_stream.events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
-    X_test = df[predictors].values.astype(np.float32)
+@app.get("/predict")
+async def predict():
+    result = await combined_prediction()
+    if "error" in result:
+        return result
+    return {"prediction": result["prediction"]}
 
-    production_model_path = download_model("sp500_model_regression", ModelType.PRODUCTION)
+@app.get("/predict/regression")
+async def predict_regression():
+    result = await combined_prediction()
+    if "error" in result:
+        return result
+    # Same [[value]] shape the regression model outputs
+    return {"prediction": [[value] for value in result["regression"]]}
+
+@app.get("/predict/tickers")
+async def predict_tickers(tickers: str | None = None):
+    symbols = parse_tickers(tickers) if tickers else WATCHLIST
+    if not symbols:
+        return {"error": "No tickers given"}
+    if len(symbols) > MAX_TICKERS:
+        return {"error": f"At most {MAX_TICKERS} tickers per request"}
+
+    # Nasdaq open is the shared market feature, fetched once next to all the tickers
+    with stage("fetch"):
+        nasdaq_data, *bars = await fetch_latest_bars(["^NDX", *symbols])
+    if isinstance(nasdaq_data, Exception) or not nasdaq_data:
+        return {"error": "No Nasdaq data fetched from Yahoo Finance"}
+
+    errors = {}
+    scored = []
+    with stage("features"):
+        for ticker, row in zip(symbols, bars):
+            if isinstance(row, asyncio.TimeoutError):
+                errors[ticker] = "Timed out fetching data from Yahoo Finance"
+            elif isinstance(row, Exception):
+                errors[ticker] = str(row)
+            elif not row:
+                errors[ticker] = "No data fetched from Yahoo Finance"
+            elif not all(col in row for col in PREDICTORS[:-1]):
+                errors[ticker] = "Fetched data does not contain the required columns"
+            else:
+                scored.append((ticker, row))
+
+        rows = [row for _, row in scored]
+        X = latest_feature_rows(rows, float(nasdaq_data["Open"]))
+
+    response = {"count": len(scored), "predictions": {}, "errors": errors}
+    if not scored:
+        return response
+
+    classifier = model_sessions.get("sp500_model", ModelType.PRODUCTION)
+    regressor = model_sessions.get("sp500_model_regression", ModelType.PRODUCTION)
 
-    # Load the trained model
-    model = ort.InferenceSession("models/sp500/sp500_model_regression_production.onnx")
+    try:
+        # One run per model for the whole watchlist
+        with stage("inference"):
+            probabilities, regression = await run_blocking(
+                predict_both, classifier, regressor, X, timeout=BATCH_INFERENCE_TIMEOUT
+            )
+    except Exception as e:
+        return {"error": str(e)}
 
-    # Check the model input name
-    input_name = model.get_inputs()[0].name
-    output_name = model.get_outputs()[0].name
+    with stage("threshold"):
+        results = zip(
+            latest_trading_dates(rows), threshold(probabilities).tolist(), probabilities[:, 1].tolist(), regression.tolist()
+        )
+        for (ticker, _), (trading_date, prediction, probability, estimate) in zip(scored, results):
+            response["predictions"][ticker] = {
+                "trading_date": trading_date,
+                "prediction": prediction,
+                "probability": probability,
+                "regression": estimate,
+            }
+
+    return response
+
+@app.post("/predict/batch")
+async def predict_batch(request: BatchPredictRequest):
+    if request.rows:
+        X = np.array([[getattr(row, column) for column in PREDICTORS] for row in request.rows], dtype=np.float32)
+        dates = None
+    elif request.start is not None or request.end is not None:
+        try:
+            with stage("fetch"):
+                history = await run_blocking(history_range, request.start, request.end, timeout=DB_TIMEOUT)
+        except FileNotFoundError:
+            return {"error": "No stored history available"}
+        if history.empty:
+            return {"error": "No stored history in the requested range"}
+        X = to_feature_matrix(history)
+        dates = history["Date"].dt.strftime('%Y-%m-%d').tolist()
+    else:
+        return {"error": "Provide either feature rows or a start/end date range"}
+
+    response = {"count": len(X)}
+    if dates is not None:
+        response["dates"] = dates
 
     try:
-        predictions = model.run([output_name], {input_name: X_test})[0]
+        if "classification" in request.models:
+            model = model_sessions.get("sp500_model", ModelType.PRODUCTION)
+            with stage("inference"):
+                probabilities = await run_blocking(predict_probabilities, model, X, timeout=BATCH_INFERENCE_TIMEOUT)
+            with stage("threshold"):
+                response["probability"] = probabilities[:, 1].tolist()
+                response["prediction"] = threshold(probabilities).tolist()
+
+        if "regression" in request.models:
+            model = model_sessions.get("sp500_model_regression", ModelType.PRODUCTION)
+            with stage("inference"):
+                response["regression"] = (await run_blocking(regress, model, X, timeout=BATCH_INFERENCE_TIMEOUT)).tolist()
     except Exception as e:
         return {"error": str(e)}
 
-    return {"prediction": predictions.tolist()}
+    return response
 
 @app.get("/historical-prices")
-async def historical_prices():
-    df = fetch_stock_data("^GSPC", "1y", "1d")  # Fetch 1 year of daily data
-    if df.empty:
-        return {"error": "No data fetched from Yahoo Finance"}
-
-    # Ensure necessary columns are present
-    if "Close" not in df.columns:
-        return {"error": "Fetched data does not contain the required columns"}
-
-    # Convert the DataFrame to a suitable format for the frontend
-    prices = df.reset_index()[["Date", "Close"]]
-    prices["Date"] = prices["Date"].dt.strftime('%Y-%m-%d')
-    prices_list = prices.to_dict(orient="records")
-
-    return {"prices": prices_list}
+async def historical_prices(
+    request: Request,
+    start: date | None = None,
+    end: date | None = None,
+    step: int = Query(1, ge=1),
+    columnar: bool = False,
+):
+    if price_store.available():
+        with stage("fetch"):
+            body, etag = await run_blocking(price_store.response, start, end, step, columnar, timeout=DB_TIMEOUT)
+    else:
+        # No local store (e.g. fresh container) - fall back to Yahoo Finance
+        try:
+            with stage("fetch"):
+                df = await run_blocking(fetch_stock_data, "^GSPC", "1y", "1d", timeout=UPSTREAM_TIMEOUT)  # Fetch 1 year of daily data
+        except asyncio.TimeoutError:
+            return {"error": "Timed out fetching data from Yahoo Finance"}
+        if df.empty:
+            return {"error": "No data fetched from Yahoo Finance"}
+
+        # Ensure necessary columns are present
+        if "Close" not in df.columns:
+            return {"error": "Fetched data does not contain the required columns"}
+
+        body, etag = build_response(to_prices(df), start, end, step, columnar)
+
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers={"ETag": etag})
+
+    return Response(content=body, media_type="application/json", headers={"ETag": etag, "Cache-Control": "no-cache"})
 
 @app.get("/latest-validation-result")
 async def get_latest_validation_result():
-    result = validation_results_collection.find_one(sort=[("timestamp", -1)])
+    result = await run_blocking(validation_results_collection.find_one, sort=[("timestamp", -1)], timeout=DB_TIMEOUT)
     if result:
         result["_id"] = str(result["_id"])
     return result
 
 @app.get("/metrics-history")
 async def metrics():
-    return get_metrics_history()
+    return await run_blocking(get_metrics_history)
 
 @app.get("/production-metrics-history")
 async def production_metrics():
-    return get_production_metrics_history()
+    return await run_blocking(get_production_metrics_history)
+
+@app.get("/ready")
+async def ready():
+    status = {
+        "ready": readiness["models"],
+        "warm": dict(readiness),
+        "models": model_sessions.versions(),
+        "market_data": market_data.stats(),
+    }
+    return JSONResponse(status, status_code=200 if readiness["models"] else 503)
+
+@app.get("/metrics")
+async def prometheus_metrics():
+    body, content_type = render_metrics()
+    return Response(content=body, media_type=content_type)
 
 @app.get("/")
 def root():
@@ -0,0 +1,89 @@
+import asyncio
+
+import src.serve.main as main
+from src.serve.helpers.broadcast import PredictionBroadcaster
+
+RESULT = {"trading_date": "2024-05-01", "prediction": [1], "probability": [0.7], "regression": [5050.0]}
+NEXT_RESULT = {"trading_date": "2024-05-02", "prediction": [0], "probability": [0.4], "regression": [5010.0]}
+
+
+def test_snapshot_on_connect_and_one_event_per_change():
+    async def scenario():
+        broadcaster = PredictionBroadcaster(heartbeat_interval=0.05)
+        broadcaster.publish(RESULT)
+
+        stream = broadcaster.subscribe()
+        snapshot = await anext(stream)
+
+        # Repeats of the same result are not broadcast
+        assert not broadcaster.publish(dict(RESULT))
+        assert broadcaster.publish(NEXT_RESULT)
+        update = await anext(stream)
+
+        heartbeat = await anext(stream)
+        subscribers = broadcaster.stats()["subscribers"]
+        await stream.aclose()
+        return snapshot, update, heartbeat, subscribers, broadcaster.stats()
+
+    snapshot, update, heartbeat, subscribers, stats = asyncio.run(scenario())
+
+    assert snapshot == RESULT
+    assert update == NEXT_RESULT
+    assert heartbeat is None
+    assert subscribers == 1
+    assert stats == {"subscribers": 0, "broadcasts": 2}
+
+
+def test_slow_subscriber_only_gets_the_latest_result():
+    async def scenario():
+        broadcaster = PredictionBroadcaster()
+        stream = broadcaster.subscribe()
+        first = asyncio.ensure_future(anext(stream))
+        await asyncio.sleep(0)
+
+        broadcaster.publish(RESULT)
+        received = await first
+        broadcaster.publish(NEXT_RESULT)
+        broadcaster.publish({**NEXT_RESULT, "regression": [5020.0]})
+        latest = await anext(stream)
+        await stream.aclose()
+        return received, latest
+
+    received, latest = asyncio.run(scenario())
+
+    assert received == RESULT
+    assert latest["regression"] == [5020.0]
+
+
+def test_errors_are_not_broadcast():
+    broadcaster = PredictionBroadcaster()
+    assert not broadcaster.publish({"error": "No data fetched from Yahoo Finance"})
+    assert broadcaster.latest is None
+
+
+def test_stream_refresh_waits_for_warm_up(monkeypatch):
+    calls = []
+
+    async def combined_prediction():
+        calls.append("predict")
+        return RESULT
+
+    monkeypatch.setattr(main, "combined_prediction", combined_prediction)
+    monkeypatch.setattr(main, "prediction_stream", PredictionBroadcaster())
+
+    async def scenario():
+        warmed_up = asyncio.get_running_loop().create_future()
+        refresh = asyncio.ensure_future(main.refresh_prediction_stream(warmed_up))
+        await asyncio.sleep(0.01)
+        before = list(calls)
+
+        warmed_up.set_result(None)
+        await asyncio.sleep(0.01)
+        refresh.cancel()
+        return before, main.prediction_stream.latest
+
+    before, latest = asyncio.run(scenario())
+
+    assert before == []
+    assert calls == ["predict"]
+    assert latest == RESULT
@@ -0,0 +1,70 @@
+import asyncio
+import time
+
+import httpx
+import pandas as pd
+import pytest
+
+import src.serve.main as main
+
+UPSTREAM_DELAY = 0.5
+
+
+class FakeCollection:
+    def __init__(self):
+        self.documents = []
+
+    def insert_many(self, documents, ordered=True):
+        self.documents.extend(documents)
+
+    def bulk_write(self, requests, ordered=True):
+        self.documents.extend(request._doc for request in requests)
+
+
+def slow_provider(ticker: str, period: str, interval: str) -> pd.DataFrame:
+    time.sleep(UPSTREAM_DELAY)
+    return pd.DataFrame({
+        "Date": [pd.Timestamp("2024-05-01")],
+        "Open": [5000.0],
+        "High": [5050.0],
+        "Low": [4980.0],
+        "Close": [5030.0],
+        "Volume": [3.5e9],
+    })
+
+
+@pytest.fixture
+def offline_app(monkeypatch):
+    monkeypatch.setattr(main.market_data, "fetch", slow_provider)
+    monkeypatch.setattr(main.prediction_log, "collection", FakeCollection())
+    main.market_data.clear()
+    main.prediction_cache.clear()
+    yield main.app
+    main.market_data.clear()
+    main.prediction_cache.clear()
+
+
+async def timed_get(client: httpx.AsyncClient, url: str) -> tuple[httpx.Response, float]:
+    start = time.perf_counter()
+    response = await client.get(url)
+    return response, time.perf_counter() - start
+
+
+def test_root_is_served_while_predictions_are_in_flight(offline_app):
+    async def scenario():
+        transport = httpx.ASGITransport(app=offline_app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            predictions = [asyncio.create_task(timed_get(client, "/predict")) for _ in range(4)]
+            await asyncio.sleep(0.05)
+            root = await timed_get(client, "/")
+            return root, await asyncio.gather(*predictions)
+
+    (root_response, root_latency), predictions = asyncio.run(scenario())
+
+    assert root_response.status_code == 200
+    assert root_latency < UPSTREAM_DELAY / 2
+
+    for response, latency in predictions:
+        assert "prediction" in response.json()
+        # ^GSPC and ^NDX are fetched concurrently, not one after the other
+        assert latency < 2 * UPSTREAM_DELAY
@@ -0,0 +1,7 @@
+from src.serve.import_budget import DEFERRED_MODULES, measure_imports
+
+
+def test_heavy_modules_are_not_imported_eagerly():
+    cumulative = measure_imports("src.serve.main")
+
+    assert [name for name in DEFERRED_MODULES if name in cumulative] == []
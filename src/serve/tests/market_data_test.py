@@ -0,0 +1,158 @@
+import threading
+import time
+from datetime import datetime
+
+import pandas as pd
+import pytest
+
+from src.serve.helpers.market_data import MarketDataCache, MARKET_TZ, session_ttl
+
+
+class FakeProvider:
+    def __init__(self, delay: float = 0.0):
+        self.calls = 0
+        self.delay = delay
+        self.fail = False
+        self._lock = threading.Lock()
+
+    def __call__(self, ticker: str, period: str, interval: str) -> pd.DataFrame:
+        with self._lock:
+            self.calls += 1
+        time.sleep(self.delay)
+        if self.fail:
+            raise ConnectionError("upstream down")
+        return pd.DataFrame({"Date": [pd.Timestamp("2024-05-01")], "Open": [1.0], "Close": [float(self.calls)]})
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1_700_000_000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_hit_after_miss():
+    provider = FakeProvider()
+    cache = MarketDataCache(fetch=provider, ttl=lambda interval, now: 60)
+
+    first = cache.get("^GSPC", "1d", "1d")
+    second = cache.get("^GSPC", "1d", "1d")
+
+    assert provider.calls == 1
+    assert first.equals(second)
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+
+def test_returned_frames_do_not_alias_cache():
+    cache = MarketDataCache(fetch=FakeProvider(), ttl=lambda interval, now: 60)
+
+    data = cache.get("^GSPC", "1d", "1d")
+    data["Close"] = -1.0
+
+    assert cache.get("^GSPC", "1d", "1d")["Close"].iloc[0] == 1.0
+
+
+def test_expired_entry_is_refetched():
+    provider = FakeProvider()
+    clock = FakeClock()
+    cache = MarketDataCache(fetch=provider, ttl=lambda interval, now: 60, clock=clock)
+
+    cache.get("^NDX", "1d", "1d")
+    clock.now += 61
+    data = cache.get("^NDX", "1d", "1d")
+
+    assert provider.calls == 2
+    assert data["Close"].iloc[0] == 2.0
+
+
+def test_concurrent_misses_are_coalesced():
+    provider = FakeProvider(delay=0.2)
+    cache = MarketDataCache(fetch=provider, ttl=lambda interval, now: 60)
+
+    threads = [threading.Thread(target=cache.get, args=("^GSPC", "1y", "1d")) for _ in range(20)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert provider.calls == 1
+    assert cache.stats()["hits"] == 19
+
+
+def test_stale_data_served_when_upstream_fails():
+    provider = FakeProvider()
+    clock = FakeClock()
+    cache = MarketDataCache(fetch=provider, ttl=lambda interval, now: 60, clock=clock)
+
+    cache.get("^GSPC", "1d", "1d")
+    provider.fail = True
+    clock.now += 120
+
+    data = cache.get("^GSPC", "1d", "1d")
+
+    assert data["Close"].iloc[0] == 1.0
+    assert cache.stats()["stale"] == 1
+
+
+def test_failure_without_cached_data_raises():
+    provider = FakeProvider()
+    provider.fail = True
+    cache = MarketDataCache(fetch=provider)
+
+    with pytest.raises(ConnectionError):
+        cache.get("^GSPC", "1d", "1d")
+
+
+def test_session_ttl_follows_trading_hours():
+    # Friday after close -> valid until Monday's open
+    friday_evening = datetime(2024, 5, 3, 18, 0, tzinfo=MARKET_TZ)
+    assert session_ttl("1d", friday_evening) == (2 * 24 + 15.5) * 3600
+
+    # During the session the daily bar is still moving
+    wednesday_noon = datetime(2024, 5, 1, 12, 0, tzinfo=MARKET_TZ)
+    assert session_ttl("1d", wednesday_noon) == 60
+
+
+def test_get_many_fetches_all_misses_in_one_batch():
+    provider = FakeProvider()
+    clock = FakeClock()
+    batches = []
+
+    def fetch_many(tickers, period, interval):
+        batches.append(list(tickers))
+        if provider.fail:
+            raise ConnectionError("upstream down")
+        return {ticker: provider(ticker, period, interval) for ticker in tickers if ticker != "GONE"}
+
+    cache = MarketDataCache(fetch=provider, ttl=lambda interval, now: 60, clock=clock, fetch_many=fetch_many)
+    cache.get("SPY", "1d", "1d")
+
+    results = cache.get_many(["QQQ", "SPY", "GONE", "DIA"], "1d", "1d")
+
+    # SPY was cached, the rest went upstream together
+    assert batches == [["DIA", "GONE", "QQQ"]]
+    assert [len(data) for data in results] == [1, 1, 0, 1]
+    assert cache.get_many(["QQQ", "DIA"], "1d", "1d")[0].equals(results[0])
+    assert len(batches) == 1
+
+    # A failed batch serves what is stale and reports the rest per ticker
+    clock.now += 120
+    provider.fail = True
+    qqq, new = cache.get_many(["QQQ", "NEW"], "1d", "1d")
+    assert qqq.equals(results[0])
+    assert isinstance(new, ConnectionError)
+    assert cache.stats()["stale"] == 1
+
+
+def test_get_many_latest_returns_last_bars():
+    provider = FakeProvider()
+    cache = MarketDataCache(fetch=lambda ticker, period, interval: pd.DataFrame() if ticker == "GONE" else provider(ticker, period, interval), ttl=lambda interval, now: 60)
+
+    spy, gone = cache.get_many(["SPY", "GONE"], "1d", "1d", latest=True)
+
+    assert spy == {"Date": pd.Timestamp("2024-05-01"), "Open": 1.0, "Close": 1.0}
+    assert gone == {}
+    # The row is computed once per fetch and reused by later requests
+    assert cache.get_many(["SPY"], "1d", "1d", latest=True)[0] is spy
@@ -0,0 +1,72 @@
+import time
+
+import mlflow
+import pytest
+
+from src.serve.experiments import MetricsSnapshot
+
+
+@pytest.fixture
+def tracking(tmp_path, monkeypatch):
+    monkeypatch.setenv("MLFLOW_ALLOW_FILE_STORE", "true")
+    previous = mlflow.get_tracking_uri()
+    mlflow.set_tracking_uri(f"file:{tmp_path / 'mlruns'}")
+    yield mlflow.create_experiment("classification")
+    mlflow.set_tracking_uri(previous)
+
+
+def log_run(experiment_id: str, **metrics):
+    with mlflow.start_run(experiment_id=experiment_id):
+        mlflow.log_metrics(metrics)
+    time.sleep(0.01)
+
+
+def test_incremental_sync(tracking, tmp_path):
+    snapshot = MetricsSnapshot(str(tmp_path / "snapshot.db"), [tracking], connect=None)
+
+    log_run(tracking, accuracy=0.5, precision=0.4)
+    log_run(tracking, accuracy=0.6, precision=0.5)
+    assert snapshot.sync() == 2
+
+    log_run(tracking, accuracy=0.7, precision=0.6, recall=0.3)
+    # Only the run at the cursor and the new one are read again
+    assert snapshot.sync() == 2
+
+    history = snapshot.history(tracking, ["accuracy", "precision", "recall"])
+    assert history == [
+        {"accuracy": 0.7, "precision": 0.6, "recall": 0.3},
+        {"accuracy": 0.6, "precision": 0.5, "recall": None},
+        {"accuracy": 0.5, "precision": 0.4, "recall": None},
+    ]
+
+
+def test_history_survives_unreachable_tracking_server(tracking, tmp_path):
+    db_path = str(tmp_path / "snapshot.db")
+    log_run(tracking, accuracy=0.5)
+    MetricsSnapshot(db_path, [tracking], connect=None).sync()
+
+    def unreachable():
+        raise ConnectionError("tracking server down")
+
+    offline = MetricsSnapshot(db_path, [tracking], connect=unreachable)
+    assert offline.history(tracking, ["accuracy"]) == [{"accuracy": 0.5}]
+
+
+def test_deleted_runs_are_removed(tracking, tmp_path):
+    db_path = str(tmp_path / "snapshot.db")
+    log_run(tracking, accuracy=0.5)
+    log_run(tracking, accuracy=0.6)
+    log_run(tracking, accuracy=0.7)
+    snapshot = MetricsSnapshot(db_path, [tracking], connect=None)
+    snapshot.sync()
+
+    runs = mlflow.search_runs([tracking]).sort_values("start_time")["run_id"].tolist()
+    mlflow.delete_run(runs[-1])
+    snapshot.sync()
+    assert snapshot.history(tracking, ["accuracy"]) == [{"accuracy": 0.6}, {"accuracy": 0.5}]
+
+    # Deleted while no service was running: the next process lists everything once
+    mlflow.delete_run(runs[0])
+    restarted = MetricsSnapshot(db_path, [tracking], connect=None)
+    restarted.sync()
+    assert restarted.history(tracking, ["accuracy"]) == [{"accuracy": 0.6}]
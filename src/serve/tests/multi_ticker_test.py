@@ -0,0 +1,65 @@
+import dataclasses
+
+import pytest
+from fastapi.testclient import TestClient
+
+import src.serve.main as main
+from src.models.helpers.model_registry import ModelType
+from src.serve.benchmark import offline_app
+from src.serve.helpers.watchlist import parse_tickers
+
+
+class CountingSession:
+    def __init__(self, session):
+        self.session = session
+        self.batch_sizes = []
+
+    def run(self, output_names, feeds):
+        self.batch_sizes.append(len(next(iter(feeds.values()))))
+        return self.session.run(output_names, feeds)
+
+
+@pytest.fixture
+def client(monkeypatch):
+    with offline_app() as app:
+        models = {}
+        for name in ["sp500_model", "sp500_model_regression"]:
+            model = main.model_sessions.get(name, ModelType.PRODUCTION)
+            models[name] = dataclasses.replace(model, session=CountingSession(model.session))
+        monkeypatch.setattr(main.model_sessions, "get", lambda name, model_type=ModelType.PRODUCTION: models[name])
+        yield TestClient(app), models
+
+
+def test_watchlist_is_scored_in_one_run_per_model(client):
+    client, models = client
+    tickers = [f"T{i:02d}" for i in range(50)]
+
+    response = client.get("/predict/tickers", params={"tickers": ",".join(tickers)}).json()
+
+    assert response["count"] == 50
+    assert list(response["predictions"]) == tickers
+    assert response["errors"] == {}
+    for model in models.values():
+        assert model.session.batch_sizes == [50]
+
+
+def test_failed_tickers_are_reported_without_failing_the_rest(client, monkeypatch):
+    client, models = client
+    provider = main.market_data.fetch
+
+    def flaky(ticker, period, interval):
+        if ticker == "BROKEN":
+            raise ConnectionError("upstream down")
+        return provider(ticker, period, interval)
+
+    # Undone before offline_app restores the real provider
+    with monkeypatch.context() as patch:
+        patch.setattr(main.market_data, "fetch", flaky)
+        response = client.get("/predict/tickers", params={"tickers": "spy,BROKEN"}).json()
+
+    assert list(response["predictions"]) == ["SPY"]
+    assert response["errors"] == {"BROKEN": "upstream down"}
+
+
+def test_parse_tickers():
+    assert parse_tickers(" spy, QQQ,,spy ,^gspc") == ["SPY", "QQQ", "^GSPC"]
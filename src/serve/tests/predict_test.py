@@ -0,0 +1,24 @@
+import os
+from datetime import date
+
+import pandas as pd
+
+from src.serve.helpers.predict import PREDICTORS, history_range
+
+
+def write_history(path, days):
+    frame = pd.DataFrame({"Date": pd.bdate_range("2024-05-01", periods=days).strftime("%Y-%m-%d")})
+    for column in PREDICTORS:
+        frame[column] = 1.0
+    frame.to_csv(path)
+
+
+def test_history_is_reloaded_when_the_file_changes(tmp_path):
+    path = str(tmp_path / "sp500.csv")
+    write_history(path, 3)
+    assert len(history_range(date(2024, 5, 1), None, path)) == 3
+
+    # process_data appends the next day's row
+    write_history(path, 4)
+    os.utime(path, ns=(0, os.stat(path).st_mtime_ns + 1_000_000))
+    assert len(history_range(date(2024, 5, 1), None, path)) == 4
@@ -0,0 +1,79 @@
+import dataclasses
+
+import pandas as pd
+import pytest
+from fastapi.testclient import TestClient
+
+import src.serve.main as main
+from src.models.helpers.model_registry import ModelType
+
+
+class CountingProvider:
+    def __init__(self):
+        self.close = 5030.0
+
+    def __call__(self, ticker: str, period: str, interval: str) -> pd.DataFrame:
+        return pd.DataFrame({
+            "Date": [pd.Timestamp("2024-05-01")],
+            "Open": [5000.0],
+            "High": [5050.0],
+            "Low": [4980.0],
+            "Close": [self.close],
+            "Volume": [3.5e9],
+        })
+
+
+class CountingSession:
+    def __init__(self, session):
+        self.session = session
+        self.runs = 0
+
+    def run(self, *args, **kwargs):
+        self.runs += 1
+        return self.session.run(*args, **kwargs)
+
+
+@pytest.fixture
+def client(monkeypatch):
+    provider = CountingProvider()
+    monkeypatch.setattr(main.market_data, "fetch", provider)
+    monkeypatch.setattr(main.market_data, "ttl", lambda interval, now: 0)
+    main.prediction_cache.clear()
+
+    models = {}
+    for name in ["sp500_model", "sp500_model_regression"]:
+        model = main.model_sessions.get(name, ModelType.PRODUCTION)
+        models[name] = dataclasses.replace(model, session=CountingSession(model.session), version="1")
+    monkeypatch.setattr(main.model_sessions, "get", lambda name, model_type=ModelType.PRODUCTION: models[name])
+    monkeypatch.setattr(main.prediction_log, "try_submit", lambda document: True)
+
+    yield TestClient(main.app), provider, models["sp500_model"].session
+    main.prediction_cache.clear()
+
+
+def test_repeated_predictions_are_served_from_cache(client):
+    client, provider, session = client
+
+    first = client.get("/predict").json()
+    second = client.get("/predict").json()
+
+    assert first == second
+    assert session.runs == 1
+
+    # A new bar produces a new key
+    provider.close = 5100.0
+    client.get("/predict")
+    assert session.runs == 2
+
+
+def test_single_and_combined_endpoints_share_one_computation(client):
+    client, provider, session = client
+
+    combined = client.get("/predict/combined").json()
+    classification = client.get("/predict").json()
+    regression = client.get("/predict/regression").json()
+
+    assert session.runs == 1
+    assert classification == {"prediction": combined["prediction"]}
+    assert regression == {"prediction": [[value] for value in combined["regression"]]}
+    assert set(combined) == {"trading_date", "prediction", "probability", "regression"}
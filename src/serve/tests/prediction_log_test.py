@@ -0,0 +1,80 @@
+import threading
+import time
+
+from src.serve.helpers.prediction_log import PredictionLogWriter
+
+
+class FakeCollection:
+    def __init__(self, delay: float = 0.0):
+        self.batches = []
+        self.delay = delay
+        self.release = threading.Event()
+        self.release.set()
+
+    def insert_many(self, documents, ordered=True):
+        self.release.wait()
+        time.sleep(self.delay)
+        self.batches.append(list(documents))
+
+    @property
+    def documents(self):
+        return [document for batch in self.batches for document in batch]
+
+
+def test_flushes_on_batch_size():
+    collection = FakeCollection()
+    writer = PredictionLogWriter(collection, batch_size=5, flush_interval=10)
+
+    for i in range(5):
+        writer.try_submit({"i": i})
+
+    deadline = time.monotonic() + 2
+    while not collection.batches and time.monotonic() < deadline:
+        time.sleep(0.01)
+    writer.close()
+
+    assert [len(batch) for batch in collection.batches] == [5]
+
+
+def test_flushes_on_interval():
+    collection = FakeCollection()
+    writer = PredictionLogWriter(collection, batch_size=100, flush_interval=0.1)
+
+    writer.try_submit({"i": 0})
+    time.sleep(0.5)
+
+    assert collection.documents == [{"i": 0}]
+    writer.close()
+
+
+def test_close_drains_queue():
+    collection = FakeCollection()
+    writer = PredictionLogWriter(collection, batch_size=3, flush_interval=60)
+
+    for i in range(10):
+        writer.try_submit({"i": i})
+    writer.close()
+
+    assert [document["i"] for document in collection.documents] == list(range(10))
+    assert writer.stats()["queue_depth"] == 0
+    assert writer.stats()["written"] == 10
+
+
+def test_backpressure_when_full():
+    collection = FakeCollection()
+    collection.release.clear()
+    writer = PredictionLogWriter(collection, batch_size=1, flush_interval=0.01, max_queue=2)
+
+    # Writer takes the first document and then blocks on the stalled insert
+    writer.try_submit({"i": -1})
+    time.sleep(0.2)
+
+    accepted = [writer.try_submit({"i": i}) for i in range(10)]
+    assert not all(accepted)
+    assert writer.submit({"i": "late"}, wait=0.05) is False
+    assert writer.stats()["dropped"] == 1
+
+    collection.release.set()
+    writer.close()
+
+    assert writer.stats()["written"] == sum(accepted) + 1
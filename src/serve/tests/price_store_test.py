@@ -0,0 +1,76 @@
+import json
+
+import pandas as pd
+
+from src.serve.helpers.price_store import PriceStore
+
+
+def write_raw_prices(path, dates, mode="w"):
+    data = pd.DataFrame({
+        "Date": [f"{d} 00:00:00-04:00" for d in dates],
+        "Open": 1.0,
+        "High": 1.0,
+        "Low": 1.0,
+        "Close": [float(i) for i in range(len(dates))],
+        "Volume": 1,
+        "Dividends": 0.0,
+        "Stock Splits": 0.0,
+    }).set_index("Date")
+    data.to_csv(path, mode=mode, header=mode == "w")
+
+
+def test_appended_rows_are_picked_up(tmp_path):
+    file = tmp_path / "sp500.csv"
+    write_raw_prices(file, ["2024-05-01", "2024-05-02"])
+    store = PriceStore(str(file))
+
+    body, etag = store.response(None, None, 1, False)
+    assert [p["Date"] for p in json.loads(body)["prices"]] == ["2024-05-01", "2024-05-02"]
+
+    write_raw_prices(file, ["2024-05-02", "2024-05-03"], mode="a")
+    body_after, etag_after = store.response(None, None, 1, False)
+
+    assert [p["Date"] for p in json.loads(body_after)["prices"]] == ["2024-05-01", "2024-05-02", "2024-05-03"]
+    assert etag_after != etag
+
+
+def test_unchanged_data_keeps_etag_and_columnar_shape(tmp_path):
+    file = tmp_path / "sp500.csv"
+    write_raw_prices(file, ["2024-05-01", "2024-05-02", "2024-05-03", "2024-05-06"])
+    store = PriceStore(str(file))
+
+    assert store.response(None, None, 1, False)[1] == store.response(None, None, 1, False)[1]
+
+    body, _ = store.response(pd.Timestamp("2024-05-02").date(), None, 2, True)
+    assert json.loads(body) == {"prices": {"Date": ["2024-05-02", "2024-05-06"], "Close": [1.0, 3.0]}}
+
+
+def test_rewritten_file_is_reloaded(tmp_path):
+    file = tmp_path / "sp500.csv"
+    write_raw_prices(file, ["2024-05-01", "2024-05-03"])
+    store = PriceStore(str(file))
+    store.response(None, None, 1, False)
+
+    # A repair backfills 05-02 and rewrites the whole (now longer) file
+    write_raw_prices(file, ["2024-05-01", "2024-05-02", "2024-05-03"])
+    body, _ = store.response(None, None, 1, False)
+
+    assert [p["Date"] for p in json.loads(body)["prices"]] == ["2024-05-01", "2024-05-02", "2024-05-03"]
+
+
+def test_torn_tail_is_read_once_it_is_complete(tmp_path):
+    file = tmp_path / "sp500.csv"
+    write_raw_prices(file, ["2024-05-01"])
+    store = PriceStore(str(file))
+    store.response(None, None, 1, False)
+
+    # fetch_data is in the middle of appending the next row
+    with open(file, "a") as f:
+        f.write("2024-05-02 00:00:00-04:00,1.0,1.0,1.0,")
+    body, _ = store.response(None, None, 1, False)
+    assert [p["Date"] for p in json.loads(body)["prices"]] == ["2024-05-01"]
+
+    with open(file, "a") as f:
+        f.write("7.0,1,0.0,0.0\n")
+    body, _ = store.response(None, None, 1, False)
+    assert json.loads(body)["prices"][-1] == {"Date": "2024-05-02", "Close": 7.0}
@@ -0,0 +1,39 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from src.serve.benchmark import offline_app
+from src.serve.helpers.telemetry import server_timing
+
+
+@pytest.fixture(scope="module")
+def client():
+    with offline_app() as app:
+        yield TestClient(app)
+
+
+def test_server_timing_header_lists_stages(client):
+    client.get("/predict")
+    response = client.get("/predict")
+
+    timing = response.headers["server-timing"]
+    for name in ["fetch", "features", "cache", "total"]:
+        assert f"{name};dur=" in timing
+
+
+def test_metrics_exposes_stages_and_cache_stats(client):
+    client.get("/predict")
+    response = client.get("/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    body = response.text
+    assert 'serve_stage_duration_seconds_count{endpoint="/predict",stage="fetch"}' in body
+    assert 'serve_requests_total{endpoint="/predict",method="GET",status="200"}' in body
+    assert "serve_requests_in_flight" in body
+    assert "serve_market_data_hit_ratio" in body
+    assert "serve_prediction_cache_hits_total" in body
+    assert "serve_prediction_log_queue_depth" in body
+
+
+def test_server_timing_format():
+    assert server_timing({"fetch": 0.0125}, 0.02) == "fetch;dur=12.50, total;dur=20.00"